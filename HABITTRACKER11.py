@@ -1,58 +1,79 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk, filedialog
-import json, os, datetime, random
+import datetime, random
 import matplotlib.pyplot as plt
 from tkcalendar import Calendar
 from openpyxl import Workbook
 from plyer import notification
+from habitcore import (
+    HabitStore, CommandHistory, TRACKER_MOODS, schedule_streak, due_today, weekly_counts,
+    describe_command, describe_schedule, parse_schedule
+)
+from habitcore.heatmap import year_grid, year_weeks, grid_levels, heatmap_pixels, photo_data, cell_date
 
 # ---------- Global Variables ----------
 DATA_FILE = 'data.json'
 current_user = None
-data = {}
+store = None
+history = None
+# Year heatmap cells are drawn this size in pixels, then zoomed up by Tk
+HEATMAP_CELL = 4
+HEATMAP_GAP = 1
+HEATMAP_ZOOM = 3
 
 # ---------- Helper Functions ----------
 def load_data():
-    global data
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-    else:
-        data = {}
+    # Parsed on a background thread; the login prompt doesn't wait for it
+    global store
+    store = HabitStore(DATA_FILE, background=True)
+
+def update_load_status():
+    if not load_label.winfo_exists():
+        return
+    if store.loaded:
+        load_label.config(text="")
+        return
+    load_label.config(text=f"Loading habit data... {store.load_progress:.0%}")
+    root.after(100, update_load_status)
 
 def save_data():
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+    # Saving first catches up with other processes' writes, which needs the
+    # whole file read; until then changes wait in memory, and the UI thread
+    # never blocks on the load
+    if store.loaded:
+        store.flush()
+    else:
+        root.after(100, save_data)
 
 def login_user():
-    global current_user
+    global current_user, history
     username = simpledialog.askstring("Login", "Enter your username:")
     if not username:
         messagebox.showerror("Error", "Username is required.")
         return
-    if username not in data:
-        data[username] = {
-            "habits": [],
-            "logs": {},
-            "streak": 0,
-            "notes": "",
-            "moods": {},
-            "progress": {}
-        }
+    # Waits only if this user's record hasn't been read yet
+    try:
+        new_user = store.user(username) is None
+        if new_user:
+            store.user(username, create=True)
+    except (ValueError, OSError) as e:
+        messagebox.showerror("Error", f"Could not read {DATA_FILE}: {e}")
+        return
     current_user = username
-    save_data()
+    history = CommandHistory(store)
+    # An existing user's record is only written with their next change
+    if new_user:
+        save_data()
     show_home()
 
 def update_ui():
     habit_listbox.delete(0, tk.END)
-    for habit in data[current_user]["habits"]:
+    for habit in store.user(current_user)["habits"]:
         habit_listbox.insert(tk.END, habit)
 
 def add_habit():
     habit = habit_input.get()
-    if habit and habit not in data[current_user]["habits"]:
-        data[current_user]["habits"].append(habit)
-        data[current_user]["progress"][habit] = 0
+    if history.record(store.add_habit(current_user, habit)):
         save_data()
         update_ui()
         habit_input.delete(0, tk.END)
@@ -62,8 +83,7 @@ def remove_habit():
         sel = habit_listbox.curselection()
         if sel:
             habit = habit_listbox.get(sel)
-            data[current_user]["habits"].remove(habit)
-            data[current_user]["progress"].pop(habit, None)
+            history.record(store.remove_habit(current_user, habit))
             save_data()
             update_ui()
     except:
@@ -71,28 +91,19 @@ def remove_habit():
 
 def log_today():
     today = str(datetime.date.today())
-    if today not in data[current_user]["logs"]:
-        data[current_user]["logs"][today] = []
     selected = [habit_listbox.get(i) for i in habit_listbox.curselection()]
-    data[current_user]["logs"][today].extend(selected)
-    data[current_user]["logs"][today] = list(set(data[current_user]["logs"][today]))
+    history.record(store.log_habits(current_user, today, selected))
     save_data()
     update_streak()
     messagebox.showinfo("Logged", "Today's habits have been logged.")
 
 def update_streak():
-    logs = data[current_user]["logs"]
-    streak = 0
-    today = datetime.date.today()
-    for i in range(15):
-        date_str = str(today - datetime.timedelta(days=i))
-        if date_str in logs and logs[date_str]:
-            streak += 1
-        else:
-            break
-    data[current_user]["streak"] = streak
+    streak = schedule_streak(store, current_user)
+    store.set_streak(current_user, streak)
     save_data()
     streak_label.config(text=f"Current Streak: {streak} days")
+    due = due_today(store, current_user)
+    due_label.config(text="Due Today: " + (", ".join(sorted(due)) if due else "all done!"))
     if streak in [3, 7, 15]:
         notification.notify(
             title="Habit Streak",
@@ -100,6 +111,40 @@ def update_streak():
             timeout=5
         )
 
+def undo_last(event=None):
+    try:
+        command = history.undo()
+    except ValueError as e:
+        # Another window or the API changed this since
+        messagebox.showwarning("Undo", str(e).capitalize() + ".")
+        update_ui()
+        update_streak()
+        return
+    if command is None:
+        messagebox.showinfo("Undo", "Nothing to undo.")
+        return
+    save_data()
+    update_ui()
+    update_streak()
+    messagebox.showinfo("Undo", f"Undid {describe_command(command)}.")
+
+def redo_last(event=None):
+    try:
+        command = history.redo()
+    except ValueError as e:
+        # Another window or the API changed this since
+        messagebox.showwarning("Redo", str(e).capitalize() + ".")
+        update_ui()
+        update_streak()
+        return
+    if command is None:
+        messagebox.showinfo("Redo", "Nothing to redo.")
+        return
+    save_data()
+    update_ui()
+    update_streak()
+    messagebox.showinfo("Redo", f"Redid {describe_command(command)}.")
+
 def show_calendar():
     top = tk.Toplevel(root)
     top.title("Habit Log Calendar")
@@ -108,7 +153,7 @@ def show_calendar():
 
     def view_logs():
         sel = cal.get_date()
-        logs = data[current_user]["logs"].get(sel, [])
+        logs = store.habits_on(current_user, sel)
         messagebox.showinfo("Logs", f"Habits on {sel}:\n" + "\n".join(logs) if logs else "No logs.")
 
     tk.Button(top, text="View Logs", command=view_logs).pack(pady=5)
@@ -118,7 +163,7 @@ def export_excel():
     ws = wb.active
     ws.title = "Habit Logs"
     ws.append(["Date", "Habits"])
-    for date, habits in data[current_user]["logs"].items():
+    for date, habits in store.user(current_user)["logs"].items():
         ws.append([date, ", ".join(habits)])
     file = filedialog.asksaveasfilename(defaultextension=".xlsx")
     if file:
@@ -126,13 +171,7 @@ def export_excel():
         messagebox.showinfo("Exported", f"Data saved to {file}")
 
 def weekly_graph():
-    logs = data[current_user]["logs"]
-    today = datetime.date.today()
-    week_data = {}
-    for i in range(6, -1, -1):
-        date = today - datetime.timedelta(days=i)
-        date_str = str(date)
-        week_data[date_str] = len(logs.get(date_str, []))
+    week_data = dict(weekly_counts(store, current_user))
 
     plt.bar(week_data.keys(), week_data.values(), color="#F7C59F")
     plt.xticks(rotation=45)
@@ -141,6 +180,67 @@ def weekly_graph():
     plt.tight_layout()
     plt.show()
 
+def year_heatmap():
+    top = tk.Toplevel(root)
+    top.title("Year at a Glance")
+
+    this_year = datetime.date.today().year
+    dates = store.log_dates(current_user)
+    first_year = min(int(dates[0][:4]), this_year) if dates else this_year
+    years = [str(year) for year in range(this_year, first_year - 1, -1)]
+    habits = ["All habits"] + store.user(current_user)["habits"]
+
+    controls = tk.Frame(top)
+    controls.pack(pady=5)
+    year_var = tk.StringVar(top, years[0])
+    habit_var = tk.StringVar(top, habits[0])
+    year_box = ttk.Combobox(controls, textvariable=year_var, values=years, state="readonly", width=6)
+    year_box.pack(side=tk.LEFT, padx=5)
+    habit_box = ttk.Combobox(controls, textvariable=habit_var, values=habits, state="readonly", width=25)
+    habit_box.pack(side=tk.LEFT, padx=5)
+
+    image_label = tk.Label(top, bd=0, padx=0, pady=0, cursor="hand2")
+    image_label.pack(padx=10, pady=5)
+    summary_label = tk.Label(top)
+    summary_label.pack(pady=5)
+
+    def selection():
+        habit = habit_var.get()
+        return int(year_var.get()), None if habit == habits[0] else habit
+
+    def redraw(event=None):
+        # One image for the whole grid, not a widget per day
+        year, habit = selection()
+        grid = year_grid(store, current_user, year, habit)
+        total = len(store.user(current_user)["habits"]) if habit is None else 1
+        pixels = heatmap_pixels(grid_levels(grid, total), HEATMAP_CELL, HEATMAP_GAP)
+        small = tk.PhotoImage(width=pixels.shape[1], height=pixels.shape[0])
+        small.put(photo_data(pixels))
+        image_label.image = small.zoom(HEATMAP_ZOOM)
+        image_label.config(image=image_label.image)
+
+        logged = int((grid > 0).sum())
+        completions = int(grid[grid > 0].sum())
+        summary_label.config(text=f"{logged} days logged, {completions} habits completed in {year}")
+
+    def show_day(event):
+        year, habit = selection()
+        size = (HEATMAP_CELL + HEATMAP_GAP) * HEATMAP_ZOOM
+        column, row = event.x // size, event.y // size
+        day = cell_date(year, row, column) if column < year_weeks(year) else None
+        if day is None:
+            return
+        logs = store.habits_on(current_user, str(day))
+        messagebox.showinfo("Logs", f"Habits on {day}:\n" + "\n".join(logs) if logs else f"No logs on {day}.",
+                            parent=top)
+
+    year_box.bind("<<ComboboxSelected>>", redraw)
+    habit_box.bind("<<ComboboxSelected>>", redraw)
+    image_label.bind("<Button-1>", show_day)
+    redraw()
+
+    tk.Button(top, text="Close", command=top.destroy).pack(pady=5)
+
 def show_notes():
     notes_window = tk.Toplevel(root)
     notes_window.title("Mood & Note Tracker")
@@ -148,7 +248,7 @@ def show_notes():
     mood_label = tk.Label(notes_window, text="Select Today's Mood:")
     mood_label.pack(pady=5)
 
-    moods = ["Happy", "Sad", "Neutral", "Excited", "Stressed", "Calm"]
+    moods = list(TRACKER_MOODS)
     mood_var = tk.StringVar(notes_window)
     mood_var.set(moods[0])
 
@@ -158,13 +258,13 @@ def show_notes():
     note_label = tk.Label(notes_window, text="Note:")
     note_label.pack(pady=5)
     note_text = tk.Text(notes_window, height=10, width=40)
-    note_text.insert(tk.END, data[current_user].get("notes", ""))
+    note_text.insert(tk.END, store.user(current_user).get("notes", ""))
     note_text.pack(pady=5)
 
     def save_notes():
         mood = mood_var.get()
-        data[current_user]["notes"] = note_text.get("1.0", tk.END).strip()
-        data[current_user]["moods"][str(datetime.date.today())] = mood
+        history.record(store.set_notes(current_user, note_text.get("1.0", tk.END).strip()))
+        history.record(store.set_mood(current_user, str(datetime.date.today()), mood))
         save_data()
         messagebox.showinfo("Saved", "Mood and note saved.")
 
@@ -172,7 +272,7 @@ def show_notes():
     tk.Button(notes_window, text="Return Home", command=notes_window.destroy).pack(pady=5)
 
 def show_progress_pie():
-    progress = data[current_user].get("progress", {})
+    progress = store.user(current_user).get("progress", {})
     if not progress or all(v == 0 for v in progress.values()):
         messagebox.showinfo("No Data", "No progress data to display.")
         return
@@ -196,12 +296,49 @@ def add_progress():
         try:
             progress = simpledialog.askinteger("Progress Input", f"Enter progress for '{habit}' (e.g., 0-100):", minvalue=0)
             if progress is not None:
-                data[current_user]["progress"][habit] = progress
+                history.record(store.set_progress(current_user, habit, progress))
         except:
             continue
     save_data()
     messagebox.showinfo("Saved", "Progress updated successfully.")
 
+def set_schedule():
+    selected = [habit_listbox.get(i) for i in habit_listbox.curselection()]
+    if not selected:
+        messagebox.showwarning("No Habit", "Please select at least one habit.")
+        return
+    schedules = store.user(current_user)["schedules"]
+    for habit in selected:
+        text = simpledialog.askstring(
+            "Schedule", f"Schedule for '{habit}' (daily, mon,wed,fri, 3/week or every 2 days):",
+            initialvalue=describe_schedule(schedules.get(habit))
+        )
+        if text is None:
+            continue
+        try:
+            history.record(store.set_schedule(current_user, habit, parse_schedule(text)))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+    save_data()
+    update_streak()
+
+def link_persona_vista():
+    # PersonaVista only shows this user's habits to an account confirmed here
+    account = simpledialog.askstring("Link PersonaVista", "PersonaVista username to share your habits with:")
+    if not account:
+        return
+    if account in store.user(current_user)["links"] and messagebox.askyesno(
+            "Link PersonaVista", f"'{account}' can see your habits. Unlink it?"):
+        history.record(store.set_link(current_user, account, None))
+        save_data()
+        return
+    code = simpledialog.askstring("Link PersonaVista", f"Enter the link code PersonaVista shows to '{account}':")
+    if not code:
+        return
+    history.record(store.set_link(current_user, account, code.strip().upper()))
+    save_data()
+    messagebox.showinfo("Link PersonaVista", f"'{account}' will see your habits once the code matches.")
+
 def show_home():
     for widget in root.winfo_children():
         widget.destroy()
@@ -212,12 +349,17 @@ def show_home():
     tk.Button(root, text="1. Habit Manager", font=("Arial", 12), command=habit_manager).pack(pady=10)
     tk.Button(root, text="2. Mood & Note Tracker", font=("Arial", 12), command=show_notes).pack(pady=10)
     tk.Button(root, text="3. AI Habit Suggestions", font=("Arial", 12), command=ai_suggestions).pack(pady=10)
+    tk.Button(root, text="4. Link PersonaVista", font=("Arial", 12), command=link_persona_vista).pack(pady=10)
 
 def habit_manager():
+    # Show what the API or PersonaVista wrote meanwhile; each save catches
+    # up with them anyway
+    if store.loaded:
+        store.reload_if_changed()
     manager = tk.Toplevel(root)
     manager.title("Habit Manager")
 
-    global habit_input, habit_listbox, streak_label
+    global habit_input, habit_listbox, streak_label, due_label
 
     tk.Label(manager, text="Enter Habit:").pack(pady=5)
     habit_input = tk.Entry(manager, width=30)
@@ -231,13 +373,21 @@ def habit_manager():
     tk.Button(manager, text="Remove Habit", command=remove_habit).pack(pady=5)
     tk.Button(manager, text="Log Today's Habits", command=log_today).pack(pady=5)
     tk.Button(manager, text="Add Progress", command=add_progress).pack(pady=5)
+    tk.Button(manager, text="Set Schedule", command=set_schedule).pack(pady=5)
     tk.Button(manager, text="Show Progress Pie Chart", command=show_progress_pie).pack(pady=5)
     tk.Button(manager, text="View Weekly Graph", command=weekly_graph).pack(pady=5)
+    tk.Button(manager, text="View Year Heatmap", command=year_heatmap).pack(pady=5)
     tk.Button(manager, text="View Calendar Logs", command=show_calendar).pack(pady=5)
     tk.Button(manager, text="Export to Excel", command=export_excel).pack(pady=5)
+    tk.Button(manager, text="Undo", command=undo_last).pack(pady=5)
+    tk.Button(manager, text="Redo", command=redo_last).pack(pady=5)
+    manager.bind("<Control-z>", undo_last)
+    manager.bind("<Control-y>", redo_last)
 
     streak_label = tk.Label(manager, text="Current Streak: 0 days")
     streak_label.pack(pady=5)
+    due_label = tk.Label(manager, text="Due Today:", wraplength=300)
+    due_label.pack(pady=5)
     update_streak()
 
     tk.Button(manager, text="Back to Home", command=manager.destroy).pack(pady=10)
@@ -259,6 +409,10 @@ root.geometry("700x800")
 
 pastel_colors = ["#FFF8DC", "#FFFAF0", "#FFFFE0", "#FDFD96", "#FAFAD2"]
 
+load_label = tk.Label(root, text="")
+load_label.pack(side=tk.BOTTOM, pady=5)
+
 load_data()
+update_load_status()
 login_user()
 root.mainloop()
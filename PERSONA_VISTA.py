@@ -1,12 +1,41 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
+import streamlit.components.v1 as components
+import numpy as np
+import importlib
+import functools
 import random
 import json
-from datetime import datetime, date
+import os
+import mmap
+import contextlib
+import cProfile
+import pickle
+import zlib
+import io
+import csv
+from datetime import datetime, date, timedelta
 import time
 import hashlib
+import bisect
+import heapq
+import math
+import re
+from array import array
+import threading
+import queue
+import uuid
+import secrets
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from habitcore import HabitStore, JOURNAL_MOODS, MOOD_LABELS, mood_on_habit_days, schedule_streak
+
+# Plotly and pandas are imported on first use, so the login page renders
+# without paying for them
+@functools.lru_cache(maxsize=None)
+def lazy_import(name):
+    return importlib.import_module(name)
 
 # Configure page
 st.set_page_config(
@@ -36,6 +65,128 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# Render profiling (opt-in): PERSONA_VISTA_PROFILE=1 times every page and the
+# expensive steps inside it; PERSONA_VISTA_PROFILE=cprofile also runs cProfile
+# and dumps reruns slower than PERSONA_VISTA_PROFILE_SLOW_MS
+PROFILE_MODE = os.environ.get("PERSONA_VISTA_PROFILE", "")
+PROFILING_ENABLED = PROFILE_MODE in ("1", "cprofile")
+PROFILE_SLOW_MS = float(os.environ.get("PERSONA_VISTA_PROFILE_SLOW_MS", "500"))
+PROFILE_DUMP_DIR = os.environ.get("PERSONA_VISTA_PROFILE_DIR", "profiles")
+PROFILE_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+@st.cache_resource
+def get_profile_stats():
+    return {'lock': threading.Lock(), 'histograms': {}, 'dumps': deque(maxlen=20)}
+
+def record_timing(page, step, seconds):
+    elapsed_ms = seconds * 1000
+    stats = get_profile_stats()
+    with stats['lock']:
+        histogram = stats['histograms'].setdefault((page, step), {
+            'buckets': [0] * len(PROFILE_BUCKETS_MS), 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0
+        })
+        histogram['buckets'][bisect.bisect_left(PROFILE_BUCKETS_MS, elapsed_ms)] += 1
+        histogram['count'] += 1
+        histogram['total_ms'] += elapsed_ms
+        histogram['max_ms'] = max(histogram['max_ms'], elapsed_ms)
+
+def current_page_name():
+    if st.session_state.get('current_user') is None:
+        return 'login'
+    return st.session_state.get('page', 'dashboard')
+
+@contextlib.contextmanager
+def profile_step(step):
+    if not PROFILING_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(current_page_name(), step, time.perf_counter() - start)
+
+@contextlib.contextmanager
+def profile_page(page):
+    if not PROFILING_ENABLED:
+        yield
+        return
+    profiler = cProfile.Profile() if PROFILE_MODE == "cprofile" else None
+    start = time.perf_counter()
+    if profiler:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another session's profiler is already active on this interpreter
+            profiler = None
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        record_timing(page, 'total', elapsed)
+        if profiler and elapsed * 1000 >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DUMP_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DUMP_DIR, f"{page}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+            profiler.dump_stats(path)
+            get_profile_stats()['dumps'].append((page, elapsed * 1000, path))
+
+def histogram_percentile(histogram, p):
+    target = histogram['count'] * p / 100
+    seen = 0
+    for bound, count in zip(PROFILE_BUCKETS_MS, histogram['buckets']):
+        seen += count
+        if seen >= target:
+            return round(min(bound, histogram['max_ms']), 1)
+    return round(histogram['max_ms'], 1)
+
+def show_diagnostics():
+    show_back_button()
+    st.title("🛠️ Render Diagnostics")
+    st.write("Per-page render timings collected across all sessions since the server started.")
+    
+    stats = get_profile_stats()
+    with stats['lock']:
+        histograms = {key: dict(value, buckets=list(value['buckets'])) for key, value in stats['histograms'].items()}
+        dumps = list(stats['dumps'])
+    
+    if not histograms:
+        st.info("No timings recorded yet. Visit a few pages first.")
+        return
+    
+    st.dataframe([
+        {
+            'Page': page,
+            'Step': step,
+            'Count': histogram['count'],
+            'Mean ms': round(histogram['total_ms'] / histogram['count'], 1),
+            'p50 ms': histogram_percentile(histogram, 50),
+            'p90 ms': histogram_percentile(histogram, 90),
+            'p99 ms': histogram_percentile(histogram, 99),
+            'Max ms': round(histogram['max_ms'], 1)
+        }
+        for (page, step), histogram in sorted(histograms.items())
+    ], hide_index=True)
+    
+    pages = sorted({page for page, _ in histograms})
+    page = st.selectbox("Latency histogram for page:", pages)
+    buckets = histograms.get((page, 'total'))
+    if buckets:
+        labels = [f"≤{bound:g} ms" for bound in PROFILE_BUCKETS_MS[:-1]] + [f">{PROFILE_BUCKETS_MS[-2]:g} ms"]
+        st.bar_chart(dict(zip(labels, buckets['buckets'])))
+    
+    if dumps:
+        st.subheader("Slow rerun profiles")
+        for dump_page, elapsed_ms, path in reversed(dumps):
+            st.write(f"• **{dump_page}** - {elapsed_ms:.0f} ms - `{path}`")
+    
+    if st.button("Reset Timings"):
+        with stats['lock']:
+            stats['histograms'].clear()
+            stats['dumps'].clear()
+        st.rerun()
+
 # Initialize session state
 def init_session_state():
     if 'users_db' not in st.session_state:
@@ -54,7 +205,7 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def create_user(username, password, email):
-    if username in st.session_state.users_db:
+    if username in st.session_state.users_db or os.path.exists(snapshot_path(username)):
         return False
     
     st.session_state.users_db[username] = {
@@ -66,12 +217,115 @@ def create_user(username, password, email):
         'daily_challenges': {},
         'created_date': datetime.now().isoformat()
     }
+    mark_user_changed()
     return True
 
 def authenticate_user(username, password):
     if username in st.session_state.users_db:
         return st.session_state.users_db[username]['password'] == hash_password(password)
-    return False
+    return restore_user_snapshot(username, password)
+
+# Session snapshots: once a user's data has changed, it is pickled and
+# written to SNAPSHOT_DIR as a compressed file at the end of the first rerun
+# at least SNAPSHOT_INTERVAL seconds after the last save, and on logout.
+# Reruns that change nothing do no snapshot work. After a restart a user is
+# read back from disk the first time they log in, so only returning users are
+# ever loaded.
+SNAPSHOT_DIR = os.environ.get("PERSONA_VISTA_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_INTERVAL = float(os.environ.get("PERSONA_VISTA_SNAPSHOT_INTERVAL", "30"))
+SNAPSHOT_VERSION = 1
+# Rebuilt on demand from the rest of the user's data
+SNAPSHOT_EXCLUDED_KEYS = {'search_index', 'mood_columns', 'analysis_backfilled'}
+
+@st.cache_resource
+def get_snapshot_writer():
+    # A single writer thread keeps each user's snapshots in order
+    return {
+        'lock': threading.Lock(),
+        'pool': ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer"),
+        'digests': {},
+        'last_saved': {}
+    }
+
+def snapshot_path(username):
+    return os.path.join(SNAPSHOT_DIR, hashlib.sha256(username.encode()).hexdigest()[:32] + ".snap")
+
+def write_snapshot(username, payload):
+    writer = get_snapshot_writer()
+    blob = zlib.compress(payload)
+    digest = hashlib.sha256(blob).digest()
+    with writer['lock']:
+        if writer['digests'].get(username) == digest:
+            return
+    
+    # Write to a temporary file first so a crash never leaves a torn snapshot
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(username)
+    with open(path + ".tmp", "wb") as f:
+        f.write(blob)
+    os.replace(path + ".tmp", path)
+    with writer['lock']:
+        writer['digests'][username] = digest
+
+def snapshot_record(username):
+    user_data = st.session_state.users_db[username]
+    return {
+        'version': SNAPSHOT_VERSION,
+        'username': username,
+        'user_data': {key: value for key, value in user_data.items() if key not in SNAPSHOT_EXCLUDED_KEYS},
+        'session': {
+            'quiz_answers': st.session_state.quiz_answers,
+            'quiz_completed': st.session_state.quiz_completed
+        }
+    }
+
+def mark_user_changed():
+    # Called wherever the logged-in user's data or quiz progress changes
+    st.session_state.snapshot_dirty = True
+
+def save_user_snapshot(username, force=False):
+    # Saves at most once per SNAPSHOT_INTERVAL per user, and only after a
+    # change. A change inside the interval stays marked and is saved by the
+    # first rerun after it, or on logout; closing the tab inside the
+    # interval loses it.
+    if not SNAPSHOT_DIR or not (force or st.session_state.get('snapshot_dirty')):
+        return
+    writer = get_snapshot_writer()
+    with writer['lock']:
+        if not force and writer['last_saved'].get(username, -math.inf) + SNAPSHOT_INTERVAL > time.monotonic():
+            return
+        writer['last_saved'][username] = time.monotonic()
+    
+    # Pickled on the script thread, the only one that changes session data,
+    # so the writer gets a consistent copy; compressing and writing happen
+    # on the writer thread
+    payload = pickle.dumps(snapshot_record(username), protocol=pickle.HIGHEST_PROTOCOL)
+    st.session_state.snapshot_dirty = False
+    writer['pool'].submit(write_snapshot, username, payload)
+
+def load_user_snapshot(username):
+    try:
+        with open(snapshot_path(username), "rb") as f:
+            record = pickle.loads(zlib.decompress(f.read()))
+    except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+        return None
+    if record.get('version') != SNAPSHOT_VERSION or record.get('username') != username:
+        return None
+    return record
+
+def restore_user_snapshot(username, password):
+    record = load_user_snapshot(username) if SNAPSHOT_DIR else None
+    if record is None or record['user_data']['password'] != hash_password(password):
+        return False
+    
+    user_data = record['user_data']
+    st.session_state.users_db[username] = user_data
+    st.session_state.quiz_answers = record['session']['quiz_answers']
+    st.session_state.quiz_completed = record['session']['quiz_completed']
+    st.session_state.snapshot_dirty = False
+    register_user_profile(username, user_data)
+    record_population_result(username, user_data)
+    return True
 
 # Personality quiz questions and MBTI mapping
 PERSONALITY_QUESTIONS = [
@@ -146,42 +400,122 @@ MBTI_TYPES = {
     "ESFP": "The Entertainer - Spontaneous and enthusiastic performers"
 }
 
-def calculate_personality_scores(answers):
-    scores = {
-        "Extroversion": 0,
-        "Introversion": 0,
-        "Openness": 0,
-        "Conscientiousness": 0,
-        "Agreeableness": 0,
-        "Thinking": 0,
-        "Feeling": 0,
-        "Sensing": 0,
-        "Intuition": 0
-    }
-    
+# Trait order used by the scoring matrix (matches the scores dict shown to users)
+TRAIT_NAMES = [
+    "Extroversion",
+    "Introversion",
+    "Openness",
+    "Conscientiousness",
+    "Agreeableness",
+    "Thinking",
+    "Feeling",
+    "Sensing",
+    "Intuition"
+]
+TRAIT_INDEX = {trait: i for i, trait in enumerate(TRAIT_NAMES)}
+
+# Scoring engine: every (question, option) pair is one row of a weight matrix.
+# An option's trait can be a trait name (weight 1) or a {trait: weight} dict,
+# so weighted and multi-trait options score through the same matrix product.
+def build_scoring_matrix(questions):
+    offsets = np.zeros(len(questions), dtype=np.int64)
+    rows = 0
+    for i, question in enumerate(questions):
+        offsets[i] = rows
+        rows += len(question["options"])
+
+    weights = np.zeros((rows, len(TRAIT_NAMES)))
+    for i, question in enumerate(questions):
+        for option, trait in enumerate(question["traits"]):
+            option_weights = trait if isinstance(trait, dict) else {trait: 1}
+            for name, weight in option_weights.items():
+                weights[offsets[i] + option, TRAIT_INDEX[name]] += weight
+
+    return weights, offsets
+
+SCORING_MATRIX, QUESTION_OFFSETS = build_scoring_matrix(PERSONALITY_QUESTIONS)
+
+def split_answers(answers):
+    # Stored sheets outlive questionnaire edits: answers whose question or
+    # option no longer exists are split off instead of indexing a wrong row
+    valid, invalid = {}, {}
     for i, answer in answers.items():
-        question = PERSONALITY_QUESTIONS[i]
-        trait = question["traits"][answer]
-        scores[trait] += 1
-    
-    return scores
+        try:
+            question, option = int(i), int(answer)
+        except (TypeError, ValueError):
+            invalid[i] = answer
+            continue
+        if 0 <= question < len(PERSONALITY_QUESTIONS) and 0 <= option < len(PERSONALITY_QUESTIONS[question]["options"]):
+            valid[question] = option
+        else:
+            invalid[i] = answer
+    return valid, invalid
+
+def answers_to_matrix(answer_sheets):
+    # One-hot (sheet x question option) matrix; unanswered and invalid questions stay zero
+    selected = np.zeros((len(answer_sheets), SCORING_MATRIX.shape[0]))
+    for row, answers in enumerate(answer_sheets):
+        for question, option in split_answers(answers)[0].items():
+            selected[row, QUESTION_OFFSETS[question] + option] = 1
+    return selected
+
+def score_answer_sheets(answer_sheets):
+    return answers_to_matrix(answer_sheets) @ SCORING_MATRIX
+
+def scores_to_dict(score_row):
+    return {
+        trait: int(value) if float(value).is_integer() else float(value)
+        for trait, value in zip(TRAIT_NAMES, score_row)
+    }
+
+def calculate_personality_scores(answers):
+    return scores_to_dict(score_answer_sheets([answers])[0])
+
+def determine_mbti_batch(score_matrix):
+    score_matrix = np.asarray(score_matrix, dtype=float)
+    column = lambda trait: score_matrix[:, TRAIT_INDEX[trait]]
 
-def determine_mbti(scores):
-    mbti = ""
-    
     # Extroversion vs Introversion
-    mbti += "E" if scores["Extroversion"] > scores["Introversion"] else "I"
-    
+    letters = np.where(column("Extroversion") > column("Introversion"), "E", "I")
     # Sensing vs Intuition
-    mbti += "S" if scores["Sensing"] > scores["Intuition"] else "N"
-    
+    letters = np.char.add(letters, np.where(column("Sensing") > column("Intuition"), "S", "N"))
     # Thinking vs Feeling
-    mbti += "T" if scores["Thinking"] > scores["Feeling"] else "F"
-    
+    letters = np.char.add(letters, np.where(column("Thinking") > column("Feeling"), "T", "F"))
     # Judging vs Perceiving (using Conscientiousness as proxy for Judging)
-    mbti += "J" if scores["Conscientiousness"] > 2 else "P"
-    
-    return mbti
+    letters = np.char.add(letters, np.where(column("Conscientiousness") > 2, "J", "P"))
+
+    return [str(mbti) for mbti in letters]
+
+def determine_mbti(scores):
+    return determine_mbti_batch([[scores.get(trait, 0) for trait in TRAIT_NAMES]])[0]
+
+def rescore_all_users(users_db):
+    # Re-score every stored answer sheet in one pass, e.g. after a questionnaire change.
+    # Returns the number of sheets re-scored and, per user, the stored answers
+    # that no longer match a question and were left out of the scores.
+    usernames = [name for name, user in users_db.items()
+                 if user.get('quiz_results', {}).get('answers')]
+    if not usernames:
+        return 0, {}
+
+    answer_sheets = [users_db[name]['quiz_results']['answers'] for name in usernames]
+    skipped = {}
+    for name, answers in zip(usernames, answer_sheets):
+        invalid = split_answers(answers)[1]
+        if invalid:
+            skipped[name] = invalid
+
+    score_matrix = score_answer_sheets(answer_sheets)
+    mbti_types = determine_mbti_batch(score_matrix)
+
+    for name, score_row, mbti in zip(usernames, score_matrix, mbti_types):
+        scores = scores_to_dict(score_row)
+        results = users_db[name]['quiz_results']
+        results['scores'] = scores
+        results['mbti'] = mbti
+        results['suggestions'] = generate_personality_suggestions(scores, mbti)
+        users_db[name]['personality_data'] = scores
+    return len(usernames), skipped
 
 def generate_personality_suggestions(scores, mbti_type):
     suggestions = []
@@ -263,6 +597,113 @@ def generate_personality_suggestions(scores, mbti_type):
     
     return suggestions[:20]
 
+# Figure cache: built figures are shared across sessions with LRU eviction,
+# keyed by a hash of the chart inputs and theme. They are handed to
+# st.plotly_chart as-is, which only reads them, so a hit costs no rebuild.
+CHART_THEME = {
+    'plot_bgcolor': 'rgba(0,0,0,0)',
+    'paper_bgcolor': 'rgba(0,0,0,0)',
+    'font_color': 'white'
+}
+FIGURE_CACHE_SIZE = 256
+
+@st.cache_resource
+def get_figure_cache():
+    return {'lock': threading.Lock(), 'figures': OrderedDict()}
+
+def figure_cache_key(kind, inputs):
+    # Key order is kept: it decides the order of bars and slices
+    payload = json.dumps([kind, inputs, CHART_THEME], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def cached_figure(kind, build, *inputs):
+    cache = get_figure_cache()
+    key = figure_cache_key(kind, inputs)
+    
+    with cache['lock']:
+        fig = cache['figures'].get(key)
+        if fig is not None:
+            cache['figures'].move_to_end(key)
+            return fig
+    
+    with profile_step(f"figure:{kind}"):
+        fig = build(*inputs)
+        fig.update_layout(**CHART_THEME)
+    with cache['lock']:
+        cache['figures'][key] = fig
+        cache['figures'].move_to_end(key)
+        while len(cache['figures']) > FIGURE_CACHE_SIZE:
+            cache['figures'].popitem(last=False)
+    return fig
+
+def build_trait_pie(scores):
+    px = lazy_import("plotly.express")
+    # Filter out zero scores for cleaner visualization
+    filtered_scores = {k: v for k, v in scores.items() if v > 0}
+    
+    return px.pie(
+        values=list(filtered_scores.values()),
+        names=list(filtered_scores.keys()),
+        title="Your Personality Traits",
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+
+def build_trait_bar(scores):
+    px = lazy_import("plotly.express")
+    return px.bar(
+        x=list(scores.keys()),
+        y=list(scores.values()),
+        title="Personality Trait Scores",
+        color=list(scores.values()),
+        color_continuous_scale='viridis'
+    )
+
+# Ideal personality profile (balanced)
+IDEAL_SCORES = {
+    "Extroversion": 3,
+    "Introversion": 2,
+    "Openness": 4,
+    "Conscientiousness": 4,
+    "Agreeableness": 3,
+    "Thinking": 2,
+    "Feeling": 3,
+    "Sensing": 2,
+    "Intuition": 3
+}
+
+def build_personality_map(scores, ideal_scores):
+    go = lazy_import("plotly.graph_objects")
+    traits = list(scores.keys())
+    your_values = [scores.get(trait, 0) for trait in traits]
+    ideal_values = [ideal_scores.get(trait, 0) for trait in traits]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=your_values,
+        theta=traits,
+        fill='toself',
+        name='Your Personality',
+        line_color='cyan'
+    ))
+    fig.add_trace(go.Scatterpolar(
+        r=ideal_values,
+        theta=traits,
+        fill='toself',
+        name='Ideal Balance',
+        line_color='orange',
+        opacity=0.6
+    ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 5]
+            )),
+        showlegend=True
+    )
+    return fig
+
 # Navigation functions
 def show_back_button():
     if st.button("← Back", key="back_btn", help="Go back to main menu"):
@@ -319,6 +760,7 @@ def show_dashboard():
     col1, col2 = st.columns([10, 1])
     with col2:
         if st.button("Logout"):
+            save_user_snapshot(st.session_state.current_user, force=True)
             st.session_state.current_user = None
             st.session_state.page = 'login'
             st.rerun()
@@ -335,9 +777,13 @@ def show_dashboard():
         {"name": "💡 Suggestion Engine", "desc": "Personalized recommendations for books, careers, and hobbies", "page": "suggestions"},
         {"name": "🏆 Daily Challenges", "desc": "Daily personality development challenges", "page": "challenges"},
         {"name": "📝 Mood Journal", "desc": "Track your mood and reflect on your journey", "page": "journal"},
-        {"name": "💬 Quotes & Affirmations", "desc": "Inspirational quotes based on your personality", "page": "quotes"}
+        {"name": "💬 Quotes & Affirmations", "desc": "Inspirational quotes based on your personality", "page": "quotes"},
+        {"name": "📦 Import & Export", "desc": "Download your data or bring it over from another account", "page": "data"}
     ]
     
+    if PROFILING_ENABLED:
+        features.append({"name": "🛠️ Diagnostics", "desc": "Developer-only render timings", "page": "diagnostics"})
+    
     cols = st.columns(3)
     for i, feature in enumerate(features):
         with cols[i % 3]:
@@ -345,6 +791,29 @@ def show_dashboard():
                 navigate_to(feature['page'])
 
 # Personality Quiz
+def save_quiz_results(username, answers):
+    # Save results to user data
+    scores = calculate_personality_scores(answers)
+    mbti = determine_mbti(scores)
+    suggestions = generate_personality_suggestions(scores, mbti)
+    
+    user_data = st.session_state.users_db[username]
+    user_data['quiz_results'] = {
+        'answers': dict(answers),
+        'scores': scores,
+        'mbti': mbti,
+        'suggestions': suggestions,
+        'date': datetime.now().isoformat()
+    }
+    user_data['personality_data'] = scores
+    register_user_profile(username, user_data)
+    record_population_result(username, user_data)
+    mark_user_changed()
+
+# Questions are answered a page at a time inside a form, so the whole page
+# is submitted in one round trip instead of one rerun per question
+QUIZ_PAGE_SIZE = 10
+
 def show_quiz():
     show_back_button()
     st.title("🧩 Personality Assessment")
@@ -353,41 +822,38 @@ def show_quiz():
         st.write("Answer these questions to discover your personality type:")
         
         # Progress bar
-        current_question = len(st.session_state.quiz_answers)
-        progress = current_question / len(PERSONALITY_QUESTIONS)
-        st.progress(progress)
-        st.write(f"Question {current_question + 1} of {len(PERSONALITY_QUESTIONS)}")
+        answered = len(st.session_state.quiz_answers)
+        total = len(PERSONALITY_QUESTIONS)
+        st.progress(answered / total)
         
-        if current_question < len(PERSONALITY_QUESTIONS):
-            question_data = PERSONALITY_QUESTIONS[current_question]
-            
-            st.subheader(f"Q{current_question + 1}: {question_data['question']}")
-            
-            answer = st.radio(
-                "Choose your answer:",
-                range(len(question_data['options'])),
-                format_func=lambda x: question_data['options'][x],
-                key=f"q_{current_question}"
-            )
+        page_start = answered
+        page_end = min(page_start + QUIZ_PAGE_SIZE, total)
+        last_page = page_end == total
+        st.write(f"Questions {page_start + 1}-{page_end} of {total}")
+        
+        with st.form(key=f"quiz_page_{page_start}"):
+            page_answers = {}
+            for i in range(page_start, page_end):
+                question_data = PERSONALITY_QUESTIONS[i]
+                
+                st.subheader(f"Q{i + 1}: {question_data['question']}")
+                
+                page_answers[i] = st.radio(
+                    "Choose your answer:",
+                    range(len(question_data['options'])),
+                    format_func=lambda x, options=question_data['options']: options[x],
+                    key=f"q_{i}"
+                )
             
-            if st.button("Next Question", key=f"next_{current_question}"):
-                st.session_state.quiz_answers[current_question] = answer
-                if current_question + 1 == len(PERSONALITY_QUESTIONS):
-                    st.session_state.quiz_completed = True
-                    # Save results to user data
-                    scores = calculate_personality_scores(st.session_state.quiz_answers)
-                    mbti = determine_mbti(scores)
-                    suggestions = generate_personality_suggestions(scores, mbti)
-                    
-                    user_data = st.session_state.users_db[st.session_state.current_user]
-                    user_data['quiz_results'] = {
-                        'scores': scores,
-                        'mbti': mbti,
-                        'suggestions': suggestions,
-                        'date': datetime.now().isoformat()
-                    }
-                    user_data['personality_data'] = scores
-                st.rerun()
+            submitted = st.form_submit_button("Submit Quiz" if last_page else "Next Page")
+        
+        if submitted:
+            st.session_state.quiz_answers.update(page_answers)
+            mark_user_changed()
+            if last_page:
+                st.session_state.quiz_completed = True
+                save_quiz_results(st.session_state.current_user, st.session_state.quiz_answers)
+            st.rerun()
     else:
         st.success("Quiz completed! 🎉")
         st.write("You can now view your personality analysis and other features.")
@@ -418,37 +884,11 @@ def show_analysis():
     # Personality Scores Pie Chart
     st.subheader("Personality Trait Distribution")
     
-    # Filter out zero scores for cleaner visualization
-    filtered_scores = {k: v for k, v in scores.items() if v > 0}
-    
-    fig = px.pie(
-        values=list(filtered_scores.values()),
-        names=list(filtered_scores.keys()),
-        title="Your Personality Traits",
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white'
-    )
-    st.plotly_chart(fig)
+    st.plotly_chart(cached_figure('trait_pie', build_trait_pie, scores))
     
     # Bar Chart for detailed view
     st.subheader("Detailed Trait Scores")
-    fig_bar = px.bar(
-        x=list(scores.keys()),
-        y=list(scores.values()),
-        title="Personality Trait Scores",
-        color=list(scores.values()),
-        color_continuous_scale='viridis'
-    )
-    fig_bar.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white'
-    )
-    st.plotly_chart(fig_bar)
+    st.plotly_chart(cached_figure('trait_bar', build_trait_bar, scores))
     
     # Suggestions
     st.subheader("Personalized Suggestions")
@@ -457,6 +897,67 @@ def show_analysis():
     for i, suggestion in enumerate(suggestions[:10], 1):
         st.write(f"{i}. {suggestion}")
 
+# Population statistics: type counts and per-trait histograms over every
+# user's latest result, updated in place whenever a quiz completes
+POPULATION_BINS_PER_POINT = 2
+POPULATION_BINS = int(np.ceil(SCORING_MATRIX.clip(min=0).sum(axis=0).max() * POPULATION_BINS_PER_POINT)) + 1
+
+@st.cache_resource
+def get_population_stats():
+    return {
+        'lock': threading.Lock(),
+        'type_counts': {},
+        'histograms': np.zeros((len(TRAIT_NAMES), POPULATION_BINS), dtype=np.int64),
+        'members': {}
+    }
+
+def population_bins(scores):
+    values = np.asarray(scores_to_vector(scores), dtype=float) * POPULATION_BINS_PER_POINT
+    return np.clip(np.rint(values), 0, POPULATION_BINS - 1).astype(np.int64)
+
+def record_population_result(username, user_data):
+    results = user_data.get('quiz_results', {})
+    if not results.get('scores'):
+        return
+    
+    entry = (results['mbti'], tuple(population_bins(results['scores'])))
+    stats = get_population_stats()
+    traits = np.arange(len(TRAIT_NAMES))
+    with stats['lock']:
+        previous = stats['members'].get(username)
+        if previous == entry:
+            return
+        # A retake replaces the user's earlier contribution
+        if previous is not None:
+            stats['type_counts'][previous[0]] -= 1
+            stats['histograms'][traits, previous[1]] -= 1
+        stats['type_counts'][entry[0]] = stats['type_counts'].get(entry[0], 0) + 1
+        stats['histograms'][traits, entry[1]] += 1
+        stats['members'][username] = entry
+
+def population_comparison(scores, mbti):
+    stats = get_population_stats()
+    bins = population_bins(scores)
+    with stats['lock']:
+        histograms = stats['histograms'].copy()
+        total = len(stats['members'])
+        type_count = stats['type_counts'].get(mbti, 0)
+    
+    # Percentile counts half of the users tied with the score; the median is
+    # read from the cumulative histogram
+    cumulative = histograms.cumsum(axis=1)
+    rows = []
+    for i, trait in enumerate(TRAIT_NAMES):
+        below = cumulative[i, bins[i]] - histograms[i, bins[i]]
+        median_bin = np.searchsorted(cumulative[i], total / 2)
+        rows.append({
+            'Trait': trait,
+            'Your Score': scores.get(trait, 0),
+            'Percentile': int(round(100 * (below + histograms[i, bins[i]] / 2) / max(total, 1))),
+            'Population Median': float(median_bin / POPULATION_BINS_PER_POINT)
+        })
+    return rows, type_count, total
+
 # Personality Map
 def show_personality_map():
     show_back_button()
@@ -470,56 +971,20 @@ def show_personality_map():
     
     scores = user_data['quiz_results']['scores']
     
-    # Ideal personality profile (balanced)
-    ideal_scores = {
-        "Extroversion": 3,
-        "Introversion": 2,
-        "Openness": 4,
-        "Conscientiousness": 4,
-        "Agreeableness": 3,
-        "Thinking": 2,
-        "Feeling": 3,
-        "Sensing": 2,
-        "Intuition": 3
-    }
-    
     # Create comparison chart
     st.subheader("Your Personality vs Ideal Balance")
     
     traits = list(scores.keys())
-    your_values = [scores.get(trait, 0) for trait in traits]
-    ideal_values = [ideal_scores.get(trait, 0) for trait in traits]
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(
-        r=your_values,
-        theta=traits,
-        fill='toself',
-        name='Your Personality',
-        line_color='cyan'
-    ))
-    fig.add_trace(go.Scatterpolar(
-        r=ideal_values,
-        theta=traits,
-        fill='toself',
-        name='Ideal Balance',
-        line_color='orange',
-        opacity=0.6
-    ))
+    st.plotly_chart(cached_figure('personality_map', build_personality_map, scores, IDEAL_SCORES))
     
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 5]
-            )),
-        showlegend=True,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white'
-    )
+    # Population comparison
+    st.subheader("How You Compare")
+    mbti = user_data['quiz_results']['mbti']
+    record_population_result(st.session_state.current_user, user_data)
+    comparison, type_count, total_users = population_comparison(scores, mbti)
     
-    st.plotly_chart(fig)
+    st.write(f"**{mbti}** is shared by {type_count} of {total_users} users ({100 * type_count / max(total_users, 1):.0f}%)")
+    st.dataframe(comparison, hide_index=True)
     
     # Analysis
     st.subheader("Gap Analysis")
@@ -527,7 +992,7 @@ def show_personality_map():
     
     for trait in traits:
         your_score = scores.get(trait, 0)
-        ideal_score = ideal_scores.get(trait, 0)
+        ideal_score = IDEAL_SCORES.get(trait, 0)
         gap = ideal_score - your_score
         
         if gap > 1:
@@ -535,6 +1000,110 @@ def show_personality_map():
         elif gap < -1:
             st.write(f"📉 **{trait}**: You're strong in this area ({abs(gap)} points above ideal)")
 
+# Content catalog: games and quotes are read from JSONL files in content/
+# through a memory map and a line-offset index, so an item is fetched by id
+# without loading the catalog. Each user walks a catalog in a stored
+# permutation, so nothing repeats until every item has been seen. An empty
+# catalog has no items: the lookups return None and the pages say so.
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+
+def build_catalog_offsets(data):
+    offsets = array('Q', [0])
+    position = data.find(b"\n")
+    while position != -1:
+        offsets.append(position + 1)
+        position = data.find(b"\n", position + 1)
+    if offsets[-1] != len(data):
+        offsets.append(len(data))
+    return offsets
+
+def load_catalog_offsets(path, data):
+    # The index is cached next to the catalog and rebuilt when the catalog changes
+    index_path = path + ".idx"
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(path):
+        offsets = array('Q')
+        with open(index_path, 'rb') as f:
+            offsets.frombytes(f.read())
+        if offsets and offsets[-1] == len(data):
+            return offsets
+    
+    offsets = build_catalog_offsets(data)
+    try:
+        with open(index_path + ".tmp", 'wb') as f:
+            f.write(offsets.tobytes())
+        os.replace(index_path + ".tmp", index_path)
+    except OSError:
+        pass
+    return offsets
+
+@st.cache_resource
+def open_catalog(name):
+    path = os.path.join(CONTENT_DIR, f"{name}.jsonl")
+    with open(path, 'rb') as f:
+        # mmap refuses empty files
+        empty = os.fstat(f.fileno()).st_size == 0
+        data = b"" if empty else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return {'name': name, 'data': data, 'offsets': load_catalog_offsets(path, data)}
+
+def catalog_size(catalog):
+    return len(catalog['offsets']) - 1
+
+def catalog_item(catalog, item_id):
+    start, end = catalog['offsets'][item_id], catalog['offsets'][item_id + 1]
+    return json.loads(catalog['data'][start:end])
+
+CATALOG_PERMUTATION_ROUNDS = 4
+
+def new_catalog_permutation(size):
+    return {'size': size, 'seed': secrets.randbits(64), 'position': 0}
+
+def catalog_permuted_id(permutation):
+    # Keyed Feistel network over the smallest even bit width covering the
+    # catalog, cycle-walked back into range: a bijection on 0..size-1 that
+    # does not step through the catalog in a guessable pattern, and is still
+    # stored as three integers whatever the catalog size
+    size, seed = permutation['size'], permutation['seed']
+    half = max(((size - 1).bit_length() + 1) // 2, 1)
+    mask = (1 << half) - 1
+    value = permutation['position']
+    while True:
+        left, right = value >> half, value & mask
+        for round_number in range(CATALOG_PERMUTATION_ROUNDS):
+            digest = hashlib.blake2b(f"{seed}:{round_number}:{right}".encode(), digest_size=8).digest()
+            left, right = right, left ^ (int.from_bytes(digest, 'big') & mask)
+        value = (left << half) | right
+        if value < size:
+            return value
+
+def next_catalog_item(user_data, name):
+    catalog = open_catalog(name)
+    size = catalog_size(catalog)
+    if size == 0:
+        return None
+    permutations = user_data.setdefault('content_permutations', {})
+    permutation = permutations.get(name)
+    
+    # Permutations saved before the keyed scheme have no seed and start over
+    if (permutation is None or 'seed' not in permutation
+            or permutation['size'] != size or permutation['position'] >= size):
+        permutation = permutations[name] = new_catalog_permutation(size)
+    
+    item_id = catalog_permuted_id(permutation)
+    permutation['position'] += 1
+    mark_user_changed()
+    return catalog_item(catalog, item_id)
+
+def catalog_item_of_the_day(name, day=None):
+    catalog = open_catalog(name)
+    if catalog_size(catalog) == 0:
+        return None
+    day = day or date.today()
+    digest = hashlib.sha256(f"{name}:{day.isoformat()}".encode()).hexdigest()
+    return catalog_item(catalog, int(digest, 16) % catalog_size(catalog))
+
+def current_user_data():
+    return st.session_state.users_db[st.session_state.current_user]
+
 # Mini Games
 def show_games():
     show_back_button()
@@ -555,70 +1124,39 @@ def show_games():
 def show_would_you_rather():
     st.subheader("🤔 Would You Rather?")
     
-    scenarios = [
-        ("Be able to read minds", "Be able to see the future"),
-        ("Have unlimited creativity", "Have unlimited intelligence"),
-        ("Lead a team of 100 people", "Work alone on important projects"),
-        ("Travel back in time", "Travel to the future"),
-        ("Be famous for your achievements", "Be anonymous but help many people"),
-        ("Always tell the truth", "Always be tactful"),
-        ("Have perfect memory", "Have perfect intuition"),
-        ("Be extremely organized", "Be extremely spontaneous")
-    ]
-    
     if 'wyr_scenario' not in st.session_state:
-        st.session_state.wyr_scenario = random.choice(scenarios)
+        st.session_state.wyr_scenario = next_catalog_item(current_user_data(), "would_you_rather")
     
     scenario = st.session_state.wyr_scenario
+    if scenario is None:
+        del st.session_state.wyr_scenario
+        st.info("No scenarios available yet.")
+        return
     st.write(f"**Would you rather...**")
     
-    choice = st.radio("", [scenario[0], scenario[1]], key="wyr_choice")
+    choice = st.radio("", scenario['options'], key="wyr_choice")
     
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Next Scenario"):
-            st.session_state.wyr_scenario = random.choice(scenarios)
+            st.session_state.wyr_scenario = next_catalog_item(current_user_data(), "would_you_rather")
             st.rerun()
     
     with col2:
         if st.button("See Insight"):
-            insights = {
-                scenarios[0]: "This choice reflects your preference for understanding others vs. planning ahead.",
-                scenarios[1]: "This shows whether you value artistic expression or analytical thinking more.",
-                scenarios[2]: "This indicates your leadership style and social preferences.",
-                scenarios[3]: "This reveals your relationship with time and change.",
-                scenarios[4]: "This shows your values regarding recognition vs. impact.",
-                scenarios[5]: "This reflects your communication style and values.",
-                scenarios[6]: "This indicates whether you trust logic or intuition more.",
-                scenarios[7]: "This shows your approach to structure vs. flexibility."
-            }
-            st.info(insights.get(scenario, "Every choice reveals something about your personality!"))
+            st.info(scenario.get('insight') or "Every choice reveals something about your personality!")
 
 def show_moral_dilemmas():
     st.subheader("⚖️ Moral Dilemmas")
     
-    dilemmas = [
-        {
-            "situation": "You find a wallet with $500 and an ID. No one is around.",
-            "options": ["Return it immediately", "Take the money, return the wallet", "Keep everything", "Try to find the owner personally"],
-            "insight": "This reveals your moral compass and integrity levels."
-        },
-        {
-            "situation": "Your friend asks you to lie to their partner about where they were last night.",
-            "options": ["Lie to help your friend", "Refuse and stay out of it", "Tell your friend to be honest", "Tell the partner the truth"],
-            "insight": "This shows how you balance loyalty vs. honesty."
-        },
-        {
-            "situation": "You can save either one person you know or five strangers.",
-            "options": ["Save the person you know", "Save the five strangers", "Try to save everyone", "Cannot decide"],
-            "insight": "This reveals your decision-making process under pressure."
-        }
-    ]
+    if 'dilemma' not in st.session_state:
+        st.session_state.dilemma = next_catalog_item(current_user_data(), "moral_dilemmas")
     
-    if 'dilemma_index' not in st.session_state:
-        st.session_state.dilemma_index = 0
-    
-    dilemma = dilemmas[st.session_state.dilemma_index % len(dilemmas)]
+    dilemma = st.session_state.dilemma
+    if dilemma is None:
+        del st.session_state.dilemma
+        st.info("No dilemmas available yet.")
+        return
     
     st.write(f"**Situation:** {dilemma['situation']}")
     choice = st.radio("What would you do?", dilemma['options'])
@@ -626,7 +1164,7 @@ def show_moral_dilemmas():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Next Dilemma"):
-            st.session_state.dilemma_index += 1
+            st.session_state.dilemma = next_catalog_item(current_user_data(), "moral_dilemmas")
             st.rerun()
     
     with col2:
@@ -636,18 +1174,14 @@ def show_moral_dilemmas():
 def show_fantasy_quotes():
     st.subheader("✨ Fantasy Quotes Challenge")
     
-    quotes = [
-        {"quote": "The cave you fear to enter holds the treasure you seek.", "author": "Joseph Campbell"},
-        {"quote": "It is during our darkest moments that we must focus to see the light.", "author": "Aristotle"},
-        {"quote": "The only impossible journey is the one you never begin.", "author": "Tony Robbins"},
-        {"quote": "Be yourself; everyone else is already taken.", "author": "Oscar Wilde"},
-        {"quote": "In the middle of difficulty lies opportunity.", "author": "Albert Einstein"}
-    ]
+    if 'fantasy_quote' not in st.session_state:
+        st.session_state.fantasy_quote = next_catalog_item(current_user_data(), "fantasy_quotes")
     
-    if 'quote_index' not in st.session_state:
-        st.session_state.quote_index = 0
-    
-    quote_data = quotes[st.session_state.quote_index % len(quotes)]
+    quote_data = st.session_state.fantasy_quote
+    if quote_data is None:
+        del st.session_state.fantasy_quote
+        st.info("No quotes available yet.")
+        return
     
     st.markdown(f"### *\"{quote_data['quote']}\"*")
     st.markdown(f"**— {quote_data['author']}**")
@@ -658,12 +1192,12 @@ def show_fantasy_quotes():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Next Quote"):
-            st.session_state.quote_index += 1
+            st.session_state.fantasy_quote = next_catalog_item(current_user_data(), "fantasy_quotes")
             st.rerun()
     
     with col2:
         if reflection and st.button("Save Reflection"):
-            user_data = st.session_state.users_db[st.session_state.current_user]
+            user_data = current_user_data()
             if 'reflections' not in user_data:
                 user_data['reflections'] = []
             user_data['reflections'].append({
@@ -672,6 +1206,10 @@ def show_fantasy_quotes():
                 'reflection': reflection,
                 'date': datetime.now().isoformat()
             })
+            reflection_entry = user_data['reflections'][-1]
+            index_user_document(user_data, 'reflection', reflection_entry['date'],
+                                reflection, f"\"{quote_data['quote']}\"")
+            mark_user_changed()
             st.success("Reflection saved!")
 
 def show_personality_quiz_game():
@@ -723,6 +1261,90 @@ def show_relaxation():
     elif tool == "Nature Sounds":
         show_nature_sounds()
 
+# Relaxation timers: each session stores only its start timestamp. Animations
+# run in the browser and fragments re-run on a slow tick to check progress,
+# so the script thread never sleeps while a user relaxes.
+BREATHING_CYCLES = 5
+BREATHING_CYCLE_SECONDS = 12
+MUSCLE_STEP_SECONDS = 2
+TIMER_CHECK_SECONDS = 5
+
+def start_timer(name, duration):
+    if 'relax_timers' not in st.session_state:
+        st.session_state.relax_timers = {}
+    st.session_state.relax_timers[name] = {'start': time.time(), 'duration': duration}
+
+def get_timer(name):
+    return st.session_state.get('relax_timers', {}).get(name)
+
+def stop_timer(name):
+    st.session_state.get('relax_timers', {}).pop(name, None)
+
+def timer_elapsed(timer):
+    return time.time() - timer['start']
+
+def timer_finished(timer):
+    return timer_elapsed(timer) >= timer['duration']
+
+BREATHING_ANIMATION = """
+<style>
+    @keyframes breathe-size {
+        0% { width: 100px; height: 100px; background: radial-gradient(circle, #4CAF50, #2E7D32); }
+        33% { width: 180px; height: 180px; background: radial-gradient(circle, #4CAF50, #2E7D32); }
+        34% { width: 180px; height: 180px; background: radial-gradient(circle, #FF9800, #F57C00); }
+        66% { width: 180px; height: 180px; background: radial-gradient(circle, #FF9800, #F57C00); }
+        67% { width: 180px; height: 180px; background: radial-gradient(circle, #2196F3, #1976D2); }
+        100% { width: 100px; height: 100px; background: radial-gradient(circle, #2196F3, #1976D2); }
+    }
+    @keyframes breathe-inhale { 0%, 33% { opacity: 1; } 34%, 100% { opacity: 0; } }
+    @keyframes breathe-hold { 0%, 33% { opacity: 0; } 34%, 66% { opacity: 1; } 67%, 100% { opacity: 0; } }
+    @keyframes breathe-exhale { 0%, 66% { opacity: 0; } 67%, 100% { opacity: 1; } }
+    .breathe-box { position: relative; height: 260px; text-align: center; }
+    .breathe-circle {
+        border-radius: 50%; margin: 0 auto;
+        animation: breathe-size __CYCLE__s linear __DELAY__s __CYCLES__;
+    }
+    .breathe-label {
+        position: absolute; top: 200px; left: 0; right: 0; font-size: 18px; opacity: 0;
+        animation-duration: __CYCLE__s; animation-delay: __DELAY__s;
+        animation-iteration-count: __CYCLES__; animation-timing-function: step-end;
+    }
+    .breathe-label.inhale { animation-name: breathe-inhale; }
+    .breathe-label.hold { animation-name: breathe-hold; }
+    .breathe-label.exhale { animation-name: breathe-exhale; }
+</style>
+<div class="breathe-box">
+    <div class="breathe-circle"></div>
+    <p class="breathe-label inhale"><b>INHALE</b> - Breathe in slowly...</p>
+    <p class="breathe-label hold"><b>HOLD</b> - Hold your breath...</p>
+    <p class="breathe-label exhale"><b>EXHALE</b> - Breathe out slowly...</p>
+</div>
+"""
+
+COUNTDOWN_WIDGET = """
+<div id="countdown" style="text-align: center; font-size: 28px; font-weight: bold; color: white; font-family: sans-serif;"></div>
+<script>
+    const end = __END__;
+    function tick() {
+        const remaining = Math.max(0, Math.round((end - Date.now()) / 1000));
+        const mins = String(Math.floor(remaining / 60)).padStart(2, "0");
+        const secs = String(remaining % 60).padStart(2, "0");
+        document.getElementById("countdown").textContent = `Time remaining: ${mins}:${secs}`;
+        if (remaining > 0) setTimeout(tick, 250);
+    }
+    tick();
+</script>
+"""
+
+@st.fragment(run_every=TIMER_CHECK_SECONDS)
+def breathing_status():
+    timer = get_timer('breathing')
+    if timer and timer_finished(timer):
+        stop_timer('breathing')
+        st.session_state.breathing_active = False
+        st.session_state.breathing_done = True
+        st.rerun()
+
 def show_breathing_exercise():
     st.subheader("🫁 Breathing Exercise")
     st.write("Follow the breathing pattern: 4 seconds in, 4 seconds hold, 4 seconds out")
@@ -736,71 +1358,47 @@ def show_breathing_exercise():
         if not st.session_state.breathing_active:
             if st.button("Start Breathing Exercise"):
                 st.session_state.breathing_active = True
+                st.session_state.breathing_done = False
+                start_timer('breathing', BREATHING_CYCLES * BREATHING_CYCLE_SECONDS)
                 st.rerun()
         else:
             if st.button("Stop Exercise"):
                 st.session_state.breathing_active = False
+                stop_timer('breathing')
                 st.rerun()
     
-    if st.session_state.breathing_active:
-        # Animated breathing guide
-        placeholder = st.empty()
-        
-        for cycle in range(5):  # 5 breathing cycles
-            # Inhale
-            for i in range(4):
-                with placeholder.container():
-                    st.markdown(f"""
-                    <div style="text-align: center;">
-                        <div style="width: {100 + i*20}px; height: {100 + i*20}px; 
-                             background: radial-gradient(circle, #4CAF50, #2E7D32);
-                             border-radius: 50%; margin: 0 auto; 
-                             display: flex; align-items: center; justify-content: center;
-                             font-size: 24px; color: white; font-weight: bold;">
-                            INHALE
-                        </div>
-                        <p style="margin-top: 20px; font-size: 18px;">Breathe in slowly...</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                time.sleep(1)
-            
-            # Hold
-            for i in range(4):
-                with placeholder.container():
-                    st.markdown(f"""
-                    <div style="text-align: center;">
-                        <div style="width: 180px; height: 180px; 
-                             background: radial-gradient(circle, #FF9800, #F57C00);
-                             border-radius: 50%; margin: 0 auto; 
-                             display: flex; align-items: center; justify-content: center;
-                             font-size: 24px; color: white; font-weight: bold;">
-                            HOLD
-                        </div>
-                        <p style="margin-top: 20px; font-size: 18px;">Hold your breath...</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                time.sleep(1)
-            
-            # Exhale
-            for i in range(4):
-                with placeholder.container():
-                    st.markdown(f"""
-                    <div style="text-align: center;">
-                        <div style="width: {180 - i*20}px; height: {180 - i*20}px; 
-                             background: radial-gradient(circle, #2196F3, #1976D2);
-                             border-radius: 50%; margin: 0 auto; 
-                             display: flex; align-items: center; justify-content: center;
-                             font-size: 24px; color: white; font-weight: bold;">
-                            EXHALE
-                        </div>
-                        <p style="margin-top: 20px; font-size: 18px;">Breathe out slowly...</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                time.sleep(1)
-        
-        st.session_state.breathing_active = False
+    timer = get_timer('breathing')
+    if st.session_state.breathing_active and timer:
+        # Animated breathing guide, resumed at the current phase after a rerun
+        st.markdown(
+            BREATHING_ANIMATION
+            .replace("__CYCLE__", str(BREATHING_CYCLE_SECONDS))
+            .replace("__CYCLES__", str(BREATHING_CYCLES))
+            .replace("__DELAY__", f"{-timer_elapsed(timer):.2f}"),
+            unsafe_allow_html=True
+        )
+        breathing_status()
+    elif st.session_state.get('breathing_done'):
         st.success("Breathing exercise completed! 🌟")
 
+def show_muscle_steps(muscle_groups, steps_shown):
+    for i, group in enumerate(muscle_groups[:steps_shown]):
+        st.write(f"**Step {i+1}: {group}**")
+        st.write("Tense these muscles for 5 seconds, then relax...")
+
+@st.fragment(run_every=MUSCLE_STEP_SECONDS)
+def muscle_relaxation_steps(muscle_groups):
+    # Only rendered while a session runs; the full rerun at the end drops
+    # the fragment and with it the tick
+    timer = get_timer('muscle_relaxation')
+    if not timer or timer_finished(timer):
+        stop_timer('muscle_relaxation')
+        st.session_state.muscle_relaxation_done = bool(timer)
+        st.rerun()
+    
+    steps_shown = min(len(muscle_groups), int(timer_elapsed(timer) // MUSCLE_STEP_SECONDS) + 1)
+    show_muscle_steps(muscle_groups, steps_shown)
+
 def show_muscle_relaxation():
     st.subheader("💪 Progressive Muscle Relaxation")
     st.write("Tense and relax each muscle group for 5 seconds")
@@ -819,28 +1417,46 @@ def show_muscle_relaxation():
     ]
     
     if st.button("Start Relaxation"):
-        for i, group in enumerate(muscle_groups):
-            st.write(f"**Step {i+1}: {group}**")
-            st.write("Tense these muscles for 5 seconds, then relax...")
-            time.sleep(2)  # Shorter delay for demo
+        st.session_state.muscle_relaxation_done = False
+        start_timer('muscle_relaxation', len(muscle_groups) * MUSCLE_STEP_SECONDS)
+    
+    if get_timer('muscle_relaxation'):
+        muscle_relaxation_steps(muscle_groups)
+    elif st.session_state.get('muscle_relaxation_done'):
+        show_muscle_steps(muscle_groups, len(muscle_groups))
         st.success("Progressive muscle relaxation completed!")
 
+@st.fragment(run_every=TIMER_CHECK_SECONDS)
+def mindfulness_status():
+    timer = get_timer('mindfulness')
+    if timer and timer_finished(timer):
+        stop_timer('mindfulness')
+        st.session_state.mindfulness_done = True
+        st.rerun()
+
 def show_mindfulness_timer():
     st.subheader("⏰ Mindfulness Timer")
     
     duration = st.slider("Select duration (minutes):", 1, 30, 5)
     
     if st.button("Start Mindfulness Session"):
-        st.info(f"Mindfulness session started for {duration} minutes")
+        st.session_state.mindfulness_done = False
+        start_timer('mindfulness', duration * 60)
+    
+    timer = get_timer('mindfulness')
+    if timer:
+        st.info(f"Mindfulness session started for {timer['duration'] // 60} minutes")
         st.write("Focus on your breathing and stay present in the moment...")
         
-        # Simple countdown display
-        with st.empty():
-            for remaining in range(duration * 60, 0, -1):
-                mins, secs = divmod(remaining, 60)
-                st.markdown(f"### Time remaining: {mins:02d}:{secs:02d}")
-                time.sleep(1)
+        # Countdown runs in the browser against the session end time
+        end_ms = int((timer['start'] + timer['duration']) * 1000)
+        components.html(COUNTDOWN_WIDGET.replace("__END__", str(end_ms)), height=60)
         
+        if st.button("End Session"):
+            stop_timer('mindfulness')
+            st.rerun()
+        mindfulness_status()
+    elif st.session_state.get('mindfulness_done'):
         st.success("Mindfulness session completed! 🧘‍♀️")
 
 def show_nature_sounds():
@@ -873,6 +1489,150 @@ def show_nature_sounds():
         elif "wind" in selected_sound:
             st.markdown("💨🍃 *Gentle breeze through the trees* 🍃💨")
 
+# Recommendation engine: users and catalog items are embedded as trait
+# vectors and matched by cosine similarity against a shared neighbour index
+SUGGESTIONS_DB = {
+    "Books": {
+        "INTJ": ["Thinking, Fast and Slow", "The Art of War", "Sapiens", "1984"],
+        "ENFP": ["Big Magic", "The Alchemist", "Wild", "Eat Pray Love"],
+        "ISTJ": ["Good to Great", "The 7 Habits", "Getting Things Done", "Atomic Habits"],
+        "ESFP": ["The Happiness Project", "Yes Please", "Bossypants", "Wild"]
+    },
+    "Hobbies": {
+        "INTJ": ["Chess", "Strategy games", "Programming", "Reading philosophy"],
+        "ENFP": ["Creative writing", "Photography", "Travel blogging", "Improv theater"],
+        "ISTJ": ["Gardening", "Model building", "Historical research", "Organizing"],
+        "ESFP": ["Dancing", "Party planning", "Fashion", "Social media content creation"]
+    },
+    "Career Paths": {
+        "INTJ": ["Software architect", "Research scientist", "Strategic consultant", "Systems analyst"],
+        "ENFP": ["Marketing creative", "Counselor", "Entrepreneur", "Journalist"],
+        "ISTJ": ["Accountant", "Project manager", "Administrator", "Quality assurance"],
+        "ESFP": ["Event coordinator", "Sales representative", "Teacher", "Performer"]
+    },
+    "Games": {
+        "INTJ": ["Complex strategy games", "Puzzle games", "Chess variants", "Simulation games"],
+        "ENFP": ["Party games", "Collaborative games", "Creative games", "Adventure games"],
+        "ISTJ": ["Logic puzzles", "Traditional board games", "Solitaire variants", "Organization games"],
+        "ESFP": ["Social games", "Active games", "Music games", "Improvisational games"]
+    }
+}
+
+RECOMMENDATION_NEIGHBOURS = 25
+
+class BruteForceIndex:
+    # Exact nearest neighbours over a growable NumPy matrix. Any object with
+    # the same add/search methods (e.g. an ANN library wrapper) can replace it.
+    def __init__(self, dim):
+        self.keys = []
+        self.positions = {}
+        self.vectors = np.zeros((64, dim))
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def add(self, key, vector):
+        vector = np.asarray(vector, dtype=float)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+        
+        position = self.positions.get(key)
+        if position is None:
+            position = len(self.keys)
+            if position == len(self.vectors):
+                self.vectors = np.vstack([self.vectors, np.zeros_like(self.vectors)])
+            self.keys.append(key)
+            self.positions[key] = position
+        self.vectors[position] = vector
+    
+    def search(self, vector, k, exclude=None):
+        if not self.keys:
+            return []
+        vector = np.asarray(vector, dtype=float)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return []
+        
+        similarities = self.vectors[:len(self.keys)] @ (vector / norm)
+        if exclude in self.positions:
+            similarities[self.positions[exclude]] = -np.inf
+        
+        top = np.argpartition(-similarities, min(k, len(self.keys)) - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(self.keys[i], float(similarities[i])) for i in top if similarities[i] > -np.inf]
+
+def scores_to_vector(scores):
+    return [scores.get(trait, 0) for trait in TRAIT_NAMES]
+
+def mbti_profile_vector(mbti):
+    profile = dict.fromkeys(TRAIT_NAMES, 0)
+    profile["Extroversion" if mbti[0] == "E" else "Introversion"] = 1
+    profile["Sensing" if mbti[1] == "S" else "Intuition"] = 1
+    profile["Thinking" if mbti[2] == "T" else "Feeling"] = 1
+    profile["Conscientiousness" if mbti[3] == "J" else "Openness"] = 1
+    return scores_to_vector(profile)
+
+def build_item_indexes():
+    # Each item's profile is the mean profile of the types it is curated for
+    indexes = {}
+    for category, by_type in SUGGESTIONS_DB.items():
+        profiles = {}
+        for mbti, items in by_type.items():
+            for item in items:
+                profiles.setdefault(item, []).append(mbti_profile_vector(mbti))
+        index = BruteForceIndex(len(TRAIT_NAMES))
+        for item, vectors in profiles.items():
+            index.add(item, np.mean(vectors, axis=0))
+        indexes[category] = index
+    return indexes
+
+@st.cache_resource
+def get_recommender():
+    return {
+        'lock': threading.Lock(),
+        'users': BruteForceIndex(len(TRAIT_NAMES)),
+        'items': build_item_indexes(),
+        'likes': {}
+    }
+
+def register_user_profile(username, user_data):
+    scores = user_data.get('quiz_results', {}).get('scores')
+    if not scores:
+        return
+    recommender = get_recommender()
+    with recommender['lock']:
+        recommender['users'].add(username, scores_to_vector(scores))
+        recommender['likes'][username] = {
+            category: set(items) for category, items in user_data.get('liked_suggestions', {}).items()
+        }
+
+def like_suggestion(username, user_data, category, suggestion):
+    liked = user_data.setdefault('liked_suggestions', {}).setdefault(category, [])
+    if suggestion not in liked:
+        liked.append(suggestion)
+        mark_user_changed()
+    recommender = get_recommender()
+    with recommender['lock']:
+        recommender['likes'].setdefault(username, {}).setdefault(category, set()).add(suggestion)
+
+def recommend_items(category, scores, k):
+    recommender = get_recommender()
+    with recommender['lock']:
+        matches = recommender['items'][category].search(scores_to_vector(scores), k)
+    return [item for item, _ in matches]
+
+def recommend_from_peers(username, scores, category, k=5, exclude=()):
+    # Items liked by the most similar users, weighted by their similarity
+    recommender = get_recommender()
+    with recommender['lock']:
+        neighbours = recommender['users'].search(scores_to_vector(scores), RECOMMENDATION_NEIGHBOURS, exclude=username)
+        votes = {}
+        for neighbour, similarity in neighbours:
+            for item in recommender['likes'].get(neighbour, {}).get(category, ()):
+                if item not in exclude:
+                    votes[item] = votes.get(item, 0) + similarity
+    return [item for item, _ in sorted(votes.items(), key=lambda x: x[1], reverse=True)[:k]]
+
 # Suggestion Engine
 def show_suggestions():
     show_back_button()
@@ -886,42 +1646,17 @@ def show_suggestions():
     
     mbti = user_data['quiz_results']['mbti']
     scores = user_data['quiz_results']['scores']
+    register_user_profile(st.session_state.current_user, user_data)
     
     st.subheader(f"Suggestions for {mbti} personality type:")
     
     category = st.selectbox("Choose category:", 
                            ["Books", "Hobbies", "Career Paths", "Games", "Learning Resources", "Social Activities"])
     
-    suggestions_db = {
-        "Books": {
-            "INTJ": ["Thinking, Fast and Slow", "The Art of War", "Sapiens", "1984"],
-            "ENFP": ["Big Magic", "The Alchemist", "Wild", "Eat Pray Love"],
-            "ISTJ": ["Good to Great", "The 7 Habits", "Getting Things Done", "Atomic Habits"],
-            "ESFP": ["The Happiness Project", "Yes Please", "Bossypants", "Wild"]
-        },
-        "Hobbies": {
-            "INTJ": ["Chess", "Strategy games", "Programming", "Reading philosophy"],
-            "ENFP": ["Creative writing", "Photography", "Travel blogging", "Improv theater"],
-            "ISTJ": ["Gardening", "Model building", "Historical research", "Organizing"],
-            "ESFP": ["Dancing", "Party planning", "Fashion", "Social media content creation"]
-        },
-        "Career Paths": {
-            "INTJ": ["Software architect", "Research scientist", "Strategic consultant", "Systems analyst"],
-            "ENFP": ["Marketing creative", "Counselor", "Entrepreneur", "Journalist"],
-            "ISTJ": ["Accountant", "Project manager", "Administrator", "Quality assurance"],
-            "ESFP": ["Event coordinator", "Sales representative", "Teacher", "Performer"]
-        },
-        "Games": {
-            "INTJ": ["Complex strategy games", "Puzzle games", "Chess variants", "Simulation games"],
-            "ENFP": ["Party games", "Collaborative games", "Creative games", "Adventure games"],
-            "ISTJ": ["Logic puzzles", "Traditional board games", "Solitaire variants", "Organization games"],
-            "ESFP": ["Social games", "Active games", "Music games", "Improvisational games"]
-        }
-    }
-    
     # Get suggestions for the category
-    if category in suggestions_db:
-        mbti_suggestions = suggestions_db[category].get(mbti, [])
+    if category in SUGGESTIONS_DB:
+        # Types without a curated list get the items whose profile is closest to theirs
+        mbti_suggestions = SUGGESTIONS_DB[category].get(mbti) or recommend_items(category, scores, 4)
         
         # Add some general suggestions based on personality scores
         general_suggestions = []
@@ -933,8 +1668,21 @@ def show_suggestions():
         all_suggestions = mbti_suggestions + general_suggestions
         
         st.subheader(f"{category} Recommendations:")
+        liked = set(user_data.get('liked_suggestions', {}).get(category, []))
         for i, suggestion in enumerate(all_suggestions[:8], 1):
-            st.write(f"{i}. {suggestion}")
+            col1, col2 = st.columns([10, 1])
+            with col1:
+                st.write(f"{i}. {suggestion}")
+            with col2:
+                if suggestion not in liked and st.button("👍", key=f"like_{category}_{i}", help="I enjoyed this"):
+                    like_suggestion(st.session_state.current_user, user_data, category, suggestion)
+                    st.rerun()
+        
+        peer_suggestions = recommend_from_peers(st.session_state.current_user, scores, category, exclude=liked)
+        if peer_suggestions:
+            st.subheader("People like you enjoyed:")
+            for suggestion in peer_suggestions:
+                st.write(f"• {suggestion}")
     
     # Additional personalized suggestions
     st.subheader("Based on your personality traits:")
@@ -942,8 +1690,101 @@ def show_suggestions():
     
     for i, suggestion in enumerate(trait_suggestions[:5], 1):
         st.write(f"• {suggestion}")
+    
+    # Suggestions from what the user has been writing lately
+    backfill_analysis(user_data)
+    insights = journal_insights(user_data)
+    if insights:
+        st.subheader("Based on your recent journal:")
+        tone = describe_sentiment(insights['sentiment'])
+        st.write(f"Your last {insights['entries']} entries read as mostly **{tone}**.")
+        if tone == "negative":
+            st.write("• Try a breathing exercise or body scan from the Relaxation Tools")
+            st.write("• Reach out to a friend or someone you trust today")
+            st.write("• Keep tomorrow's plans small and achievable")
+        elif tone == "positive":
+            st.write("• Note what went well so you can repeat it")
+            st.write("• Share some of that energy by helping someone else")
+        if insights['keywords']:
+            st.write(f"• On your mind lately: {', '.join(insights['keywords'])}")
 
 # Daily Challenges
+CHALLENGES = [
+    "Start a conversation with someone new today",
+    "Practice active listening in all your conversations",
+    "Take on a small leadership role in a group setting",
+    "Try a creative activity for 30 minutes",
+    "Help someone without being asked",
+    "Practice mindfulness for 10 minutes",
+    "Write down 3 things you're grateful for",
+    "Step out of your comfort zone in a small way",
+    "Give a genuine compliment to 3 people",
+    "Organize one area of your living/work space"
+]
+RECENT_CHALLENGES = 7
+
+# Challenge tracker: counters, streaks and the last few completions are kept
+# up to date as challenges are completed, and challenges are dealt from a
+# shuffled cycle so none repeats until all have been seen
+def new_challenge_stats():
+    return {
+        'completed': 0,
+        'current_streak': 0,
+        'longest_streak': 0,
+        'last_completed': None,
+        'recent': deque(maxlen=RECENT_CHALLENGES),
+        'cycle': [],
+        'cycle_position': 0,
+        # Index of the challenge dealt last, whichever cycle it came from
+        'last_served': None
+    }
+
+def record_challenge_completion(stats, date_str):
+    if stats['last_completed'] == date_str:
+        return
+    
+    previous_day = (date.fromisoformat(date_str) - timedelta(days=1)).isoformat()
+    if stats['last_completed'] == previous_day:
+        stats['current_streak'] += 1
+    else:
+        stats['current_streak'] = 1
+    
+    stats['completed'] += 1
+    stats['longest_streak'] = max(stats['longest_streak'], stats['current_streak'])
+    stats['last_completed'] = date_str
+    stats['recent'].append(date_str)
+
+def get_challenge_stats(user_data):
+    stats = user_data.get('challenge_stats')
+    if stats is None:
+        # One pass over the history for users who predate the tracker
+        stats = new_challenge_stats()
+        for date_str, challenge in sorted(user_data['daily_challenges'].items()):
+            if challenge['completed']:
+                record_challenge_completion(stats, date_str)
+        user_data['challenge_stats'] = stats
+    return stats
+
+def current_challenge_streak(stats, today):
+    # A streak survives until a full day passes without a completion
+    yesterday = (date.fromisoformat(today) - timedelta(days=1)).isoformat()
+    return stats['current_streak'] if stats['last_completed'] in (today, yesterday) else 0
+
+def next_challenge(stats):
+    if stats['cycle_position'] >= len(stats['cycle']) or len(stats['cycle']) != len(CHALLENGES):
+        cycle = list(range(len(CHALLENGES)))
+        random.shuffle(cycle)
+        # Avoid repeating yesterday's challenge across a cycle boundary
+        if len(cycle) > 1 and cycle[0] == stats.get('last_served'):
+            cycle[0], cycle[-1] = cycle[-1], cycle[0]
+        stats['cycle'] = cycle
+        stats['cycle_position'] = 0
+    
+    index = stats['cycle'][stats['cycle_position']]
+    stats['cycle_position'] += 1
+    stats['last_served'] = index
+    return CHALLENGES[index]
+
 def show_challenges():
     show_back_button()
     st.title("🏆 Daily Personality Challenges")
@@ -953,27 +1794,16 @@ def show_challenges():
     
     if 'daily_challenges' not in user_data:
         user_data['daily_challenges'] = {}
+    stats = get_challenge_stats(user_data)
     
     # Generate today's challenge if not exists
     if today not in user_data['daily_challenges']:
-        challenges = [
-            "Start a conversation with someone new today",
-            "Practice active listening in all your conversations",
-            "Take on a small leadership role in a group setting",
-            "Try a creative activity for 30 minutes",
-            "Help someone without being asked",
-            "Practice mindfulness for 10 minutes",
-            "Write down 3 things you're grateful for",
-            "Step out of your comfort zone in a small way",
-            "Give a genuine compliment to 3 people",
-            "Organize one area of your living/work space"
-        ]
-        
         user_data['daily_challenges'][today] = {
-            'challenge': random.choice(challenges),
+            'challenge': next_challenge(stats),
             'completed': False,
             'reflection': ''
         }
+        mark_user_changed()
     
     today_challenge = user_data['daily_challenges'][today]
     
@@ -986,6 +1816,12 @@ def show_challenges():
         if st.button("Mark as Completed"):
             today_challenge['completed'] = True
             today_challenge['reflection'] = reflection
+            record_challenge_completion(stats, today)
+            mark_user_changed()
+            if reflection:
+                queue_analysis([(today_challenge, reflection, None, 0)])
+            index_user_document(user_data, 'challenge', today,
+                                f"{today_challenge['challenge']} {reflection}", today_challenge['challenge'])
             st.success("Challenge completed! Well done! 🌟")
             st.rerun()
     else:
@@ -996,13 +1832,18 @@ def show_challenges():
     
     # Challenge history
     st.subheader("Challenge History")
-    completed_challenges = [(date_str, data) for date_str, data in user_data['daily_challenges'].items() 
-                           if data['completed']]
     
-    if completed_challenges:
-        st.write(f"You've completed {len(completed_challenges)} challenges!")
+    if stats['completed']:
+        st.write(f"You've completed {stats['completed']} challenges!")
         
-        for date_str, challenge_data in sorted(completed_challenges, reverse=True)[:7]:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Current Streak", f"{current_challenge_streak(stats, today)} days")
+        with col2:
+            st.metric("Longest Streak", f"{stats['longest_streak']} days")
+        
+        for date_str in reversed(stats['recent']):
+            challenge_data = user_data['daily_challenges'][date_str]
             with st.expander(f"{date_str}: {challenge_data['challenge'][:50]}..."):
                 st.write(f"**Challenge:** {challenge_data['challenge']}")
                 if challenge_data['reflection']:
@@ -1010,6 +1851,561 @@ def show_challenges():
     else:
         st.write("No completed challenges yet. Start with today's challenge!")
 
+# Mood journal store: entries stay in mood_journal for their text, while
+# timestamps, mood codes and energy live in typed arrays kept in time order
+MOOD_OPTIONS = list(JOURNAL_MOODS)
+MOOD_CODES = {mood: i for i, mood in enumerate(MOOD_OPTIONS)}
+# Numeric mood per code; unknown moods get code -1, which picks the trailing NaN
+MOOD_SCORES = np.array(list(JOURNAL_MOODS.values()) + [np.nan])
+JOURNAL_EPOCH = datetime(1970, 1, 1)
+
+def journal_timestamp(date_str):
+    # Seconds since the epoch in local wall-clock time, matching the stored ISO dates
+    date_obj = datetime.fromisoformat(date_str).replace(tzinfo=None)
+    return (date_obj - JOURNAL_EPOCH).total_seconds()
+
+def new_journal_columns():
+    return {
+        'timestamp': array('d'),
+        'mood': array('b'),
+        'energy': array('b'),
+        'row': array('l'),
+        # Indexed by row rather than date order; NaN until the entry is analysed
+        'sentiment': array('d')
+    }
+
+def insert_journal_row(columns, entry, row):
+    timestamp = journal_timestamp(entry['date'])
+    position = len(columns['timestamp'])
+    if position and timestamp < columns['timestamp'][-1]:
+        position = bisect.bisect_right(columns['timestamp'], timestamp)
+    
+    columns['timestamp'].insert(position, timestamp)
+    columns['mood'].insert(position, MOOD_CODES.get(entry['mood'], -1))
+    columns['energy'].insert(position, int(entry['energy']))
+    columns['row'].insert(position, row)
+
+def get_journal_columns(user_data):
+    journal = user_data['mood_journal']
+    columns = user_data.get('mood_columns')
+    
+    # Rebuild once for journals written before the columns existed
+    if columns is None or len(columns['row']) != len(journal):
+        columns = new_journal_columns()
+        for row in sorted(range(len(journal)), key=lambda i: journal[i]['date']):
+            insert_journal_row(columns, journal[row], row)
+        columns['sentiment'] = array('d', (entry_sentiment(entry) for entry in journal))
+        user_data['mood_columns'] = columns
+    return columns
+
+def append_journal_entries(user_data, entries):
+    columns = get_journal_columns(user_data)
+    journal = user_data['mood_journal']
+    jobs = []
+    for entry in entries:
+        journal.append(entry)
+        row = len(journal) - 1
+        insert_journal_row(columns, entry, row)
+        columns['sentiment'].append(math.nan)
+        index_user_document(user_data, 'journal', entry['date'], entry['text'], entry['mood'], entry['mood'])
+        jobs.append((entry, entry['text'], columns['sentiment'], row))
+    if entries:
+        mark_user_changed()
+    queue_analysis(jobs)
+
+def append_journal_entry(user_data, entry):
+    append_journal_entries(user_data, [entry])
+
+def recent_journal_entries(user_data, n):
+    columns = get_journal_columns(user_data)
+    journal = user_data['mood_journal']
+    return [journal[row] for row in reversed(columns['row'][-n:])] if n > 0 else []
+
+def journal_chart_frame(columns, start=0, stop=None):
+    pd = lazy_import("pandas")
+    return pd.DataFrame({
+        'date': pd.to_datetime(np.frombuffer(columns['timestamp'], dtype=np.float64)[start:stop], unit='s'),
+        'mood_numeric': MOOD_SCORES[np.frombuffer(columns['mood'], dtype=np.int8)[start:stop]],
+        'energy': np.frombuffer(columns['energy'], dtype=np.int8)[start:stop],
+        'sentiment': np.frombuffer(columns['sentiment'])[np.frombuffer(columns['row'], dtype='l')[start:stop]]
+    })
+
+# Search index: an inverted index over journal entries, challenge reflections
+# and quote reflections, updated as each one is saved and ranked with BM25
+SEARCH_PAGE_SIZE = 10
+SEARCH_KINDS = {'journal': "📝 Journal", 'challenge': "🏆 Challenge", 'reflection': "✨ Reflection"}
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had", "has", "have",
+    "he", "her", "his", "i", "if", "in", "is", "it", "its", "me", "my", "of", "on", "or", "so",
+    "she", "that", "the", "their", "them", "they", "this", "to", "was", "we", "were", "what",
+    "when", "with", "you", "your"
+}
+
+def tokenize(text):
+    return [word for word in re.findall(r"[a-z0-9']+", text.lower())
+            if len(word) > 1 and word not in STOPWORDS]
+
+def index_document(index, kind, date_str, text, title, mood=None):
+    terms = tokenize(text)
+    doc_id = len(index['docs'])
+    index['docs'].append({
+        'kind': kind,
+        'date': date_str,
+        'timestamp': journal_timestamp(date_str),
+        'mood': mood,
+        'title': title,
+        'text': text,
+        'length': len(terms)
+    })
+    index['total_length'] += len(terms)
+    index['counts'][kind] = index['counts'].get(kind, 0) + 1
+    
+    for term in terms:
+        postings = index['postings'].setdefault(term, {})
+        postings[doc_id] = postings.get(doc_id, 0) + 1
+
+def build_search_index(user_data):
+    index = {'docs': [], 'postings': {}, 'total_length': 0, 'counts': {}}
+    for entry in user_data.get('mood_journal', []):
+        index_document(index, 'journal', entry['date'], entry['text'], entry['mood'], entry['mood'])
+    for date_str, challenge in sorted(user_data.get('daily_challenges', {}).items()):
+        if challenge['completed']:
+            index_document(index, 'challenge', date_str,
+                           f"{challenge['challenge']} {challenge['reflection']}", challenge['challenge'])
+    for reflection in user_data.get('reflections', []):
+        index_document(index, 'reflection', reflection['date'],
+                       reflection['reflection'], f"\"{reflection['quote']}\"")
+    return index
+
+def get_search_index(user_data):
+    index = user_data.get('search_index')
+    counts = index['counts'] if index else {}
+    if (index is None
+            or counts.get('journal', 0) != len(user_data.get('mood_journal', []))
+            or counts.get('reflection', 0) != len(user_data.get('reflections', []))):
+        index = user_data['search_index'] = build_search_index(user_data)
+    return index
+
+def index_user_document(user_data, kind, date_str, text, title, mood=None):
+    # Called after the source list has grown, so the index is built or caught up first
+    index = user_data.get('search_index')
+    if index is None:
+        get_search_index(user_data)
+    else:
+        index_document(index, kind, date_str, text, title, mood)
+
+def search_entries(user_data, query, mood=None, start=None, end=None, cursor=None, page_size=SEARCH_PAGE_SIZE):
+    index = get_search_index(user_data)
+    docs = index['docs']
+    
+    # Score only documents that contain a query term; an empty query lists everything
+    terms = set(tokenize(query))
+    if terms:
+        scores = {}
+        avg_length = index['total_length'] / max(len(docs), 1)
+        for term in terms:
+            postings = index['postings'].get(term, {})
+            idf = math.log(1 + (len(docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = tf + 1.2 * (0.25 + 0.75 * docs[doc_id]['length'] / max(avg_length, 1))
+                scores[doc_id] = scores.get(doc_id, 0) + idf * tf * 2.2 / norm
+    else:
+        scores = dict.fromkeys(range(len(docs)), 0)
+    
+    start_ts = journal_timestamp(start.isoformat()) if start else None
+    end_ts = journal_timestamp(end.isoformat()) + 86400 if end else None
+    
+    # Results are ordered by (score, date, id) descending; the cursor is the
+    # sort key of the last result shown, so each page only keeps a small heap
+    def sort_key(doc_id):
+        return (-scores[doc_id], -docs[doc_id]['timestamp'], -doc_id)
+    
+    def matches(doc_id):
+        doc = docs[doc_id]
+        return ((mood is None or doc['mood'] == mood)
+                and (start_ts is None or doc['timestamp'] >= start_ts)
+                and (end_ts is None or doc['timestamp'] < end_ts)
+                and (cursor is None or sort_key(doc_id) > cursor))
+    
+    page = heapq.nsmallest(page_size + 1, filter(matches, scores), key=sort_key)
+    next_cursor = sort_key(page[page_size - 1]) if len(page) > page_size else None
+    return [dict(docs[doc_id], score=scores[doc_id]) for doc_id in page[:page_size]], next_cursor
+
+def show_journal_search(user_data):
+    st.subheader("Search Your Journey")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        query = st.text_input("Search journal entries and reflections:", key="search_query")
+    with col2:
+        mood = st.selectbox("Mood:", ["Any mood"] + MOOD_OPTIONS, key="search_mood")
+    with col3:
+        date_range = st.date_input("Date range:", value=(), key="search_dates")
+    
+    mood = None if mood == "Any mood" else mood
+    start = date_range[0] if len(date_range) > 0 else None
+    end = date_range[1] if len(date_range) > 1 else start
+    
+    # Pages are walked with a stack of cursors, reset whenever the search changes
+    search_key = (query, mood, start, end)
+    if st.session_state.get('search_key') != search_key:
+        st.session_state.search_key = search_key
+        st.session_state.search_cursors = [None]
+    
+    results, next_cursor = search_entries(user_data, query, mood, start, end,
+                                          cursor=st.session_state.search_cursors[-1])
+    
+    if not results:
+        st.write("No matching entries found.")
+    for result in results:
+        date_obj = datetime.fromisoformat(result['date'])
+        with st.expander(f"{SEARCH_KINDS[result['kind']]} - {date_obj.strftime('%B %d, %Y')}: {result['title'][:50]}"):
+            st.write(result['text'])
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(st.session_state.search_cursors) > 1 and st.button("← Previous Page", key="search_prev"):
+            st.session_state.search_cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor is not None and st.button("Next Page →", key="search_next"):
+            st.session_state.search_cursors.append(next_cursor)
+            st.rerun()
+
+# Journal analysis: a small sentiment lexicon and keyword extractor run over
+# journal entries and challenge reflections in a background thread pool, so
+# saving never waits on it. The pool only reads the text; finished results
+# wait in a per-session queue and are stored in each entry's 'analysis'
+# field on the script thread at the start of the session's next rerun, so
+# session data is never changed under a snapshot or an export.
+ANALYSIS_WORKERS = 2
+ANALYSIS_BATCH_SIZE = 50
+ANALYSIS_KEYWORDS = 5
+POSITIVE_WORDS = {
+    "happy", "glad", "great", "good", "love", "loved", "enjoy", "enjoyed", "fun", "calm", "relaxed",
+    "peaceful", "grateful", "thankful", "proud", "excited", "hopeful", "confident", "better", "best",
+    "amazing", "wonderful", "awesome", "nice", "productive", "motivated", "energized", "rested",
+    "laughed", "smile", "smiled", "kind", "helpful", "success", "successful", "accomplished",
+    "progress", "fantastic", "joy", "content", "inspired", "strong", "safe", "supported", "easy"
+}
+NEGATIVE_WORDS = {
+    "sad", "angry", "upset", "bad", "worse", "worst", "hate", "hated", "tired", "exhausted",
+    "stressed", "stress", "anxious", "anxiety", "worried", "worry", "afraid", "scared", "lonely",
+    "alone", "frustrated", "annoyed", "overwhelmed", "depressed", "down", "hurt", "sick", "pain",
+    "cried", "failed", "failure", "difficult", "hard", "boring", "bored", "awful", "terrible",
+    "horrible", "nervous", "guilty", "ashamed", "lost", "weak", "struggled", "struggling"
+}
+NEGATIONS = {"not", "no", "never", "don't", "didn't", "isn't", "wasn't", "can't", "couldn't", "won't", "hardly"}
+
+def analyse_text(text):
+    words = re.findall(r"[a-z']+", text.lower())
+    score = hits = 0
+    for i, word in enumerate(words):
+        polarity = (word in POSITIVE_WORDS) - (word in NEGATIVE_WORDS)
+        if polarity:
+            # "not happy", "didn't feel good"
+            if NEGATIONS.intersection(words[max(i - 2, 0):i]):
+                polarity = -polarity
+            score += polarity
+            hits += 1
+    
+    return {
+        'sentiment': round(score / hits, 3) if hits else 0.0,
+        'keywords': [term for term, _ in Counter(tokenize(text)).most_common(ANALYSIS_KEYWORDS)]
+    }
+
+def entry_sentiment(entry):
+    analysis = entry.get('analysis')
+    return analysis['sentiment'] if analysis else math.nan
+
+@st.cache_resource
+def get_analysis_pool():
+    return ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="journal-analysis")
+
+@st.cache_resource
+def get_analysis_results():
+    # Session token -> {'queue': finished batches, 'outstanding': batches not
+    # yet applied, 'running': batches not yet finished, 'session_id': the
+    # Streamlit session that queued them}
+    return {'lock': threading.Lock(), 'sessions': {}}
+
+def analyse_batch(jobs):
+    # Each job is (target dict, text, sentiment column or None, row); the
+    # targets are passed through untouched
+    return [(target, column, row, analyse_text(text)) for target, text, column, row in jobs]
+
+def streamlit_session_id():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+def session_is_active(session_id):
+    # Outside a running server (tests, benchmarks) sessions never go away
+    if session_id is None or not Runtime.exists():
+        return True
+    return Runtime.instance().is_active_session(session_id)
+
+def analysis_session():
+    if 'analysis_session' not in st.session_state:
+        st.session_state.analysis_session = uuid.uuid4().hex
+    return get_analysis_results()['sessions'].setdefault(
+        st.session_state.analysis_session,
+        {'queue': queue.SimpleQueue(), 'outstanding': 0, 'running': 0, 'session_id': streamlit_session_id()}
+    )
+
+def drop_finished_sessions(results):
+    # Called with the lock. A session closed with analyses outstanding never
+    # applies them; once they have all finished its queue is dropped, and
+    # with it the journal entries its batches refer to. The entries are
+    # analysed again by backfill_analysis when the user next logs in.
+    for token, session in list(results['sessions'].items()):
+        if not session['running'] and not session_is_active(session['session_id']):
+            del results['sessions'][token]
+
+def analysis_done(results, session, future):
+    # Worker thread
+    with results['lock']:
+        session['queue'].put(future)
+        session['running'] -= 1
+        if not session['running']:
+            drop_finished_sessions(results)
+
+def queue_analysis(jobs):
+    results = get_analysis_results()
+    batches = [jobs[i:i + ANALYSIS_BATCH_SIZE] for i in range(0, len(jobs), ANALYSIS_BATCH_SIZE)]
+    with results['lock']:
+        session = analysis_session()
+        session['outstanding'] += len(batches)
+        session['running'] += len(batches)
+    # Outside the lock: a batch that is already done runs its callback here
+    for batch in batches:
+        future = get_analysis_pool().submit(analyse_batch, batch)
+        future.add_done_callback(functools.partial(analysis_done, results, session))
+
+def apply_analysis_results():
+    # Script thread only: stores whatever analyses have finished so far
+    if 'analysis_session' not in st.session_state:
+        return
+    results = get_analysis_results()
+    with results['lock']:
+        session = analysis_session()
+    while not session['queue'].empty():
+        future = session['queue'].get()
+        session['outstanding'] -= 1
+        if future.exception() is not None:
+            continue
+        for target, column, row, analysis in future.result():
+            target['analysis'] = analysis
+            if column is not None and row < len(column):
+                column[row] = analysis['sentiment']
+        mark_user_changed()
+    if not session['outstanding']:
+        with results['lock']:
+            results['sessions'].pop(st.session_state.analysis_session, None)
+            drop_finished_sessions(results)
+
+def backfill_analysis(user_data):
+    # Once per user: queue everything written before analysis existed
+    if user_data.get('analysis_backfilled'):
+        return
+    user_data['analysis_backfilled'] = True
+    
+    columns = get_journal_columns(user_data)
+    jobs = [(entry, entry['text'], columns['sentiment'], row)
+            for row, entry in enumerate(user_data.get('mood_journal', [])) if 'analysis' not in entry]
+    jobs.extend((challenge, challenge['reflection'], None, 0)
+                for challenge in user_data.get('daily_challenges', {}).values()
+                if challenge['completed'] and challenge['reflection'] and 'analysis' not in challenge)
+    queue_analysis(jobs)
+
+def journal_insights(user_data, n=14):
+    # Mean sentiment and recurring keywords over the latest analysed writing
+    analyses = [entry['analysis'] for entry in recent_journal_entries(user_data, n) if entry.get('analysis')]
+    challenges = user_data.get('daily_challenges', {})
+    analyses.extend(challenges[day]['analysis'] for day in sorted(challenges)[-n:]
+                    if challenges[day].get('analysis'))
+    if not analyses:
+        return None
+    
+    keywords = Counter(term for analysis in analyses for term in analysis['keywords'])
+    return {
+        'sentiment': sum(analysis['sentiment'] for analysis in analyses) / len(analyses),
+        'keywords': [term for term, count in keywords.most_common(ANALYSIS_KEYWORDS) if count > 1],
+        'entries': len(analyses)
+    }
+
+def describe_sentiment(sentiment):
+    if sentiment > 0.2:
+        return "positive"
+    if sentiment < -0.2:
+        return "negative"
+    return "neutral"
+
+# Mood timeline: entries are resampled to daily or weekly means, smoothed
+# with rolling averages and thinned with LTTB above a point budget, so the
+# browser only ever gets a few thousand points however long the journal is
+MOOD_CHART_POINTS = 2000
+MOOD_WEBGL_POINTS = 500
+MOOD_MARKER_POINTS = 100
+MOOD_RESOLUTIONS = {'Entries': None, 'Daily': 'D', 'Weekly': 'W'}
+MOOD_ROLLING_WINDOWS = {'Entries': 7, 'Daily': 7, 'Weekly': 4}
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, from
+    # each bucket in between, the point forming the largest triangle with the
+    # previous pick and the mean of the next bucket. Returns the kept indices.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    edges = np.floor(np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.intp) + 1
+    edges[-1] = n - 1
+    keep = np.empty(threshold, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def mood_timeline_frame(columns, resolution):
+    df = journal_chart_frame(columns)
+    rule = MOOD_RESOLUTIONS[resolution]
+    if rule:
+        df = df.set_index('date').resample(rule).mean().reset_index()
+    df = df.dropna(subset=['mood_numeric']).reset_index(drop=True)
+    
+    # Averages are taken over the full series, before any points are dropped
+    window = MOOD_ROLLING_WINDOWS[resolution]
+    df['mood_avg'] = df['mood_numeric'].rolling(window, min_periods=1).mean()
+    df['energy_avg'] = df['energy'].rolling(window, min_periods=1).mean()
+    
+    if len(df) > MOOD_CHART_POINTS:
+        x = df['date'].to_numpy(dtype='datetime64[s]').astype(np.float64)
+        df = df.iloc[lttb(x, df['mood_numeric'].to_numpy(), MOOD_CHART_POINTS)]
+    return df
+
+def build_mood_timeline(df, resolution):
+    go = lazy_import("plotly.graph_objects")
+    scatter = go.Scattergl if len(df) > MOOD_WEBGL_POINTS else go.Scatter
+    mode = "lines+markers" if len(df) <= MOOD_MARKER_POINTS else "lines"
+    
+    fig = go.Figure()
+    fig.add_trace(scatter(x=df['date'], y=df['mood_numeric'], mode=mode, name="Mood"))
+    fig.add_trace(scatter(x=df['date'], y=df['mood_avg'], mode="lines", name="Mood (rolling avg)",
+                          line=dict(dash="dash")))
+    fig.add_trace(scatter(x=df['date'], y=df['energy_avg'], mode="lines", name="Energy (rolling avg)",
+                          yaxis="y2", opacity=0.6))
+    if df['sentiment'].notna().any():
+        # Journal tone runs -1..1; drawn on the mood scale around "Okay"
+        fig.add_trace(scatter(x=df['date'], y=3 + 2 * df['sentiment'], mode="lines", name="Journal tone",
+                              line=dict(dash="dot"), connectgaps=True))
+    
+    title = 'Mood Tracking Over Time' if resolution == 'Entries' else f'{resolution} Mood Tracking'
+    fig.update_layout(
+        title=title,
+        yaxis=dict(ticktext=list(MOOD_LABELS.values()), tickvals=list(MOOD_LABELS),
+                   range=[0.5, 5.5]),
+        yaxis2=dict(title="Energy", overlaying="y", side="right", range=[0, 10.5], showgrid=False),
+        legend=dict(orientation="h"),
+        **CHART_THEME
+    )
+    return fig
+
+# Habits: the desktop habit tracker's data.json, read through the shared
+# habitcore store so both apps use the same index and cached aggregates.
+# The tracker has no passwords, so a matching name proves nothing: a journal
+# user asks to link a tracker user and is shown a code, and sees that user's
+# habits only while the tracker user has confirmed that code in the tracker.
+HABIT_DATA_FILE = os.environ.get("PERSONA_VISTA_HABIT_DATA", "data.json")
+HABIT_DAYS_SHOWN = 14
+HABIT_RELOAD_SECONDS = 2
+
+@st.cache_resource
+def get_habit_store():
+    return HabitStore(HABIT_DATA_FILE)
+
+@st.cache_resource
+def get_habit_reload_state():
+    return {'checked': 0.0}
+
+def current_habit_store():
+    store = get_habit_store()
+    # The tracker writes the file from its own process. Checked at most once
+    # every few seconds across all sessions, not on every access.
+    state = get_habit_reload_state()
+    now = time.monotonic()
+    if now - state['checked'] >= HABIT_RELOAD_SECONDS:
+        state['checked'] = now
+        store.reload_if_changed()
+    return store
+
+def journal_mood_days(columns):
+    # Journal mood scores grouped by calendar day, for habitcore analytics
+    timestamps = np.frombuffer(columns['timestamp'])
+    scores = MOOD_SCORES[np.frombuffer(columns['mood'], dtype=np.int8)]
+    days = (timestamps // 86400).astype('datetime64[D]').astype(str)
+    mood_days = {}
+    for day, score in zip(days[~np.isnan(scores)], scores[~np.isnan(scores)]):
+        mood_days.setdefault(day, []).append(float(score))
+    return mood_days
+
+def linked_habit_user(username, user_data, store):
+    # The tracker user whose habits this account may see, or None
+    link = user_data.get('habit_link')
+    if link and store.linked(link['tracker_user'], username, link['code']):
+        return link['tracker_user']
+    return None
+
+def show_habit_link(username, user_data):
+    link = user_data.get('habit_link')
+    if link is None:
+        st.caption("Link your Habit Tracker account to see your habits next to your journal.")
+        tracker_user = st.text_input("Habit Tracker username", key="habit_link_user").strip()
+        if st.button("Link") and tracker_user:
+            user_data['habit_link'] = {'tracker_user': tracker_user, 'code': secrets.token_hex(3).upper()}
+            mark_user_changed()
+            st.rerun()
+        return
+    
+    st.info(f"In the Habit Tracker, log in as \"{link['tracker_user']}\", choose **Link PersonaVista** "
+            f"and enter your username \"{username}\" and the code **{link['code']}**.")
+    if st.button("Cancel link"):
+        del user_data['habit_link']
+        mark_user_changed()
+        st.rerun()
+
+def show_journal_habits(user_data, tracker_user):
+    username = st.session_state.current_user
+    store = current_habit_store()
+    st.subheader("🌱 Habits & Mood")
+    if tracker_user is None:
+        show_habit_link(username, user_data)
+        return
+    
+    today = date.today()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Habit Streak", f"{schedule_streak(store, tracker_user, today)} days")
+    comparison = mood_on_habit_days(store, tracker_user, journal_mood_days(get_journal_columns(user_data)))
+    if comparison and comparison['with_habits'] is not None:
+        col2.metric("Mood on habit days", f"{comparison['with_habits']:.1f} / 5")
+    if comparison and comparison['without_habits'] is not None:
+        col3.metric("Mood on other days", f"{comparison['without_habits']:.1f} / 5")
+    
+    start = (today - timedelta(days=HABIT_DAYS_SHOWN - 1)).isoformat()
+    for day, habits in reversed(store.logs_between(tracker_user, start, today.isoformat())):
+        st.write(f"**{date.fromisoformat(day).strftime('%b %d')}:** {', '.join(habits)}")
+    
+    if st.button("Unlink Habit Tracker"):
+        del user_data['habit_link']
+        mark_user_changed()
+        st.rerun()
+
 # Mood Journal
 def show_journal():
     show_back_button()
@@ -1020,15 +2416,14 @@ def show_journal():
     if 'mood_journal' not in user_data:
         user_data['mood_journal'] = []
     
-    tab1, tab2 = st.tabs(["New Entry", "Journal History"])
+    tab1, tab2, tab3 = st.tabs(["New Entry", "Journal History", "Search"])
     
     with tab1:
         st.subheader("Create New Journal Entry")
         
         col1, col2 = st.columns(2)
         with col1:
-            mood = st.selectbox("How are you feeling today?", 
-                               ["😄 Great", "😊 Good", "😐 Okay", "😔 Down", "😤 Frustrated", "😰 Anxious", "🤔 Confused"])
+            mood = st.selectbox("How are you feeling today?", MOOD_OPTIONS)
         
         with col2:
             energy = st.slider("Energy Level (1-10)", 1, 10, 5)
@@ -1044,7 +2439,7 @@ def show_journal():
                     'energy': energy,
                     'text': journal_text
                 }
-                user_data['mood_journal'].append(entry)
+                append_journal_entry(user_data, entry)
                 st.success("Journal entry saved! 📖")
                 st.rerun()
             else:
@@ -1052,37 +2447,45 @@ def show_journal():
     
     with tab2:
         st.subheader("Your Journal History")
+        backfill_analysis(user_data)
+        habit_store = current_habit_store()
+        tracker_user = linked_habit_user(st.session_state.current_user, user_data, habit_store)
         
         if user_data['mood_journal']:
             # Mood tracking chart
             if len(user_data['mood_journal']) > 1:
-                df_mood = pd.DataFrame(user_data['mood_journal'])
-                df_mood['date'] = pd.to_datetime(df_mood['date'])
-                df_mood['mood_numeric'] = df_mood['mood'].map({
-                    "😄 Great": 5, "😊 Good": 4, "😐 Okay": 3, 
-                    "😔 Down": 2, "😤 Frustrated": 2, "😰 Anxious": 1, "🤔 Confused": 2
-                })
+                resolution = st.radio("Timeline", list(MOOD_RESOLUTIONS), horizontal=True,
+                                      key="mood_timeline_resolution")
+                with profile_step("dataframe:journal"):
+                    df_mood = mood_timeline_frame(get_journal_columns(user_data), resolution)
                 
-                fig = px.line(df_mood, x='date', y='mood_numeric', 
-                             title='Mood Tracking Over Time', markers=True)
-                fig.update_yaxis(ticktext=["Anxious", "Down", "Okay", "Good", "Great"], 
-                               tickvals=[1, 2, 3, 4, 5])
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white'
-                )
+                with profile_step("figure:mood_timeline"):
+                    fig = build_mood_timeline(df_mood, resolution)
                 st.plotly_chart(fig)
             
             # Recent entries
             st.subheader("Recent Entries")
-            for entry in sorted(user_data['mood_journal'], key=lambda x: x['date'], reverse=True)[:5]:
+            for entry in recent_journal_entries(user_data, 5):
                 date_obj = datetime.fromisoformat(entry['date'])
                 with st.expander(f"{entry['mood']} - {date_obj.strftime('%B %d, %Y at %I:%M %p')}"):
                     st.write(f"**Energy Level:** {entry['energy']}/10")
                     st.write(f"**Entry:** {entry['text']}")
+                    habits = habit_store.habits_on(tracker_user, entry['date'][:10]) if tracker_user else []
+                    if habits:
+                        st.write(f"**Habits that day:** {', '.join(habits)}")
+                    analysis = entry.get('analysis')
+                    if analysis:
+                        st.caption(f"Tone: {describe_sentiment(analysis['sentiment'])} "
+                                   f"({analysis['sentiment']:+.2f}) · Keywords: {', '.join(analysis['keywords']) or '—'}")
+                    else:
+                        st.caption("Analysing…")
         else:
             st.write("No journal entries yet. Create your first entry above!")
+        
+        show_journal_habits(user_data, tracker_user)
+    
+    with tab3:
+        show_journal_search(user_data)
 
 # Quotes and Affirmations
 def show_quotes():
@@ -1171,20 +2574,18 @@ def show_quotes():
     with tab3:
         st.subheader("Motivational Boost")
         
-        motivational_quotes = [
-            "You are braver than you believe, stronger than you seem, and smarter than you think.",
-            "The only way to do great work is to love what you do.",
-            "Your limitation—it's only your imagination.",
-            "Great things never come from comfort zones.",
-            "Dream it. Wish it. Do it.",
-            "Success doesn't just find you. You have to go out and get it.",
-            "The harder you work for something, the greater you'll feel when you achieve it.",
-            "Don't stop when you're tired. Stop when you're done."
-        ]
+        quote_of_the_day = catalog_item_of_the_day("motivational_quotes")
+        if quote_of_the_day is None:
+            st.info("No quotes available yet.")
+        else:
+            st.markdown(f"**Today's boost:** *{quote_of_the_day['quote']}*")
         
         if st.button("Need Motivation?"):
-            quote = random.choice(motivational_quotes)
-            st.success(f"💪 {quote}")
+            quote = next_catalog_item(user_data, "motivational_quotes")
+            if quote is None:
+                st.info("No quotes available yet.")
+            else:
+                st.success(f"💪 {quote['quote']}")
         
         st.write("**Quick Motivation:**")
         col1, col2 = st.columns(2)
@@ -1197,36 +2598,344 @@ def show_quotes():
             if st.button("I'm feeling overwhelmed"):
                 st.info("Take a deep breath. Break big tasks into smaller ones. You don't have to do everything at once. 🧘‍♀️")
 
+# Data export and import: a user's history goes out as JSONL or CSV, written
+# one record at a time on Streamlit's download thread from a frozen view the
+# script thread took when the user asked for it, and comes back in by
+# reading the upload line by line and applying validated records in batches
+EXPORT_FORMAT = "persona-vista"
+EXPORT_VERSION = 1
+EXPORT_CSV_FIELDS = ['type', 'date', 'mood', 'energy', 'text', 'title', 'author', 'completed']
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ERRORS = 20
+
+def export_records(user_data):
+    yield {'type': 'header', 'format': EXPORT_FORMAT, 'version': EXPORT_VERSION,
+           'exported': datetime.now().isoformat()}
+    
+    results = user_data.get('quiz_results')
+    if results and 'answers' in results:
+        yield {'type': 'quiz', 'date': results['date'], 'mbti': results['mbti'], 'answers': results['answers']}
+    for entry in user_data['mood_journal']:
+        yield {'type': 'journal', 'date': entry['date'], 'mood': entry['mood'],
+               'energy': entry['energy'], 'text': entry['text']}
+    for date_str in sorted(user_data['daily_challenges']):
+        challenge = user_data['daily_challenges'][date_str]
+        yield {'type': 'challenge', 'date': date_str, 'challenge': challenge['challenge'],
+               'completed': challenge['completed'], 'reflection': challenge['reflection']}
+    for reflection in user_data.get('reflections', []):
+        yield {'type': 'reflection', 'date': reflection['date'], 'quote': reflection['quote'],
+               'author': reflection['author'], 'reflection': reflection['reflection']}
+
+def record_to_csv_row(record):
+    kind = record['type']
+    if kind == 'quiz':
+        return {'type': kind, 'date': record['date'], 'title': record['mbti'], 'text': json.dumps(record['answers'])}
+    if kind == 'journal':
+        return {'type': kind, 'date': record['date'], 'mood': record['mood'],
+                'energy': record['energy'], 'text': record['text']}
+    if kind == 'challenge':
+        return {'type': kind, 'date': record['date'], 'title': record['challenge'],
+                'text': record['reflection'], 'completed': int(record['completed'])}
+    return {'type': kind, 'date': record['date'], 'title': record['quote'],
+            'author': record['author'], 'text': record['reflection']}
+
+def csv_row_to_record(row):
+    kind = row.get('type')
+    if kind == 'quiz':
+        return {'type': kind, 'date': row['date'], 'mbti': row['title'], 'answers': json.loads(row['text'] or "{}")}
+    if kind == 'journal':
+        return {'type': kind, 'date': row['date'], 'mood': row['mood'], 'energy': row['energy'], 'text': row['text']}
+    if kind == 'challenge':
+        return {'type': kind, 'date': row['date'], 'challenge': row['title'],
+                'reflection': row['text'], 'completed': row['completed']}
+    if kind == 'reflection':
+        return {'type': kind, 'date': row['date'], 'quote': row['title'],
+                'author': row['author'], 'reflection': row['text']}
+    return {'type': kind}
+
+def export_view(user_data):
+    # A frozen view of what export_records reads, taken on the script thread
+    # so later reruns can't change it under the download. Journal entries
+    # and reflections are append-only, so copying their lists is enough;
+    # only a challenge's 'completed' and 'reflection' change later, so each
+    # challenge is copied too.
+    results = user_data.get('quiz_results') or {}
+    return {
+        'quiz_results': dict(results, answers=dict(results['answers'])) if 'answers' in results else {},
+        'mood_journal': list(user_data['mood_journal']),
+        'daily_challenges': {date_str: dict(challenge)
+                             for date_str, challenge in list(user_data['daily_challenges'].items())},
+        'reflections': list(user_data.get('reflections', []))
+    }
+
+def export_file(view, fmt):
+    # Runs on Streamlit's download thread when the button is clicked. Records
+    # are written one at a time from the frozen view, but Streamlit needs the
+    # finished bytes to serve the file, so the whole file is held in memory
+    # while it downloads.
+    records = export_records(view)
+    buffer = io.BytesIO()
+    text = io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=True)
+    if fmt == 'jsonl':
+        for record in records:
+            text.write(json.dumps(record) + "\n")
+    else:
+        writer = csv.DictWriter(text, fieldnames=EXPORT_CSV_FIELDS)
+        writer.writeheader()
+        for record in records:
+            if record['type'] != 'header':
+                writer.writerow(record_to_csv_row(record))
+    text.detach()
+    buffer.seek(0)
+    return buffer
+
+def read_import_records(uploaded, fmt):
+    # Yields (line number, record or None, error); the upload is never parsed whole
+    text = io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for line_number, row in enumerate(csv.DictReader(text), 2):
+            try:
+                yield line_number, csv_row_to_record(row), None
+            except (KeyError, ValueError) as e:
+                yield line_number, None, f"bad row ({e})"
+    else:
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"invalid JSON ({e})"
+                continue
+            if isinstance(record, dict):
+                yield line_number, record, None
+            else:
+                yield line_number, None, "expected a JSON object"
+
+def import_text(record, field, required=True):
+    value = record.get(field)
+    if value is None:
+        value = ""
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be text")
+    if required and not value.strip():
+        raise ValueError(f"'{field}' is empty")
+    return value
+
+def import_date(record):
+    value = import_text(record, 'date')
+    datetime.fromisoformat(value)
+    return value
+
+def import_energy(record):
+    # A whole number, as JSON or as CSV text; 7.0 is fine, 7.5 isn't rounded
+    value = record.get('energy')
+    if isinstance(value, str) and re.fullmatch(r"\s*-?\d+\s*", value):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"energy must be a whole number, not {value!r}")
+    return value
+
+def validate_import_record(record):
+    kind = record.get('type')
+    if kind == 'journal':
+        mood = import_text(record, 'mood')
+        if mood not in MOOD_CODES:
+            raise ValueError(f"unknown mood {mood!r}")
+        energy = import_energy(record)
+        if not 1 <= energy <= 10:
+            raise ValueError("energy must be between 1 and 10")
+        return {'date': import_date(record), 'mood': mood, 'energy': energy, 'text': import_text(record, 'text')}
+    if kind == 'challenge':
+        completed = record.get('completed')
+        return {'date': date.fromisoformat(import_text(record, 'date')).isoformat(),
+                'challenge': import_text(record, 'challenge'),
+                'completed': completed in (True, 1, "1", "True", "true"),
+                'reflection': import_text(record, 'reflection', required=False)}
+    if kind == 'reflection':
+        return {'date': import_date(record), 'quote': import_text(record, 'quote'),
+                'author': import_text(record, 'author', required=False),
+                'reflection': import_text(record, 'reflection')}
+    if kind == 'quiz':
+        answers = {}
+        for key, value in dict(record.get('answers') or {}).items():
+            question = int(key)
+            if not 0 <= question < len(PERSONALITY_QUESTIONS) or value not in range(len(PERSONALITY_QUESTIONS[question]['options'])):
+                raise ValueError(f"invalid answer for question {key}")
+            answers[question] = value
+        if not answers:
+            raise ValueError("quiz has no answers")
+        return {'answers': answers}
+    raise ValueError(f"unknown record type {kind!r}")
+
+def apply_import_batch(user_data, batch, summary):
+    journal_keys = summary['journal_keys']
+    reflection_dates = summary['reflection_dates']
+    entries = []
+    jobs = []
+    for kind, item in batch:
+        if kind == 'journal':
+            # Several entries can share a day, so only the same text on the
+            # same timestamp counts as already imported
+            key = (item['date'], item['text'])
+            if key in journal_keys:
+                continue
+            journal_keys.add(key)
+            entries.append(item)
+        elif kind == 'challenge':
+            if item['date'] in user_data['daily_challenges']:
+                continue
+            user_data['daily_challenges'][item['date']] = item
+            if item['completed']:
+                index_user_document(user_data, 'challenge', item['date'],
+                                    f"{item['challenge']} {item['reflection']}", item['challenge'])
+                if item['reflection']:
+                    jobs.append((item, item['reflection'], None, 0))
+        elif kind == 'reflection':
+            if item['date'] in reflection_dates:
+                continue
+            reflection_dates.add(item['date'])
+            user_data.setdefault('reflections', []).append(item)
+            index_user_document(user_data, 'reflection', item['date'], item['reflection'], f"\"{item['quote']}\"")
+        else:
+            continue
+        summary['imported'][kind] = summary['imported'].get(kind, 0) + 1
+    
+    append_journal_entries(user_data, entries)
+    queue_analysis(jobs)
+
+def import_user_data(username, uploaded, fmt, progress=None):
+    user_data = st.session_state.users_db[username]
+    summary = {
+        'imported': {},
+        'errors': [],
+        'error_count': 0,
+        'journal_keys': {(entry['date'], entry['text']) for entry in user_data['mood_journal']},
+        'reflection_dates': {reflection['date'] for reflection in user_data.get('reflections', [])}
+    }
+    size = max(uploaded.size, 1)
+    batch = []
+    quiz = None
+    
+    for line_number, record, error in read_import_records(uploaded, fmt):
+        if record is not None and record.get('type') != 'header':
+            try:
+                item = validate_import_record(record)
+                if record['type'] == 'quiz':
+                    quiz = item
+                else:
+                    batch.append((record['type'], item))
+            except (TypeError, ValueError) as e:
+                error = str(e)
+        if error:
+            summary['error_count'] += 1
+            if len(summary['errors']) < IMPORT_MAX_ERRORS:
+                summary['errors'].append(f"Line {line_number}: {error}")
+        
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            apply_import_batch(user_data, batch, summary)
+            batch = []
+            if progress is not None:
+                progress.progress(min(uploaded.tell() / size, 1.0))
+    apply_import_batch(user_data, batch, summary)
+    if summary['imported']:
+        mark_user_changed()
+    
+    if summary['imported'].get('challenge'):
+        # Recount streaks over the merged history, keeping the challenge deck
+        previous = user_data.pop('challenge_stats', None)
+        stats = get_challenge_stats(user_data)
+        if previous is not None:
+            stats['cycle'], stats['cycle_position'] = previous['cycle'], previous['cycle_position']
+            stats['last_served'] = previous.get('last_served')
+    if quiz is not None:
+        save_quiz_results(username, quiz['answers'])
+        st.session_state.quiz_answers = dict(quiz['answers'])
+        st.session_state.quiz_completed = True
+        summary['imported']['quiz'] = 1
+    if progress is not None:
+        progress.progress(1.0)
+    return summary
+
+def show_data():
+    show_back_button()
+    st.title("📦 Import & Export")
+    
+    username = st.session_state.current_user
+    user_data = st.session_state.users_db[username]
+    
+    tab1, tab2 = st.tabs(["Export", "Import"])
+    
+    with tab1:
+        st.write(f"Your journal has **{len(user_data['mood_journal'])}** entries, "
+                 f"**{len(user_data['daily_challenges'])}** challenge days and "
+                 f"**{len(user_data.get('reflections', []))}** quote reflections.")
+        fmt = st.radio("Format", ["jsonl", "csv"], horizontal=True,
+                       format_func=lambda x: {"jsonl": "JSON Lines", "csv": "CSV"}[x])
+        # The view is taken here, on the script thread, only when asked for;
+        # other reruns just hand the same view to the download button
+        if st.button("Prepare export"):
+            st.session_state.prepared_export = (username, datetime.now(), export_view(user_data))
+        prepared_for, prepared, view = st.session_state.get('prepared_export', (None, None, None))
+        if prepared_for == username:
+            st.caption(f"Prepared at {prepared.strftime('%H:%M:%S')}; prepare it "
+                       "again to include later changes. The file is built when you click Download and "
+                       "held in the server's memory while it downloads, so very large histories take a moment.")
+            st.download_button(
+                "Download my data",
+                data=functools.partial(export_file, view, fmt),
+                file_name=f"persona_vista_{username}_{date.today().isoformat()}.{fmt}",
+                mime="application/jsonl" if fmt == "jsonl" else "text/csv"
+            )
+    
+    with tab2:
+        st.write("Import a file exported from PersonaVista. Entries you already have are skipped.")
+        uploaded = st.file_uploader("Choose a file", type=["jsonl", "csv"])
+        if uploaded is not None and st.button("Import"):
+            fmt = "csv" if uploaded.name.lower().endswith(".csv") else "jsonl"
+            summary = import_user_data(username, uploaded, fmt, st.progress(0.0))
+            imported = ", ".join(f"{count} {kind}" for kind, count in summary['imported'].items() if count)
+            st.success(f"Imported {imported or 'nothing new'}.")
+            if summary['error_count']:
+                with st.expander(f"{summary['error_count']} records were skipped"):
+                    for error in summary['errors']:
+                        st.write(f"• {error}")
+
+# Page registry: page name -> handler
+PAGES = {
+    'dashboard': show_dashboard,
+    'quiz': show_quiz,
+    'analysis': show_analysis,
+    'personality_map': show_personality_map,
+    'games': show_games,
+    'relaxation': show_relaxation,
+    'suggestions': show_suggestions,
+    'challenges': show_challenges,
+    'journal': show_journal,
+    'quotes': show_quotes,
+    'data': show_data
+}
+if PROFILING_ENABLED:
+    PAGES['diagnostics'] = show_diagnostics
+
 # Main application logic
 def main():
-    init_session_state()
+    with profile_step("session_state"):
+        init_session_state()
+        apply_analysis_results()
     
     # Route to appropriate page
-    if st.session_state.current_user is None:
-        show_auth_page()
-    else:
-        if st.session_state.page == 'dashboard':
-            show_dashboard()
-        elif st.session_state.page == 'quiz':
-            show_quiz()
-        elif st.session_state.page == 'analysis':
-            show_analysis()
-        elif st.session_state.page == 'personality_map':
-            show_personality_map()
-        elif st.session_state.page == 'games':
-            show_games()
-        elif st.session_state.page == 'relaxation':
-            show_relaxation()
-        elif st.session_state.page == 'suggestions':
-            show_suggestions()
-        elif st.session_state.page == 'challenges':
-            show_challenges()
-        elif st.session_state.page == 'journal':
-            show_journal()
-        elif st.session_state.page == 'quotes':
-            show_quotes()
+    page = current_page_name()
+    with profile_page(page):
+        if st.session_state.current_user is None:
+            show_auth_page()
         else:
-            show_dashboard()
+            PAGES.get(page, show_dashboard)()
+    
+    if st.session_state.current_user is not None:
+        save_user_snapshot(st.session_state.current_user)
 
 if __name__ == "__main__":
     main()
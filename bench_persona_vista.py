@@ -0,0 +1,191 @@
+import argparse
+import json
+import logging
+import os
+import pickle
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PERSONA_VISTA.py")
+
+# Runs in a fresh interpreter so module imports are measured cold. Streamlit
+# itself is imported before the clock starts; only the app's own work counts.
+COLD_START_SCRIPT = """
+import json, logging, sys, time
+logging.disable(logging.WARNING)
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+assert not at.exception, at.exception
+assert at.title[0].value == "🧠 PersonaVista"
+print(json.dumps({"seconds": elapsed}))
+"""
+
+def time_cold_start(app_file, runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT, app_file],
+            check=True, capture_output=True, text=True
+        ).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1])["seconds"])
+    return timings
+
+def app_file_at(ref):
+    source = subprocess.run(
+        ["git", "show", f"{ref}:PERSONA_VISTA.py"],
+        cwd=os.path.dirname(APP_FILE), check=True, capture_output=True
+    ).stdout
+    handle = tempfile.NamedTemporaryFile(suffix=".py", delete=False)
+    handle.write(source)
+    handle.close()
+    return handle.name
+
+def report(label, timings):
+    print(f"{label:<12} median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms   runs {len(timings)}")
+
+def cold_start(args):
+    if args.ref:
+        before = app_file_at(args.ref)
+        try:
+            report(args.ref, time_cold_start(before, args.runs))
+        finally:
+            os.remove(before)
+    report("working tree", time_cold_start(APP_FILE, args.runs))
+
+# Load test: N scripted sessions stay live in one process and take turns, one
+# rerun at a time, the way a single Streamlit server interleaves its users.
+# Cached resources are shared between them just as between browser tabs.
+def click(at, label):
+    next(button for button in at.button if button.label == label).click()
+
+def timed_run(at, stats, page):
+    start = time.perf_counter()
+    at.run()
+    stats["timings"].setdefault(page, []).append(time.perf_counter() - start)
+    if at.exception:
+        stats["errors"].setdefault(page, set()).add(at.exception[0].message)
+
+def visit(at, stats, page):
+    at.session_state.page = page
+    timed_run(at, stats, page)
+
+def scripted_session(index, journal_entries, stats):
+    # Generator: yields after every rerun so sessions can be interleaved
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=120)
+    username = f"loadtest_{index}"
+    timed_run(at, stats, "login")
+    yield
+
+    # Register and log in
+    at.text_input(key="reg_username").input(username)
+    at.text_input(key="reg_email").input(f"{username}@example.com")
+    at.text_input(key="reg_password").input("password")
+    at.text_input(key="reg_confirm").input("password")
+    at.button(key="reg_btn").click()
+    timed_run(at, stats, "login")
+    yield
+    at.text_input(key="login_username").input(username)
+    at.text_input(key="login_password").input("password")
+    at.button(key="login_btn").click()
+    timed_run(at, stats, "dashboard")
+    yield
+
+    # Take the quiz
+    visit(at, stats, "quiz")
+    yield
+    while not at.session_state["quiz_completed"]:
+        click(at, "Submit Quiz" if any(b.label == "Submit Quiz" for b in at.button) else "Next Page")
+        timed_run(at, stats, "quiz")
+        yield
+
+    # Write journal entries
+    visit(at, stats, "journal")
+    yield
+    for n in range(journal_entries):
+        at.text_area[0].input(f"Entry {n}: went for a walk and talked with friends")
+        click(at, "Save Entry")
+        timed_run(at, stats, "journal")
+        yield
+
+    for page in ["analysis", "personality_map", "suggestions", "challenges", "journal", "dashboard"]:
+        visit(at, stats, page)
+        yield
+
+    stats["state_bytes"].append(len(pickle.dumps(at.session_state.to_dict())))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def run_interleaved(sessions):
+    sessions = list(sessions)
+    while sessions:
+        for session in list(sessions):
+            try:
+                next(session)
+            except StopIteration:
+                sessions.remove(session)
+
+def load_test(args):
+    # Page errors are collected and reported below instead of logged per rerun
+    logging.disable(logging.CRITICAL)
+    # Keep the sessions' snapshots out of the working directory
+    os.environ.setdefault("PERSONA_VISTA_SNAPSHOT_DIR", tempfile.mkdtemp(prefix="persona-vista-snapshots-"))
+
+    # One unmeasured session first, so one-time imports and caches are not
+    # counted against the measured sessions
+    run_interleaved([scripted_session("warmup", args.journal_entries,
+                                      {"timings": {}, "errors": {}, "state_bytes": []})])
+
+    stats = {"timings": {}, "errors": {}, "state_bytes": []}
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+
+    run_interleaved(scripted_session(i, args.journal_entries, stats) for i in range(args.sessions))
+
+    wall = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    reruns = sum(len(values) for values in stats["timings"].values())
+
+    print(f"{'page':<16}{'reruns':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for page, values in sorted(stats["timings"].items()):
+        print(f"{page:<16}{len(values):>8}" + "".join(
+            f"{percentile(values, p) * 1000:>10.1f}" for p in (50, 90, 99, 100)))
+    print()
+    print(f"{args.sessions} sessions, {reruns} reruns in {wall:.1f} s -> {reruns / wall:.1f} reruns/s")
+    print(f"session state per session: {statistics.mean(stats['state_bytes']) / 1024:.1f} KiB pickled")
+    # ru_maxrss is reported in KiB on Linux
+    print(f"peak RSS growth per session: {(rss_after - rss_before) / args.sessions:.0f} KiB")
+    for page, messages in sorted(stats["errors"].items()):
+        for message in sorted(messages):
+            print(f"ERROR on {page}: {message}")
+
+def main():
+    parser = argparse.ArgumentParser(description="PersonaVista benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cold = commands.add_parser("cold-start", help="time to first render of the login page")
+    cold.add_argument("--runs", type=int, default=5)
+    cold.add_argument("--ref", help="git revision to compare against, e.g. HEAD~1")
+    cold.set_defaults(func=cold_start)
+
+    load = commands.add_parser("load", help="simulate concurrent scripted sessions")
+    load.add_argument("--sessions", type=int, default=20)
+    load.add_argument("--journal-entries", type=int, default=5)
+    load.set_defaults(func=load_test)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import datetime
+import json
+from urllib.parse import urlsplit, parse_qs
+
+from habitcore import HabitStore, due_today, schedule_streak, weekly_counts
+
+# ---------- Settings ----------
+DATA_FILE = 'data.json'
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_ENTRIES = 10000
+# Writes arriving within this window share one flush to the data file
+FLUSH_DELAY = 0.05
+# How much of a rejected body is read and dropped before closing
+DISCARD_BYTES = 16 * MAX_BODY_BYTES
+DISCARD_SECONDS = 2.0
+
+# ---------- Store Access ----------
+# Logs are applied to the in-memory store as soon as a request is parsed, so
+# reads see them immediately. Each request then waits for the next flush,
+# which appends every user changed in the meantime to the store's log at once.
+class HabitService:
+    def __init__(self, path):
+        self.store = HabitStore(path)
+        self.pending = []
+        self.flush_task = None
+        self.flushing = False
+        self.refresh_task = None
+
+    async def refresh(self):
+        # Pick up changes made by the Tk app; ours not yet flushed are kept.
+        # Catching up takes the inter-process file lock, so it runs on the
+        # executor and requests arriving meanwhile share it. A flush in
+        # progress catches up by itself.
+        if self.flushing or self.store.file_state() == self.store.signature:
+            return
+        if self.refresh_task is None:
+            self.refresh_task = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(None, self.store.reload_if_changed)
+            )
+            self.refresh_task.add_done_callback(self.refresh_done)
+        await asyncio.shield(self.refresh_task)
+
+    def refresh_done(self, task):
+        self.refresh_task = None
+
+    async def commit(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self.pending.append(waiter)
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush())
+        await waiter
+
+    async def flush(self):
+        await asyncio.sleep(FLUSH_DELAY)
+        waiters, self.pending, self.flush_task = self.pending, [], None
+        self.flushing = True
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.store.flush)
+        except OSError as e:
+            for waiter in waiters:
+                waiter.set_exception(e)
+            return
+        finally:
+            self.flushing = False
+        for waiter in waiters:
+            waiter.set_result(None)
+
+    def log(self, username, entries):
+        # Same effect as log_today + update_streak in the Tk app, for any dates
+        self.store.user(username, create=True)
+        for day, habits in entries:
+            for habit in habits:
+                self.store.add_habit(username, habit)
+            self.store.log_habits(username, day, habits)
+        streak = schedule_streak(self.store, username)
+        self.store.set_streak(username, streak)
+        return streak
+
+# ---------- Request Handling ----------
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_day(value):
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise HttpError(400, f"invalid date: {value!r}")
+
+def parse_habits(value):
+    if not isinstance(value, list) or not all(isinstance(h, str) and h.strip() for h in value):
+        raise HttpError(400, "'habits' must be a list of habit names")
+    return [h.strip() for h in value]
+
+def query_user(service, query):
+    username = query.get("user", [""])[0]
+    if not username:
+        raise HttpError(400, "'user' is required")
+    if service.store.user(username) is None:
+        raise HttpError(404, f"unknown user: {username}")
+    return username
+
+async def post_log(service, query, body):
+    # {"user": "...", "entries": [{"date": "YYYY-MM-DD", "habits": [...]}, ...]}
+    # or a single {"user": "...", "date": ..., "habits": [...]}; date defaults to today
+    username = body.get("user")
+    if not isinstance(username, str) or not username:
+        raise HttpError(400, "'user' is required")
+    raw_entries = body.get("entries", [body])
+    if not isinstance(raw_entries, list) or len(raw_entries) > MAX_BATCH_ENTRIES:
+        raise HttpError(400, f"'entries' must be a list of at most {MAX_BATCH_ENTRIES} items")
+
+    entries = []
+    for entry in raw_entries:
+        if not isinstance(entry, dict):
+            raise HttpError(400, "each entry must be an object")
+        day = parse_day(entry["date"]) if "date" in entry else datetime.date.today().isoformat()
+        entries.append((day, parse_habits(entry.get("habits"))))
+
+    streak = service.log(username, entries)
+    await service.commit()
+    return {"logged": len(entries), "streak": streak}
+
+async def get_logs(service, query, body):
+    username = query_user(service, query)
+    today = datetime.date.today()
+    start = parse_day(query.get("start", [str(today - datetime.timedelta(days=6))])[0])
+    end = parse_day(query.get("end", [str(today)])[0])
+    logs = service.store.logs_between(username, start, end)
+    return {"user": username, "logs": [{"date": day, "habits": habits} for day, habits in logs]}
+
+async def get_streak(service, query, body):
+    username = query_user(service, query)
+    return {"user": username, "streak": schedule_streak(service.store, username)}
+
+async def get_due(service, query, body):
+    username = query_user(service, query)
+    return {"user": username, "due": sorted(due_today(service.store, username))}
+
+async def get_weekly(service, query, body):
+    username = query_user(service, query)
+    return {"user": username, "days": [{"date": day, "count": count}
+                                       for day, count in weekly_counts(service.store, username)]}
+
+async def get_habits(service, query, body):
+    username = query_user(service, query)
+    user = service.store.user(username)
+    return {"user": username, "habits": user["habits"], "progress": user["progress"],
+            "schedules": user["schedules"]}
+
+ROUTES = {
+    ("POST", "/log"): post_log,
+    ("GET", "/logs"): get_logs,
+    ("GET", "/streak"): get_streak,
+    ("GET", "/due"): get_due,
+    ("GET", "/weekly"): get_weekly,
+    ("GET", "/habits"): get_habits
+}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+async def read_request(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", "0") or 0)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+    return method, target, body, keep_alive
+
+async def discard_input(reader):
+    # Reads and drops what the client is still sending. Closing with unread
+    # data resets the connection, and the client may never see our reply.
+    async def drain():
+        left = DISCARD_BYTES
+        while left > 0:
+            chunk = await reader.read(min(left, 64 * 1024))
+            if not chunk:
+                return
+            left -= len(chunk)
+
+    try:
+        await asyncio.wait_for(drain(), DISCARD_SECONDS)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+async def dispatch(service, method, target, body):
+    url = urlsplit(target)
+    handler = ROUTES.get((method, url.path))
+    if handler is None:
+        if any(path == url.path for _, path in ROUTES):
+            raise HttpError(405, f"{method} not allowed on {url.path}")
+        raise HttpError(404, f"no such endpoint: {url.path}")
+
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        raise HttpError(400, "body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HttpError(400, "body must be a JSON object")
+
+    await service.refresh()
+    return await handler(service, parse_qs(url.query), payload)
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                method, target, body, keep_alive = await read_request(reader)
+                error = None
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except (ValueError, asyncio.LimitOverrunError):
+                error = HttpError(400, "malformed request")
+            except HttpError as e:
+                # The body was never read, so the connection can't be reused
+                error = e
+            if error is not None:
+                keep_alive = False
+
+            try:
+                if error is not None:
+                    raise error
+                status, result = 200, await dispatch(service, method, target, body)
+            except HttpError as e:
+                status, result = e.status, {"error": str(e)}
+            except Exception as e:
+                status, result = 500, {"error": str(e)}
+
+            data = json.dumps(result).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+            if error is not None:
+                writer.write_eof()
+                await discard_input(reader)
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+async def serve(host, port, path):
+    service = HabitService(path)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port
+    )
+    print(f"Habit API listening on http://{host}:{port} (data: {path})")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for the habit tracker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=DATA_FILE, help="habit tracker data file")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.data))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import datetime
+import hashlib
+import os
+import re
+import statistics
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from openpyxl import Workbook
+
+from habitcore import HabitStore, schedule_streak, weekly_counts
+
+# ---------- Settings ----------
+DATA_FILE = 'data.json'
+REPORT_DIR = 'reports'
+
+def safe_name(username):
+    # Readable part plus a hash of the exact name, so "a b" and "a_b" (or
+    # "Alice" and "alice" on a case-insensitive disk) get different files
+    readable = re.sub(r"[^A-Za-z0-9_.-]", "_", username)[:40] or "_"
+    return f"{readable}-{hashlib.sha1(username.encode('utf-8')).hexdigest()[:8]}"
+
+# ---------- Per-User Report (runs in a worker process) ----------
+def weekly_chart(path, week_data):
+    # Same chart as weekly_graph in the Tk app, rendered to a file
+    fig, ax = plt.subplots(figsize=(7, 4))
+    ax.bar(list(week_data.keys()), list(week_data.values()), color="#F7C59F")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_title("Weekly Habit Summary")
+    ax.set_ylabel("Completed Habits")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def write_excel(path, user, logs, streak, week_data):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Habit Logs"
+    ws.append(["Date", "Habits"])
+    for day, habits in logs:
+        ws.append([day, ", ".join(habits)])
+
+    summary = wb.create_sheet("Summary")
+    summary.append(["Current Streak", streak])
+    summary.append(["Habits", ", ".join(user["habits"])])
+    summary.append([])
+    summary.append(["Habit", "Progress"])
+    for habit, progress in user["progress"].items():
+        summary.append([habit, progress])
+    summary.append([])
+    summary.append(["Date", "Completed Habits"])
+    for day, count in week_data.items():
+        summary.append([day, count])
+    wb.save(path)
+
+def write_csv(path, logs):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Habits"])
+        for day, habits in logs:
+            writer.writerow([day, ", ".join(habits)])
+
+def user_report(username, user, out_dir, fmt, today):
+    # Any failure is returned rather than raised so one bad user never
+    # takes down the batch
+    start = time.perf_counter()
+    try:
+        store = HabitStore(None, users={username: user})
+        logs = store.logs_between(username, "0000-00-00", "9999-99-99")
+        week_data = dict(weekly_counts(store, username, today))
+        streak = schedule_streak(store, username, today)
+
+        base = os.path.join(out_dir, safe_name(username))
+        weekly_chart(base + "_weekly.png", week_data)
+        if fmt == "xlsx":
+            write_excel(base + ".xlsx", user, logs, streak, week_data)
+        else:
+            write_csv(base + ".csv", logs)
+        return {"user": username, "file": os.path.basename(base), "seconds": time.perf_counter() - start,
+                "streak": streak, "logged_days": len(logs), "error": None}
+    except Exception:
+        return {"user": username, "file": None, "seconds": time.perf_counter() - start, "streak": None,
+                "logged_days": None, "error": traceback.format_exc(limit=3)}
+
+# ---------- Batch Driver ----------
+def run_reports(data_file, out_dir, fmt, workers, usernames=None, today=None):
+    today = today or datetime.date.today()
+    # Includes changes still in the store's write-ahead log; records are
+    # migrated by the workers as they read them
+    users = HabitStore(data_file).users
+    if usernames:
+        users = {name: users[name] for name in usernames if name in users}
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = []
+    start = time.perf_counter()
+    # Each worker only receives the one user it reports on
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(user_report, name, user, out_dir, fmt, today): name
+                   for name, user in users.items()}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # The worker process itself died
+                results.append({"user": futures[future], "file": None, "seconds": 0.0, "streak": None,
+                                "logged_days": None, "error": repr(e)})
+    return results, time.perf_counter() - start
+
+def write_summary(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["User", "Status", "File", "Seconds", "Streak", "Logged Days", "Error"])
+        for result in sorted(results, key=lambda r: r["user"]):
+            writer.writerow([result["user"], "error" if result["error"] else "ok", result["file"],
+                             f"{result['seconds']:.3f}", result["streak"], result["logged_days"],
+                             (result["error"] or "").strip()])
+
+def print_summary(results, wall, workers):
+    failed = [r for r in results if r["error"]]
+    timings = sorted(r["seconds"] for r in results if not r["error"])
+    print(f"{len(results)} users, {len(results) - len(failed)} ok, {len(failed)} failed "
+          f"in {wall:.1f} s with {workers} workers")
+    if timings:
+        p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+        print(f"per user: median {statistics.median(timings) * 1000:.0f} ms, "
+              f"p95 {p95 * 1000:.0f} ms, max {timings[-1] * 1000:.0f} ms, "
+              f"total worker time {sum(timings):.1f} s")
+    for result in failed[:10]:
+        print(f"FAILED {result['user']}: {result['error'].strip().splitlines()[-1]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate habit reports for every user")
+    parser.add_argument("--data", default=DATA_FILE, help="habit tracker data file")
+    parser.add_argument("--out", default=REPORT_DIR, help="output directory")
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--user", action="append", dest="users", help="only report on this user (repeatable)")
+    args = parser.parse_args()
+
+    results, wall = run_reports(args.data, args.out, args.format, args.workers, args.users)
+    write_summary(os.path.join(args.out, "report_summary.csv"), results)
+    print_summary(results, wall, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from habitcore.models import (
+    JOURNAL_MOODS, TRACKER_MOODS, MOOD_LABELS, SCHEMA_VERSION, mood_score, new_habit_user
+)
+from habitcore.migrations import MIGRATIONS, migrate_user
+from habitcore.commands import CommandHistory, apply_command, describe_command
+from habitcore.schedules import DueQueue, describe_schedule, parse_schedule
+from habitcore.store import HabitStore
+from habitcore.analytics import (
+    current_streak, due_today, schedule_streak, weekly_counts, mood_by_day, mood_on_habit_days
+)
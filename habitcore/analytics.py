@@ -0,0 +1,77 @@
+import datetime
+
+from habitcore.models import mood_score
+
+# ---------- Habit Analytics ----------
+# Aggregates are cached on the store per user and recomputed only after the
+# user's data changes
+def current_streak(store, username, today=None):
+    today = today or datetime.date.today()
+
+    def compute():
+        # Walk back from today over the sorted log index
+        dates = store.log_dates(username)
+        streak = 0
+        expected = today
+        for day in reversed(dates):
+            if day > str(expected):
+                continue
+            if day != str(expected):
+                break
+            streak += 1
+            expected -= datetime.timedelta(days=1)
+        return streak
+
+    return store.cached(username, ("streak", str(today)), compute)
+
+def due_today(store, username, today=None):
+    # Habits still due today under their schedules
+    today = today or datetime.date.today()
+    queue = store.due_queue(username, today)
+    return queue.due(today) if queue else []
+
+def schedule_streak(store, username, today=None):
+    # Days in a row with no scheduled habit missed; unscheduled habits are daily
+    today = today or datetime.date.today()
+    queue = store.due_queue(username, today)
+    return queue.streak(today) if queue else 0
+
+def weekly_counts(store, username, today=None):
+    today = today or datetime.date.today()
+
+    def compute():
+        start = str(today - datetime.timedelta(days=6))
+        logged = dict(store.logs_between(username, start, str(today)))
+        days = [str(today - datetime.timedelta(days=i)) for i in range(6, -1, -1)]
+        return [(day, len(logged.get(day, []))) for day in days]
+
+    return store.cached(username, ("weekly", str(today)), compute)
+
+def mood_by_day(store, username, journal_days=None):
+    # Mean mood per day on the shared scale, from the tracker's daily moods
+    # and, if given, PersonaVista journal scores as {day: [scores]}
+    def tracker_days():
+        user = store.user(username)
+        moods = user["moods"] if user else {}
+        return {day: mood_score(mood) for day, mood in moods.items() if mood_score(mood) is not None}
+
+    days = {day: [score] for day, score in store.cached(username, "tracker_moods", tracker_days).items()}
+    for day, scores in (journal_days or {}).items():
+        days.setdefault(day, []).extend(scores)
+    return {day: sum(scores) / len(scores) for day, scores in days.items()}
+
+def mood_on_habit_days(store, username, journal_days=None):
+    # Average mood on days with and without a logged habit, over days that
+    # have a mood; None where there are no such days
+    moods = mood_by_day(store, username, journal_days)
+    if not moods:
+        return None
+    dates = set(store.log_dates(username)) if store.user(username) else set()
+    with_habits = [score for day, score in moods.items() if day in dates]
+    without = [score for day, score in moods.items() if day not in dates]
+    return {
+        "with_habits": sum(with_habits) / len(with_habits) if with_habits else None,
+        "without_habits": sum(without) / len(without) if without else None,
+        "habit_days": len(with_habits),
+        "other_days": len(without)
+    }
@@ -0,0 +1,168 @@
+from collections import deque
+
+# ---------- Commands ----------
+# Every change to a user record is a small JSON-able command holding only
+# what it changes (plus what it replaced), so it can be applied, reverted,
+# and appended to the store's write-ahead log as-is. Undo and redo keep
+# the commands themselves, never copies of the data.
+UNDO_LIMIT = 100
+
+def add_habit_command(username, record, habit):
+    if not habit or habit in record["habits"]:
+        return None
+    return {"op": "add_habit", "user": username, "habit": habit}
+
+def remove_habit_command(username, record, habit):
+    # ValueError if the habit isn't there, like list.remove
+    index = record["habits"].index(habit)
+    return {"op": "remove_habit", "user": username, "habit": habit, "index": index,
+            "progress": record["progress"].get(habit), "schedule": record["schedules"].get(habit)}
+
+def log_command(username, record, day, habits):
+    added = sorted(set(habits) - set(record["logs"].get(day, [])))
+    if not added:
+        return None
+    return {"op": "log", "user": username, "day": day, "added": added}
+
+def progress_command(username, record, habit, progress):
+    old = record["progress"].get(habit)
+    if old == progress:
+        return None
+    return {"op": "progress", "user": username, "habit": habit, "old": old, "new": progress}
+
+def mood_command(username, record, day, mood):
+    old = record["moods"].get(day)
+    if old == mood:
+        return None
+    return {"op": "mood", "user": username, "day": day, "old": old, "new": mood}
+
+def schedule_command(username, record, habit, rule):
+    # rule None means daily
+    old = record["schedules"].get(habit)
+    if old == rule:
+        return None
+    return {"op": "schedule", "user": username, "habit": habit, "old": old, "new": rule}
+
+def link_command(username, record, account, code):
+    # code None unlinks the account
+    old = record["links"].get(account)
+    if old == code:
+        return None
+    return {"op": "link", "user": username, "account": account, "old": old, "new": code}
+
+def notes_command(username, record, notes):
+    old = record["notes"]
+    if old == notes:
+        return None
+    return {"op": "notes", "user": username, "old": old, "new": notes}
+
+def apply_command(record, command, undo=False):
+    # Returns False when there was nothing to change. Adding a habit the
+    # record already has, or removing one it doesn't, is a no-op, so a
+    # command replayed after another process's change can't duplicate or
+    # fail on a habit.
+    op = command["op"]
+    if op == "add_habit" or op == "remove_habit":
+        habit = command["habit"]
+        if ((op == "add_habit") != undo) == (habit in record["habits"]):
+            return False
+        if (op == "add_habit") != undo:
+            if op == "add_habit":
+                record["habits"].append(habit)
+                record["progress"][habit] = 0
+            else:
+                record["habits"].insert(command["index"], habit)
+                if command["progress"] is not None:
+                    record["progress"][habit] = command["progress"]
+                if command.get("schedule") is not None:
+                    record["schedules"][habit] = command["schedule"]
+        else:
+            record["habits"].remove(habit)
+            record["progress"].pop(habit, None)
+            record["schedules"].pop(habit, None)
+    elif op == "log":
+        logs = record["logs"]
+        day = command["day"]
+        if undo:
+            remaining = [habit for habit in logs.get(day, []) if habit not in command["added"]]
+            if remaining:
+                logs[day] = remaining
+            else:
+                logs.pop(day, None)
+        else:
+            logs[day] = sorted(set(logs.get(day, [])).union(command["added"]))
+    elif op in ("progress", "mood", "schedule", "link"):
+        target, key = {
+            "progress": (record["progress"], command.get("habit")),
+            "mood": (record["moods"], command.get("day")),
+            "schedule": (record["schedules"], command.get("habit")),
+            "link": (record["links"], command.get("account"))
+        }[op]
+        value = command["old"] if undo else command["new"]
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = value
+    elif op == "notes":
+        record["notes"] = command["old"] if undo else command["new"]
+    else:
+        raise ValueError(f"unknown command: {op}")
+    return True
+
+# ---------- Undo History ----------
+class CommandHistory:
+    def __init__(self, store, limit=UNDO_LIMIT):
+        self.store = store
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+
+    def record(self, command):
+        # Called with whatever a store method returned; None means no change
+        if command is not None:
+            self.undo_stack.append(command)
+            self.redo_stack.clear()
+        return command
+
+    def undo(self):
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        self.replay(command, undo=True)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        self.replay(command)
+        self.undo_stack.append(command)
+        return command
+
+    def replay(self, command, undo=False):
+        # A command another process's change made impossible is dropped from
+        # both stacks, the same as the store drops its pending ones, and
+        # reported as a ValueError
+        try:
+            self.store.execute(command, undo)
+        except (ValueError, KeyError, IndexError) as e:
+            action = "undo" if undo else "redo"
+            raise ValueError(f"can't {action} {describe_command(command)}: changed elsewhere") from e
+
+def describe_command(command):
+    op = command["op"]
+    if op == "add_habit":
+        return f"add habit '{command['habit']}'"
+    if op == "remove_habit":
+        return f"remove habit '{command['habit']}'"
+    if op == "log":
+        return f"log {', '.join(command['added'])} on {command['day']}"
+    if op == "progress":
+        return f"progress of '{command['habit']}'"
+    if op == "mood":
+        return f"mood on {command['day']}"
+    if op == "schedule":
+        return f"schedule of '{command['habit']}'"
+    if op == "link":
+        return f"link to '{command['account']}'"
+    return "note"
@@ -0,0 +1,70 @@
+import datetime
+
+import numpy as np
+
+# ---------- Year Heatmap ----------
+# A year of logs binned into a weekday x week grid (Mon = row 0, week 0 is
+# the one holding 1 January), as used by the Tk app's year view. Kept out
+# of habitcore's top level so the API server doesn't need NumPy.
+HEATMAP_LEVELS = 4
+# Outside the year, no habits, then light to dark by completion
+HEATMAP_COLORS = ["#ffffff", "#ebedf0", "#9be9a8", "#40c463", "#30a14e", "#216e39"]
+
+def year_start(year):
+    # Monday of the week holding 1 January
+    first = datetime.date(year, 1, 1)
+    return first - datetime.timedelta(days=first.weekday())
+
+def year_weeks(year):
+    last = datetime.date(year, 12, 31)
+    return (last - year_start(year)).days // 7 + 1
+
+def year_grid(store, username, year, habit=None):
+    # Habits completed per day (or 0/1 for one habit); -1 outside the year
+    def compute():
+        start = year_start(year)
+        weeks = year_weeks(year)
+        logs = store.logs_between(username, f"{year:04d}-01-01", f"{year:04d}-12-31")
+        days = np.array([day for day, _ in logs], dtype="datetime64[D]")
+        if habit is None:
+            counts = np.fromiter((len(habits) for _, habits in logs), dtype=np.int64, count=len(logs))
+        else:
+            counts = np.fromiter((habit in habits for _, habits in logs), dtype=np.int64, count=len(logs))
+        offsets = (days - np.datetime64(start, "D")).astype(np.int64)
+        grid = np.bincount(offsets, weights=counts, minlength=weeks * 7).astype(np.int64)
+
+        # Pad the partial first and last weeks
+        first = (datetime.date(year, 1, 1) - start).days
+        last = (datetime.date(year, 12, 31) - start).days
+        grid[:first] = -1
+        grid[last + 1:] = -1
+        return grid.reshape(weeks, 7).T
+
+    return store.cached(username, ("year_grid", year, habit), compute)
+
+def grid_levels(grid, total):
+    # 0 outside the year, 1 for nothing logged, then HEATMAP_LEVELS steps
+    # of the share of total completed
+    share = np.clip(grid, 0, None) / max(total, 1)
+    levels = np.ceil(share * HEATMAP_LEVELS).astype(np.int64)
+    levels = np.clip(levels, 0, HEATMAP_LEVELS) + 1
+    levels[grid < 0] = 0
+    return levels
+
+def heatmap_pixels(levels, cell, gap):
+    # Level per pixel: each cell drawn cell x cell with a gap after it
+    size = cell + gap
+    pixels = np.repeat(np.repeat(levels, size, axis=0), size, axis=1)
+    inside = np.arange(levels.shape[0] * size) % size < cell
+    across = np.arange(levels.shape[1] * size) % size < cell
+    return np.where(inside[:, None] & across[None, :], pixels, 0)
+
+def photo_data(pixels, colors=HEATMAP_COLORS):
+    # Row strings in the format Tk's PhotoImage.put() takes
+    palette = np.array(colors)
+    return " ".join("{" + " ".join(row) + "}" for row in palette[pixels])
+
+def cell_date(year, row, column):
+    # Date at a grid cell, or None outside the year
+    day = year_start(year) + datetime.timedelta(days=column * 7 + row)
+    return day if day.year == year and 0 <= row < 7 else None
@@ -0,0 +1,54 @@
+from habitcore.models import SCHEMA_VERSION, new_habit_user
+
+# ---------- Schema Migrations ----------
+# MIGRATIONS[n] upgrades a user record from schema n to n + 1. Records are
+# upgraded one at a time when they are first read, never all at startup.
+# Records written before versioning have no "schema" key and count as 0.
+MIGRATIONS = {}
+
+def migration(from_version):
+    def register(func):
+        MIGRATIONS[from_version] = func
+        return func
+    return register
+
+@migration(0)
+def add_missing_fields(record):
+    # Early records may lack fields added to login_user over time
+    for key, value in new_habit_user().items():
+        record.setdefault(key, value)
+    if not isinstance(record["notes"], str):
+        record["notes"] = ""
+    return record
+
+@migration(1)
+def normalise_logs(record):
+    # One sorted entry per habit per day, and no empty days
+    record["logs"] = {day: sorted(set(habits)) for day, habits in record["logs"].items() if habits}
+    for habit in record["habits"]:
+        record["progress"].setdefault(habit, 0)
+    return record
+
+@migration(2)
+def add_schedules(record):
+    # Habits without a schedule stay daily
+    record.setdefault("schedules", {})
+    return record
+
+@migration(3)
+def add_links(record):
+    # No PersonaVista account is linked until the tracker confirms it
+    record.setdefault("links", {})
+    return record
+
+def migrate_user(record):
+    # Returns True if the record was upgraded. Records from a newer version
+    # of the app are left alone.
+    version = record.get("schema", 0)
+    if version >= SCHEMA_VERSION:
+        return False
+    while version < SCHEMA_VERSION:
+        record = MIGRATIONS[version](record)
+        version += 1
+        record["schema"] = version
+    return True
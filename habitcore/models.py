@@ -0,0 +1,47 @@
+# ---------- Shared Mood Scale ----------
+# Both apps record moods with their own labels; everything is compared on
+# one 1-5 scale (1 = worst, 5 = best)
+MOOD_LABELS = {1: "Anxious", 2: "Down", 3: "Okay", 4: "Good", 5: "Great"}
+
+# PersonaVista journal moods, in the order they are offered
+JOURNAL_MOODS = {
+    "😄 Great": 5,
+    "😊 Good": 4,
+    "😐 Okay": 3,
+    "😔 Down": 2,
+    "😤 Frustrated": 2,
+    "😰 Anxious": 1,
+    "🤔 Confused": 2
+}
+
+# Habit tracker moods, in the order they are offered
+TRACKER_MOODS = {
+    "Happy": 4,
+    "Sad": 2,
+    "Neutral": 3,
+    "Excited": 5,
+    "Stressed": 1,
+    "Calm": 4
+}
+
+def mood_score(label):
+    return JOURNAL_MOODS.get(label, TRACKER_MOODS.get(label))
+
+# ---------- Shared User Model ----------
+# Bump when the user record changes and add a step to habitcore.migrations
+SCHEMA_VERSION = 4
+
+def new_habit_user():
+    return {
+        "schema": SCHEMA_VERSION,
+        "habits": [],
+        "logs": {},
+        "streak": 0,
+        "notes": "",
+        "moods": {},
+        "progress": {},
+        "schedules": {},
+        # PersonaVista account -> the link code it showed; only linked
+        # accounts may read this record
+        "links": {}
+    }
@@ -0,0 +1,191 @@
+import bisect
+import datetime
+import heapq
+import re
+
+# ---------- Schedules ----------
+# A habit's schedule is a small rule stored under the user's "schedules":
+#   {"kind": "weekdays", "mask": m}  due on weekdays whose bit is set (Mon = bit 0)
+#   {"kind": "weekly", "times": n}   due until done n times in the week (Mon-Sun)
+#   {"kind": "interval", "every": k} due k days after it was last done
+# Habits without a schedule are daily.
+DAILY = {"kind": "weekdays", "mask": 0b1111111}
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+def habit_schedule(record, habit):
+    return record.get("schedules", {}).get(habit) or DAILY
+
+def parse_schedule(text):
+    # "daily", "mon,wed,fri", "3/week" or "every 2 days"; ValueError otherwise
+    text = text.strip().lower()
+    if text in ("", "daily", "every day"):
+        return None
+    match = re.fullmatch(r"(\d+)\s*(?:/|x|times?\s*(?:a|per))\s*week", text)
+    if match and 1 <= int(match.group(1)) <= 7:
+        return {"kind": "weekly", "times": int(match.group(1))}
+    match = re.fullmatch(r"every\s+(\d+)\s+days?", text)
+    if match and int(match.group(1)) >= 1:
+        return {"kind": "interval", "every": int(match.group(1))}
+    days = [day.strip()[:3] for day in re.split(r"[,\s]+", text) if day.strip()]
+    if days and all(day in WEEKDAY_NAMES for day in days):
+        return {"kind": "weekdays", "mask": sum(1 << WEEKDAY_NAMES.index(day) for day in set(days))}
+    raise ValueError(f"unrecognised schedule: {text!r}")
+
+def describe_schedule(rule):
+    rule = rule or DAILY
+    if rule["kind"] == "weekly":
+        return f"{rule['times']}/week"
+    if rule["kind"] == "interval":
+        return f"every {rule['every']} days"
+    if rule["mask"] == DAILY["mask"]:
+        return "daily"
+    return ",".join(name for i, name in enumerate(WEEKDAY_NAMES) if rule["mask"] >> i & 1)
+
+# ---------- Due Dates ----------
+# done is the sorted list of ISO dates a habit was logged on
+def done_on(done, day):
+    i = bisect.bisect_left(done, str(day))
+    return i < len(done) and done[i] == str(day)
+
+def done_between(done, start, end):
+    return bisect.bisect_right(done, str(end)) - bisect.bisect_left(done, str(start))
+
+def week_start(day):
+    return day - datetime.timedelta(days=day.weekday())
+
+def next_due(rule, done, day):
+    # First date on or after day when the habit is due and not yet done
+    one_day = datetime.timedelta(days=1)
+    if rule["kind"] == "interval":
+        i = bisect.bisect_right(done, str(day)) - 1
+        if i < 0:
+            return day
+        last = datetime.date.fromisoformat(done[i])
+        return max(last + datetime.timedelta(days=rule["every"]), day)
+    if rule["kind"] == "weekly":
+        while True:
+            monday = week_start(day)
+            if done_between(done, monday, monday + 6 * one_day) >= rule["times"]:
+                day = monday + 7 * one_day
+            elif done_on(done, day):
+                day += one_day
+            else:
+                return day
+    while not (rule["mask"] >> day.weekday() & 1) or done_on(done, day):
+        day += one_day
+    return day
+
+def last_miss(rule, done, day):
+    # Latest date before day on which an occurrence went undone, looking no
+    # further back than the habit's first completion; None if there is none.
+    # Costs the length of the habit's current run, not its whole history.
+    if not done:
+        return None
+    one_day = datetime.timedelta(days=1)
+    first = datetime.date.fromisoformat(done[0])
+    if rule["kind"] == "interval":
+        every = datetime.timedelta(days=rule["every"])
+        i = bisect.bisect_left(done, str(day)) - 1
+        if i < 0:
+            return None
+        if datetime.date.fromisoformat(done[i]) + every < day:
+            return datetime.date.fromisoformat(done[i]) + every
+        for j in range(i, 0, -1):
+            previous = datetime.date.fromisoformat(done[j - 1])
+            if datetime.date.fromisoformat(done[j]) > previous + every:
+                return previous + every
+        return None
+    if rule["kind"] == "weekly":
+        monday = week_start(day) - 7 * one_day
+        while monday >= week_start(first):
+            if done_between(done, monday, monday + 6 * one_day) < rule["times"]:
+                return monday + 6 * one_day
+            monday -= 7 * one_day
+        return None
+    day -= one_day
+    while day >= first:
+        if rule["mask"] >> day.weekday() & 1 and not done_on(done, day):
+            return day
+        day -= one_day
+    return None
+
+# ---------- Due Queue ----------
+# Per user: a min-heap of (next due date, habit), plus each habit's sorted
+# completion dates and latest miss. Built with one pass over the logs; after
+# that, listing what's due pops only entries that are due, and a change to
+# one habit recomputes only that habit. Outdated heap entries are skipped
+# lazily.
+class DueQueue:
+    def __init__(self, record, today):
+        self.record = record
+        self.today = today
+        self.heap = []
+        self.next_due = {}
+        self.misses = {}
+        self.done = {}
+        for day, habits in record["logs"].items():
+            for habit in habits:
+                self.done.setdefault(habit, []).append(day)
+        for days in self.done.values():
+            days.sort()
+        for habit in record["habits"]:
+            self.refresh(habit)
+
+    def refresh(self, habit, today=None):
+        today = today or self.today
+        if habit not in self.record["habits"]:
+            self.next_due.pop(habit, None)
+            self.misses.pop(habit, None)
+            return
+        rule = habit_schedule(self.record, habit)
+        done = self.done.get(habit, [])
+        due = next_due(rule, done, today)
+        if self.next_due.get(habit) != due:
+            self.next_due[habit] = due
+            heapq.heappush(self.heap, (due, habit))
+        self.misses[habit] = last_miss(rule, done, today)
+
+    def logged(self, habit, day, undo=False):
+        done = self.done.setdefault(habit, [])
+        i = bisect.bisect_left(done, day)
+        if undo:
+            if i < len(done) and done[i] == day:
+                del done[i]
+        elif i == len(done) or done[i] != day:
+            done.insert(i, day)
+        # A long-running process may log on a later day than it last asked
+        # about; due dates are worked out from that day on
+        self.today = max(self.today, datetime.date.fromisoformat(day))
+        # The heap entry may now be wrong in either direction
+        self.next_due.pop(habit, None)
+        self.refresh(habit)
+
+    def due(self, today):
+        self.today = today
+        due_today = []
+        while self.heap and self.heap[0][0] <= today:
+            due, habit = heapq.heappop(self.heap)
+            if self.next_due.get(habit) != due or habit in due_today:
+                continue
+            if due < today:
+                # Came due on an earlier day; work out where it stands today
+                del self.next_due[habit]
+                self.refresh(habit, today)
+            else:
+                due_today.append(habit)
+        for habit in due_today:
+            heapq.heappush(self.heap, (today, habit))
+        return due_today
+
+    def streak(self, today):
+        # Days in a row, up to today, on which nothing scheduled was missed;
+        # today counts once everything due today is done. Habits never done
+        # yet don't count against it.
+        outstanding = [habit for habit in self.due(today) if self.done.get(habit)]
+        firsts = [days[0] for habit, days in self.done.items() if days and habit in self.next_due]
+        if not firsts:
+            return 0
+        misses = [miss for miss in self.misses.values() if miss is not None]
+        start = max(misses) + datetime.timedelta(days=1) if misses else datetime.date.fromisoformat(min(firsts))
+        end = today if not outstanding else today - datetime.timedelta(days=1)
+        return max((end - start).days + 1, 0)
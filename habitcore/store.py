@@ -0,0 +1,563 @@
+import bisect
+import codecs
+import contextlib
+import datetime
+import json
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from habitcore.commands import (
+    add_habit_command, apply_command, link_command, log_command, mood_command, notes_command,
+    progress_command, remove_habit_command, schedule_command
+)
+from habitcore.migrations import migrate_user
+from habitcore.models import new_habit_user
+from habitcore.schedules import DueQueue
+
+# Rewrite the main file and empty the log once the log grows past this
+WAL_CHECKPOINT_BYTES = 1024 * 1024
+READ_CHUNK_BYTES = 256 * 1024
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# ---------- Streaming Load ----------
+def iter_json_object(f, on_progress=None):
+    # Yields the (key, value) pairs of the top-level JSON object in a binary
+    # file one at a time, reading it in chunks
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, eof, done = "", 0, False, 0
+
+    def read_more():
+        nonlocal buf, pos, eof, done
+        # Read at least as much as is buffered, so a huge record costs
+        # amortised linear time to retry
+        chunk = f.read(max(READ_CHUNK_BYTES, len(buf) - pos))
+        eof = not chunk
+        done += len(chunk)
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+        if on_progress:
+            on_progress(done)
+
+    def next_char():
+        nonlocal pos
+        pos = WHITESPACE.match(buf, pos).end()
+        while pos >= len(buf):
+            if eof:
+                raise ValueError("unexpected end of data file")
+            read_more()
+            pos = WHITESPACE.match(buf, pos).end()
+        return buf[pos]
+
+    def next_value():
+        nonlocal pos
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if end < len(buf) or eof:
+                    pos = end
+                    return value
+            except ValueError:
+                if eof:
+                    raise
+            read_more()
+
+    if next_char() != "{":
+        raise ValueError("data file is not a JSON object")
+    pos += 1
+    while True:
+        char = next_char()
+        if char == "}":
+            return
+        if char == ",":
+            pos += 1
+            continue
+        key = next_value()
+        if next_char() != ":":
+            raise ValueError(f"expected ':' after {key!r}")
+        pos += 1
+        yield key, next_value()
+
+def lock_file(f, locked):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX if locked else fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if locked else msvcrt.LK_UNLCK, 1)
+
+def replay_changes(record, changes):
+    # Applies a user's log entries, oldest first, on top of their record
+    for change in changes:
+        if "record" in change:
+            record = change["record"]
+            continue
+        if record is None:
+            record = new_habit_user()
+        # Commands were written against the current schema
+        migrate_user(record)
+        apply_command(record, change["command"], change.get("undo", False))
+    return record
+
+# ---------- Habit Store ----------
+# Wraps the habit tracker's data.json. Each user's logged dates are kept in
+# a sorted index so ranges are found by bisection, and every change bumps
+# the user's revision so cached aggregates know when to recompute. Several
+# readers can share one store; reload_if_changed() picks up writes made by
+# another process.
+#
+# Changes are appended to a write-ahead log next to the file (flush) instead
+# of rewriting every user: each mutation is logged as its command (see
+# habitcore.commands), other changes as the user's whole record. The log is
+# replayed on load and folded back into the file by save(). Records are
+# migrated to the current schema the first time they are read, and the
+# upgrade is flushed with the user's next change.
+#
+# With background=True the file is parsed on a thread, one user at a time;
+# looking a user up waits only until that user's record has been read.
+#
+# The Tk app, the API and PersonaVista may all have the same file open.
+# Reading and writing both files happens under an exclusive lock on a third
+# file next to them, and every write first catches up with whatever other
+# processes wrote since (sync), so nobody's changes are lost to someone
+# else's stale copy.
+class HabitStore:
+    def __init__(self, path, users=None, background=False):
+        self.path = path
+        self.lock = threading.RLock()
+        self.users = {}
+        self.signature = None
+        self.wal_offset = 0
+        self.file_mutex = threading.RLock()
+        self.file_lock_depth = 0
+        self.file_lock_handle = None
+        self.date_index = {}
+        self.revisions = {}
+        self.cache = {}
+        self.migrated = set()
+        self.dirty = set()
+        self.pending = []
+        self.due_queues = {}
+        self.ready = threading.Condition(self.lock)
+        self.loaded = True
+        self.load_progress = 1.0
+        self.load_error = None
+        if background:
+            self.start_background_load()
+        elif users is None:
+            self.load()
+        else:
+            # Already-loaded data, e.g. one user handed to a report worker
+            self.users = users
+
+    @property
+    def wal_path(self):
+        return self.path + ".wal"
+
+    @contextlib.contextmanager
+    def file_lock(self):
+        # Exclusive between processes, re-entrant within this one. Always
+        # taken before self.lock, never while holding it.
+        if self.path is None:
+            yield
+            return
+        with self.file_mutex:
+            if self.file_lock_depth == 0:
+                self.file_lock_handle = open(self.path + ".lock", 'a+')
+                lock_file(self.file_lock_handle, True)
+            self.file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self.file_lock_depth -= 1
+                if self.file_lock_depth == 0:
+                    lock_file(self.file_lock_handle, False)
+                    self.file_lock_handle.close()
+                    self.file_lock_handle = None
+
+    def file_state(self):
+        # Changes whenever either file is written, by us or anyone else
+        state = []
+        for path in (self.path, self.wal_path):
+            state.append((os.path.getmtime(path), os.path.getsize(path)) if os.path.exists(path) else None)
+        return tuple(state)
+
+    def load(self):
+        with self.file_lock():
+            users = self.read_files()
+            with self.lock:
+                self.install(users)
+
+    def read_files(self):
+        # Parses both files into fresh records without touching the ones in
+        # use, so it runs outside self.lock. Called with the file lock.
+        users = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                users = json.load(f)
+        for username, changes in self.read_wal().items():
+            users[username] = replay_changes(users.get(username), changes)
+        return users
+
+    def install(self, users):
+        # Replaces every record with freshly read ones. Called with self.lock.
+        self.users = users
+        self.signature = self.file_state()
+        self.date_index.clear()
+        self.due_queues.clear()
+        self.cache.clear()
+        self.migrated.clear()
+        self.dirty.clear()
+        self.pending.clear()
+        for username in self.users:
+            self.revisions[username] = self.revisions.get(username, 0) + 1
+
+    def read_wal(self, start=0):
+        # Changes per user from the log's lines past start; remembers where
+        # the last complete line ends in wal_offset
+        changes = {}
+        self.wal_offset = start
+        if not os.path.exists(self.wal_path):
+            self.wal_offset = 0
+            return changes
+        with open(self.wal_path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A write cut short by a crash; the next flush starts a
+                    # fresh line after it
+                    break
+                self.wal_offset += len(line)
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    # The remains of such a write, followed by that fresh line
+                    continue
+                changes.setdefault(change["user"], []).append(change)
+        return changes
+
+    def start_background_load(self):
+        self.loaded = False
+        self.load_progress = 0.0
+        self.users = {}
+        threading.Thread(target=self.background_load, name="habit-store-load", daemon=True).start()
+
+    def background_load(self):
+        try:
+            # The log is small and newer than the file, so it is read first
+            # and each user's latest record is published as soon as it is seen
+            with self.file_lock():
+                changes = self.read_wal()
+                if os.path.exists(self.path):
+                    size = max(os.path.getsize(self.path), 1)
+                    with open(self.path, 'rb') as f:
+                        for username, record in iter_json_object(f, lambda done: self.set_load_progress(done / size)):
+                            with self.ready:
+                                self.users[username] = replay_changes(record, changes.pop(username, []))
+                                self.ready.notify_all()
+                with self.ready:
+                    for username, user_changes in changes.items():
+                        self.users[username] = replay_changes(None, user_changes)
+                    self.signature = self.file_state()
+        except (OSError, ValueError) as e:
+            self.load_error = e
+        finally:
+            with self.ready:
+                self.loaded = True
+                self.load_progress = 1.0
+                self.ready.notify_all()
+
+    def set_load_progress(self, progress):
+        self.load_progress = min(progress, 1.0)
+
+    def wait_for(self, username=None):
+        # Blocks until the user's record is in, or the whole file if no user
+        # is given; a user missing from a fully loaded file simply isn't there
+        with self.ready:
+            self.ready.wait_for(lambda: self.loaded or (username is not None and username in self.users))
+        if self.load_error is not None:
+            raise self.load_error
+
+    def reload_if_changed(self):
+        # Picks up other processes' writes; our own unwritten changes stay
+        if self.path is None or self.file_state() == self.signature:
+            return
+        self.wait_for()
+        with self.file_lock():
+            self.sync()
+
+    def sync(self):
+        # Brings the records up to date with the files, then reapplies our
+        # commands not yet written on top. If only the log has grown since we
+        # last read or wrote it, just the new lines are replayed; if the main
+        # file was rewritten, everything is reloaded. Called with the file
+        # lock; the files are read before self.lock is taken, so readers of
+        # the records only wait for the changes to be applied.
+        state = self.file_state()
+        if state == self.signature:
+            return
+        wal_size = state[1][1] if state[1] else 0
+        if self.signature is not None and state[0] == self.signature[0] and wal_size >= self.wal_offset:
+            changes, users = self.read_wal(self.wal_offset), None
+        else:
+            changes, users = None, self.read_files()
+        with self.lock:
+            self.apply_sync(changes, users)
+
+    def apply_sync(self, changes, users):
+        pending, dirty = list(self.pending), set(self.dirty)
+        if users is None:
+            for command, undo in reversed(pending):
+                apply_command(self.users[command["user"]], command, not undo)
+            for username, user_changes in changes.items():
+                self.users[username] = replay_changes(self.users.get(username), user_changes)
+                self.forget(username)
+            self.signature = self.file_state()
+        else:
+            self.install(users)
+            # Users we created or migrated are written whole again
+            for username in dirty:
+                self.user(username, create=True)
+        self.pending = []
+        for command, undo in pending:
+            username = command["user"]
+            try:
+                if not apply_command(self.user(username, create=True), command, undo):
+                    # Made moot by the other process, e.g. it added the
+                    # same habit
+                    continue
+            except (ValueError, KeyError, IndexError):
+                # Made moot by the other process; its change stands
+                continue
+            self.forget(username)
+            self.pending.append((command, undo))
+
+    def forget(self, username):
+        # Drops what was derived from a record changed outside execute()
+        self.date_index.pop(username, None)
+        self.due_queues.pop(username, None)
+        self.migrated.discard(username)
+        self.revisions[username] = self.revisions.get(username, 0) + 1
+
+    def save(self):
+        # Records are encoded one user at a time under self.lock and written
+        # without it, so readers only ever wait for one user's encoding
+        self.wait_for()
+        with self.file_lock():
+            self.sync()
+            with self.lock:
+                usernames = list(self.users)
+                for username in usernames:
+                    self.user(username)
+            # Where each user's pending commands stood when the record was
+            # encoded; later ones aren't in the file and stay pending
+            encoded_at = {}
+            # Write to a temporary file first so a crash never truncates the data
+            with open(self.path + ".tmp", 'w') as f:
+                f.write("{")
+                for i, username in enumerate(usernames):
+                    with self.lock:
+                        # Same layout as json.dump(self.users, f, indent=4)
+                        text = json.dumps({username: self.users[username]}, indent=4)
+                        encoded_at[username] = len(self.pending)
+                    f.write(("," if i else "") + text[1:-2])
+                f.write("\n}" if usernames else "}")
+            os.replace(self.path + ".tmp", self.path)
+            # The log only repeats what the file now holds
+            open(self.wal_path, 'w').close()
+            with self.lock:
+                self.pending = [(command, undo) for i, (command, undo) in enumerate(self.pending)
+                                if i >= encoded_at.get(command["user"], 0)]
+                self.dirty.difference_update(encoded_at)
+                self.wal_offset = 0
+                self.signature = self.file_state()
+
+    def flush(self):
+        # Append the users changed since the last flush to the log. Only
+        # taking the lines out needs self.lock; the write happens without it.
+        if self.path is None or (not self.dirty and not self.pending):
+            return
+        # Catching up needs the whole file read first
+        self.wait_for()
+        with self.file_lock():
+            self.sync()
+            with self.lock:
+                if not self.dirty and not self.pending:
+                    return
+                # A user's whole record already includes their pending commands
+                lines = [json.dumps({"user": username, "record": self.users[username]}) + "\n"
+                         for username in sorted(self.dirty)]
+                lines.extend(json.dumps({"user": command["user"], "command": command, "undo": undo}) + "\n"
+                             for command, undo in self.pending if command["user"] not in self.dirty)
+                self.dirty.clear()
+                self.pending.clear()
+            with open(self.wal_path, 'ab') as f:
+                if f.tell() > self.wal_offset:
+                    # Left over from a write cut short
+                    f.write(b"\n")
+                f.write("".join(lines).encode())
+                self.wal_offset = f.tell()
+            if self.wal_offset > WAL_CHECKPOINT_BYTES:
+                self.save()
+            else:
+                self.signature = self.file_state()
+
+    def user(self, username, create=False):
+        if not self.loaded:
+            self.wait_for(username)
+        with self.lock:
+            if username not in self.users:
+                if not create:
+                    return None
+                self.users[username] = new_habit_user()
+                self.migrated.add(username)
+                self.touch(username)
+            elif username not in self.migrated:
+                self.migrated.add(username)
+                if migrate_user(self.users[username]):
+                    self.dirty.add(username)
+            return self.users[username]
+
+    def touch(self, username):
+        self.revisions[username] = self.revisions.get(username, 0) + 1
+        self.dirty.add(username)
+
+    def revision(self, username):
+        return self.revisions.get(username, 0)
+
+    def cached(self, username, name, compute):
+        # Aggregates are reused until the user's data changes
+        key = (username, name)
+        with self.lock:
+            revision = self.revision(username)
+            entry = self.cache.get(key)
+            if entry is None or entry[0] != revision:
+                entry = self.cache[key] = (revision, compute())
+            return entry[1]
+
+    # ---------- Commands ----------
+    def execute(self, command, undo=False):
+        # Applies (or reverts) a command and queues it for the log
+        with self.lock:
+            username = command["user"]
+            record = self.user(username)
+            day = command.get("day") if command["op"] == "log" else None
+            was_logged = bool(day and record["logs"].get(day))
+            if not apply_command(record, command, undo):
+                return None
+            if day and username in self.date_index:
+                self.update_date_index(username, day, was_logged, bool(record["logs"].get(day)))
+            queue = self.due_queues.get(username)
+            if queue is not None:
+                if day:
+                    for habit in command["added"]:
+                        queue.logged(habit, day, undo)
+                elif "habit" in command:
+                    queue.refresh(command["habit"])
+            self.revisions[username] = self.revisions.get(username, 0) + 1
+            self.pending.append((command, undo))
+            return command
+
+    def run(self, build, username, *args):
+        # Builds a command against the current record and executes it;
+        # returns None when there is nothing to change
+        with self.lock:
+            command = build(username, self.user(username), *args)
+            return self.execute(command) if command is not None else None
+
+    def update_date_index(self, username, day, was_logged, is_logged):
+        dates = self.date_index[username]
+        i = bisect.bisect_left(dates, day)
+        if is_logged and not was_logged:
+            dates.insert(i, day)
+        elif was_logged and not is_logged and i < len(dates) and dates[i] == day:
+            del dates[i]
+
+    # ---------- Habits ----------
+    # Mutators return the executed command, for undo history
+    def add_habit(self, username, habit):
+        return self.run(add_habit_command, username, habit)
+
+    def remove_habit(self, username, habit):
+        return self.run(remove_habit_command, username, habit)
+
+    def set_streak(self, username, streak):
+        # Derived from the logs and recomputed whenever they are shown, so it
+        # neither invalidates cached aggregates nor gets a log entry of its
+        # own; it is written with the user's next full record or save()
+        with self.lock:
+            self.user(username)["streak"] = streak
+
+    def set_progress(self, username, habit, progress):
+        return self.run(progress_command, username, habit, progress)
+
+    def set_schedule(self, username, habit, rule):
+        return self.run(schedule_command, username, habit, rule)
+
+    def due_queue(self, username, today=None):
+        # Built on first use, then kept current by execute()
+        with self.lock:
+            queue = self.due_queues.get(username)
+            if queue is None:
+                record = self.user(username)
+                if record is None:
+                    return None
+                queue = self.due_queues[username] = DueQueue(record, today or datetime.date.today())
+            return queue
+
+    # ---------- Logs ----------
+    def log_dates(self, username):
+        # Sorted dates with at least one habit logged; built once per load
+        with self.lock:
+            dates = self.date_index.get(username)
+            if dates is None:
+                user = self.user(username)
+                if user is None:
+                    return []
+                logs = user["logs"]
+                dates = self.date_index[username] = sorted(day for day, habits in logs.items() if habits)
+            return dates
+
+    def log_habits(self, username, day, habits):
+        return self.run(log_command, username, day, habits)
+
+    def habits_on(self, username, day):
+        user = self.user(username)
+        return list(user["logs"].get(day, [])) if user else []
+
+    def logs_between(self, username, start, end):
+        # Logged days with start <= day <= end, oldest first (ISO date strings)
+        with self.lock:
+            user = self.user(username)
+            if user is None:
+                return []
+            dates = self.log_dates(username)
+            lo = bisect.bisect_left(dates, start)
+            hi = bisect.bisect_right(dates, end)
+            return [(day, list(user["logs"][day])) for day in dates[lo:hi]]
+
+    # ---------- Moods and Notes ----------
+    def set_mood(self, username, day, mood):
+        return self.run(mood_command, username, day, mood)
+
+    def set_notes(self, username, notes):
+        return self.run(notes_command, username, notes)
+
+    # ---------- Linked Accounts ----------
+    def set_link(self, username, account, code):
+        # Confirms (or with code None, revokes) a PersonaVista account's
+        # request to read this user's habits
+        return self.run(link_command, username, account, code)
+
+    def linked(self, username, account, code):
+        # True only if the tracker user confirmed this account's current code
+        user = self.user(username)
+        return bool(user and code and user.get("links", {}).get(account) == code)
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from habitcore import CommandHistory, HabitStore, parse_schedule
+
+# ---------- Helpers ----------
+def data_file(tmp_path):
+    return str(tmp_path / "data.json")
+
+# ---------- Undo and Redo ----------
+def test_undo_redo_round_trip(tmp_path):
+    store = HabitStore(data_file(tmp_path))
+    store.user("u", create=True)
+    history = CommandHistory(store)
+    states = [json.dumps(store.users["u"], sort_keys=True)]
+    changes = [
+        lambda: store.add_habit("u", "Run"),
+        lambda: store.add_habit("u", "Read"),
+        lambda: store.log_habits("u", "2026-10-01", ["Run", "Read"]),
+        lambda: store.set_progress("u", "Run", 40),
+        lambda: store.set_schedule("u", "Read", parse_schedule("mon,thu")),
+        lambda: store.set_mood("u", "2026-10-01", "Calm"),
+        lambda: store.set_notes("u", "hello"),
+        lambda: store.set_link("u", "web-user", "ABC123"),
+        lambda: store.remove_habit("u", "Read")
+    ]
+    for change in changes:
+        assert history.record(change()) is not None
+        states.append(json.dumps(store.users["u"], sort_keys=True))
+
+    for state in reversed(states[:-1]):
+        history.undo()
+        assert json.dumps(store.users["u"], sort_keys=True) == state
+    assert history.undo() is None
+    for state in states[1:]:
+        history.redo()
+        assert json.dumps(store.users["u"], sort_keys=True) == state
+    assert history.redo() is None
+
+    # The log replays undos and redos the same way
+    store.flush()
+    assert HabitStore(data_file(tmp_path)).users["u"] == store.users["u"]
+
+# ---------- Changes From Another Process ----------
+def test_undo_add_after_habit_removed_elsewhere(tmp_path):
+    tk_app = HabitStore(data_file(tmp_path))
+    tk_app.user("u", create=True)
+    history = CommandHistory(tk_app)
+    history.record(tk_app.add_habit("u", "Run"))
+    tk_app.flush()
+    api = HabitStore(data_file(tmp_path))
+    api.remove_habit("u", "Run")
+    api.flush()
+
+    tk_app.sync()
+    assert history.undo() is not None
+    assert tk_app.users["u"]["habits"] == []
+    # Redo adds it back once, and a second add elsewhere doesn't duplicate it
+    api.add_habit("u", "Run")
+    api.flush()
+    tk_app.sync()
+    assert history.redo() is not None
+    assert tk_app.users["u"]["habits"] == ["Run"]
+    tk_app.flush()
+    assert HabitStore(data_file(tmp_path)).users["u"]["habits"] == ["Run"]
+
+def test_failed_undo_is_dropped_and_reported(tmp_path):
+    store = HabitStore(data_file(tmp_path))
+    store.user("u", create=True)
+    history = CommandHistory(store)
+    history.record(store.add_habit("u", "Run"))
+    history.record(store.set_notes("u", "hello"))
+    # A command the store can no longer apply
+    history.undo_stack[-1] = {"op": "rename", "user": "u"}
+    with pytest.raises(ValueError, match="can't undo"):
+        history.undo()
+    assert list(history.redo_stack) == []
+    assert history.undo()["op"] == "add_habit"
+    assert store.users["u"]["habits"] == []
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+import time
+
+import habit_api
+
+# ---------- Helpers ----------
+def run_with_server(tmp_path, client):
+    # Serves the API on a free local port and runs client(port) against it
+    async def main():
+        service = habit_api.HabitService(str(tmp_path / "data.json"))
+        server = await asyncio.start_server(
+            lambda reader, writer: habit_api.handle_connection(service, reader, writer), "127.0.0.1", 0
+        )
+        async with server:
+            return await client(server.sockets[0].getsockname()[1])
+
+    return asyncio.run(main())
+
+async def request(port, method, target, body=b"", headers=""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+                 f"{headers}\r\n".encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:] if line)
+    payload = json.loads(await reader.readexactly(int(headers["content-length"])))
+    closed = headers["connection"] == "close" and await reader.read() == b""
+    writer.close()
+    return int(lines[0].split()[1]), payload, closed
+
+# ---------- Tests ----------
+def test_log_then_query(tmp_path):
+    async def client(port):
+        body = json.dumps({"user": "alice", "date": "2026-10-01", "habits": ["Run"]}).encode()
+        status, payload, _ = await request(port, "POST", "/log", body)
+        assert status == 200 and payload["logged"] == 1
+        status, payload, _ = await request(port, "GET", "/logs?user=alice&start=2026-10-01&end=2026-10-01")
+        assert status == 200
+        assert payload["logs"] == [{"date": "2026-10-01", "habits": ["Run"]}]
+
+    run_with_server(tmp_path, client)
+
+def test_oversized_body_gets_413(tmp_path):
+    async def client(port):
+        body = b"x" * (habit_api.MAX_BODY_BYTES + 1)
+        status, payload, closed = await request(port, "POST", "/log", body)
+        assert status == 413
+        assert "too large" in payload["error"]
+        assert closed
+
+    run_with_server(tmp_path, client)
+
+def test_errors(tmp_path):
+    async def client(port):
+        assert (await request(port, "GET", "/streak?user=bob"))[0] == 404
+        assert (await request(port, "GET", "/log"))[0] == 405
+        assert (await request(port, "POST", "/log", b"not json"))[0] == 400
+
+    run_with_server(tmp_path, client)
+
+def test_refresh_waits_for_other_writers_off_the_event_loop(tmp_path):
+    async def client(port):
+        body = json.dumps({"user": "alice", "date": "2026-10-01", "habits": ["Run"]}).encode()
+        assert (await request(port, "POST", "/log", body))[0] == 200
+
+        # Another process writes, and is still holding the file lock
+        other = habit_api.HabitStore(str(tmp_path / "data.json"))
+        other.log_habits("alice", "2026-10-02", ["Run"])
+        other.flush()
+        release = threading.Event()
+        locked = threading.Event()
+
+        def hold_lock():
+            with other.file_lock():
+                locked.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait()
+        pending = asyncio.ensure_future(request(port, "GET", "/logs?user=alice&start=2026-10-01&end=2026-10-02"))
+        start = time.monotonic()
+        await asyncio.sleep(0.1)
+        # The loop kept running while the request waited for the lock
+        assert time.monotonic() - start < 0.5
+        assert not pending.done()
+        release.set()
+        status, payload, _ = await pending
+        holder.join()
+        assert status == 200
+        assert [log["date"] for log in payload["logs"]] == ["2026-10-01", "2026-10-02"]
+
+    run_with_server(tmp_path, client)
@@ -0,0 +1,20 @@
+import json
+
+import habit_reports
+
+def test_safe_name_keeps_distinct_users_apart():
+    names = ["a b", "a_b", "a/b", "Alice", "alice", "report_summary"]
+    files = [habit_reports.safe_name(name).lower() for name in names]
+    assert len(set(files)) == len(names)
+    assert habit_reports.safe_name("a b").startswith("a_b-")
+
+def test_run_reports_writes_one_file_per_user(tmp_path):
+    user = {"habits": ["Run"], "logs": {"2026-10-01": ["Run"]}, "streak": 0, "notes": "",
+            "moods": {}, "progress": {"Run": 0}}
+    data = tmp_path / "data.json"
+    data.write_text(json.dumps({"a b": user, "a_b": user}))
+    results, _ = habit_reports.run_reports(str(data), str(tmp_path / "reports"), "csv", 1)
+    assert [r["error"] for r in results] == [None, None]
+    files = {r["file"] for r in results}
+    assert len(files) == 2
+    assert all((tmp_path / "reports" / (name + ".csv")).exists() for name in files)
@@ -0,0 +1,66 @@
+import datetime
+
+import numpy as np
+
+from habitcore import HabitStore, new_habit_user
+from habitcore.heatmap import cell_date, grid_levels, heatmap_pixels, photo_data, year_grid, year_weeks
+
+# ---------- Helpers ----------
+def logged_store():
+    # 2026 starts and ends on a Thursday
+    store = HabitStore(None, users={"u": new_habit_user()})
+    for habit in ("Run", "Read"):
+        store.add_habit("u", habit)
+    store.log_habits("u", "2025-12-30", ["Run"])
+    store.log_habits("u", "2026-01-01", ["Run", "Read"])
+    store.log_habits("u", "2026-06-15", ["Run"])
+    store.log_habits("u", "2026-12-31", ["Run"])
+    return store
+
+# ---------- Year Grid ----------
+def test_partial_weeks_are_padded():
+    grid = year_grid(logged_store(), "u", 2026)
+    assert grid.shape == (7, year_weeks(2026)) == (7, 53)
+    # Mon-Wed of the first week are in 2025, Fri-Sun of the last in 2027
+    assert list(grid[:, 0]) == [-1, -1, -1, 2, 0, 0, 0]
+    assert list(grid[:, -1]) == [0, 0, 0, 1, -1, -1, -1]
+    assert (grid >= 0).sum() == 365
+    assert grid[np.clip(grid, 0, None) > 0].sum() == 4
+
+def test_one_habit_counts_only_that_habit():
+    store = logged_store()
+    run = year_grid(store, "u", 2026, "Run")
+    read = year_grid(store, "u", 2026, "Read")
+    assert run[3, 0] == 1 and run[3, -1] == 1 and run[0, 24] == 1
+    assert read[3, 0] == 1 and read[3, -1] == 0 and read[0, 24] == 0
+    assert read[read > 0].sum() == 1
+
+def test_grid_follows_new_logs():
+    store = logged_store()
+    assert year_grid(store, "u", 2026)[1, 1] == 0
+    store.log_habits("u", "2026-01-06", ["Read"])
+    assert year_grid(store, "u", 2026)[1, 1] == 1
+
+# ---------- Levels and Pixels ----------
+def test_share_maps_to_levels():
+    grid = np.array([[-1, 0, 1, 2, 3, 4, 6]])
+    assert list(grid_levels(grid, 4)[0]) == [0, 1, 2, 3, 4, 5, 5]
+    # Nothing to complete still shows logged days at full level
+    assert list(grid_levels(np.array([[0, 1]]), 0)[0]) == [1, 5]
+
+def test_cells_are_drawn_with_gaps():
+    pixels = heatmap_pixels(np.array([[1, 2], [3, 0]]), 2, 1)
+    assert pixels.shape == (6, 6)
+    assert list(pixels[0]) == [1, 1, 0, 2, 2, 0]
+    assert list(pixels[2]) == [0] * 6
+    assert list(pixels[4]) == [3, 3, 0, 0, 0, 0]
+    assert photo_data(np.array([[0, 1]]), ["#000", "#fff"]) == "{#000 #fff}"
+
+# ---------- Clicks ----------
+def test_cells_map_back_to_dates():
+    assert cell_date(2026, 3, 0) == datetime.date(2026, 1, 1)
+    assert cell_date(2026, 0, 24) == datetime.date(2026, 6, 15)
+    assert cell_date(2026, 3, 52) == datetime.date(2026, 12, 31)
+    assert cell_date(2026, 2, 0) is None
+    assert cell_date(2026, 4, 52) is None
+    assert cell_date(2026, 7, 10) is None
@@ -0,0 +1,547 @@
+import datetime
+import io
+import random
+import time
+
+import numpy as np
+import pytest
+
+import PERSONA_VISTA as pv
+
+# ---------- Helpers ----------
+def random_answers(rng):
+    return {i: rng.randrange(len(question["options"])) for i, question in enumerate(pv.PERSONALITY_QUESTIONS)}
+
+# ---------- Quiz Scoring ----------
+def test_matrix_scoring_matches_counting_answers():
+    rng = random.Random(1)
+    sheets = [random_answers(rng) for _ in range(50)]
+    for answers, row in zip(sheets, pv.score_answer_sheets(sheets)):
+        counted = dict.fromkeys(pv.TRAIT_NAMES, 0)
+        for i, answer in answers.items():
+            counted[pv.PERSONALITY_QUESTIONS[i]["traits"][answer]] += 1
+        assert pv.scores_to_dict(row) == counted
+        assert pv.calculate_personality_scores(answers) == counted
+
+def test_rescore_skips_answers_without_a_question():
+    answers = {"0": 0, "1": 99, str(len(pv.PERSONALITY_QUESTIONS)): 0, "2": -1, "3": 1}
+    users = {"old": {"quiz_results": {"answers": answers}}}
+    assert pv.rescore_all_users(users) == (1, {"old": {"1": 99, str(len(pv.PERSONALITY_QUESTIONS)): 0, "2": -1}})
+    assert users["old"]["personality_data"] == pv.calculate_personality_scores({"0": 0, "3": 1})
+    # The stored sheet is left as it was
+    assert users["old"]["quiz_results"]["answers"] == answers
+
+def test_weighted_options_share_the_matrix():
+    questions = [{"options": ["a", "b"], "traits": ["Thinking", {"Feeling": 2, "Openness": 0.5}]}]
+    weights, offsets = pv.build_scoring_matrix(questions)
+    assert list(offsets) == [0]
+    assert weights[1, pv.TRAIT_INDEX["Feeling"]] == 2
+    assert weights[1, pv.TRAIT_INDEX["Openness"]] == 0.5
+    assert weights[0].sum() == 1
+
+def test_mbti_batch_matches_single_and_rescore():
+    rng = random.Random(2)
+    users = {f"u{n}": {"quiz_results": {"answers": {str(i): a for i, a in random_answers(rng).items()}}}
+             for n in range(20)}
+    users["new"] = {"quiz_results": {}}
+    assert pv.rescore_all_users(users) == (20, {})
+    for user in users.values():
+        results = user["quiz_results"]
+        if results:
+            assert results["mbti"] == pv.determine_mbti(results["scores"])
+            assert results["suggestions"]
+            assert user["personality_data"] == results["scores"]
+    assert pv.determine_mbti(dict.fromkeys(pv.TRAIT_NAMES, 0)) == "INFP"
+    assert pv.determine_mbti_batch(np.zeros((0, len(pv.TRAIT_NAMES)))) == []
+
+# ---------- Relaxation Timers ----------
+def test_timers_run_from_their_start_time(monkeypatch):
+    monkeypatch.setattr(pv.time, "time", lambda: 1000.0)
+    timer = {'start': 990.0, 'duration': 12}
+    assert pv.timer_elapsed(timer) == 10
+    assert not pv.timer_finished(timer)
+    monkeypatch.setattr(pv.time, "time", lambda: 1002.0)
+    assert pv.timer_finished(timer)
+
+# ---------- Figure Cache ----------
+def test_figure_cache_key_keeps_order():
+    assert pv.figure_cache_key("bar", ({"A": 1, "B": 2},)) == pv.figure_cache_key("bar", ({"A": 1, "B": 2},))
+    assert pv.figure_cache_key("bar", ({"A": 1, "B": 2},)) != pv.figure_cache_key("bar", ({"B": 2, "A": 1},))
+    assert pv.figure_cache_key("bar", ({"A": 1},)) != pv.figure_cache_key("pie", ({"A": 1},))
+
+def test_cached_figure_builds_once():
+    built = []
+
+    def build(scores):
+        built.append(scores)
+        return pv.build_trait_bar(scores)
+
+    scores = {"Extroversion": 3, "Introversion": 1}
+    fig = pv.cached_figure("test_bar", build, scores)
+    assert pv.cached_figure("test_bar", build, dict(scores)) is fig
+    assert len(built) == 1
+    assert fig.layout.font.color == "white"
+    assert list(fig.data[0].x) == ["Extroversion", "Introversion"]
+
+# ---------- Mood Journal Columns ----------
+def journal_entry(date_str, mood_index=0, energy=5, text="", analysis=None):
+    entry = {'date': date_str, 'mood': pv.MOOD_OPTIONS[mood_index], 'energy': energy, 'text': text}
+    if analysis is not None:
+        entry['analysis'] = analysis
+    return entry
+
+def test_journal_columns_stay_in_date_order():
+    journal = [journal_entry("2026-10-03T09:00:00", 1), journal_entry("2026-10-01T09:00:00", 2),
+               journal_entry("2026-10-02T09:00:00", 3, analysis={'sentiment': 0.5, 'keywords': []})]
+    user_data = {'mood_journal': journal}
+    columns = pv.get_journal_columns(user_data)
+    assert list(columns['row']) == [1, 2, 0]
+    assert list(columns['mood']) == [2, 3, 1]
+    assert columns['sentiment'][2] == 0.5
+
+    # A late entry lands in place
+    journal.append(journal_entry("2026-10-01T12:00:00", 4, energy=9))
+    pv.insert_journal_row(columns, journal[3], 3)
+    columns['sentiment'].append(float("nan"))
+    assert list(columns['row']) == [1, 3, 2, 0]
+    assert pv.get_journal_columns(user_data) is columns
+    assert [entry['date'] for entry in pv.recent_journal_entries(user_data, 2)] == \
+        ["2026-10-03T09:00:00", "2026-10-02T09:00:00"]
+    assert pv.recent_journal_entries(user_data, 0) == []
+
+    frame = pv.journal_chart_frame(columns)
+    assert list(frame['energy']) == [5, 9, 5, 5]
+    assert frame['sentiment'].isna().tolist() == [True, True, False, True]
+
+# ---------- Journal Search ----------
+def search_user(n):
+    journal = [journal_entry(f"2026-{1 + i // 28:02d}-{1 + i % 28:02d}T08:00:00", i % 5,
+                             text=f"morning walk number {i}" + (" walk in the park" if i % 3 == 0 else ""))
+               for i in range(n)]
+    return {'mood_journal': journal, 'daily_challenges': {}, 'reflections': []}
+
+def test_search_ranks_more_matches_first():
+    user_data = search_user(6)
+    results, _ = pv.search_entries(user_data, "park walk")
+    assert [result['text'].endswith("park") for result in results] == [True, True, False, False, False, False]
+    assert results[0]['score'] >= results[1]['score'] > results[2]['score']
+    assert pv.search_entries(user_data, "the and")[0] == pv.search_entries(user_data, "")[0]
+
+def test_search_pages_cover_every_result_once():
+    user_data = search_user(95)
+    everything, _ = pv.search_entries(user_data, "walk", page_size=1000)
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = pv.search_entries(user_data, "walk", cursor=cursor, page_size=10)
+        seen += page
+        if cursor is None:
+            break
+    assert seen == everything
+    assert len(seen) == 95
+
+def test_search_filters():
+    user_data = search_user(60)
+    results, _ = pv.search_entries(user_data, "", mood=pv.MOOD_OPTIONS[2], page_size=100)
+    assert results and all(result['mood'] == pv.MOOD_OPTIONS[2] for result in results)
+    results, _ = pv.search_entries(user_data, "walk", start=datetime.date(2026, 2, 1),
+                                   end=datetime.date(2026, 2, 3), page_size=100)
+    assert sorted(result['date'][:10] for result in results) == ["2026-02-01", "2026-02-02", "2026-02-03"]
+
+def test_search_index_catches_up_with_new_entries():
+    user_data = search_user(3)
+    pv.search_entries(user_data, "walk")
+    user_data['mood_journal'].append(journal_entry("2026-10-01T08:00:00", text="quiet swim"))
+    pv.index_user_document(user_data, 'journal', "2026-10-01T08:00:00", "quiet swim", "title")
+    assert [result['text'] for result in pv.search_entries(user_data, "swim")[0]] == ["quiet swim"]
+
+# ---------- Recommendations ----------
+def test_nearest_profiles_match_brute_force_cosine():
+    rng = np.random.default_rng(3)
+    vectors = rng.integers(0, 5, size=(150, len(pv.TRAIT_NAMES))).astype(float)
+    index = pv.BruteForceIndex(len(pv.TRAIT_NAMES))
+    for key, vector in enumerate(vectors):
+        index.add(key, vector * 7)
+        index.add(key, vector)
+    assert len(index) == 150
+
+    query = rng.integers(0, 5, size=len(pv.TRAIT_NAMES)).astype(float)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)[:, None]
+    similarities = unit @ (query / np.linalg.norm(query))
+    expected = [key for key in np.argsort(-similarities, kind="stable") if key != 4][:10]
+    found = index.search(query, 10, exclude=4)
+    assert [similarity for _, similarity in found] == pytest.approx(similarities[expected])
+    assert index.search(np.zeros(len(pv.TRAIT_NAMES)), 10) == []
+
+def test_items_come_from_the_nearest_type():
+    scores = dict(zip(pv.TRAIT_NAMES, pv.mbti_profile_vector("ISTJ")))
+    assert set(pv.recommend_items("Books", scores, 4)) == set(pv.SUGGESTIONS_DB["Books"]["ISTJ"])
+
+def test_peers_vote_with_their_likes():
+    scores = dict(zip(pv.TRAIT_NAMES, pv.mbti_profile_vector("ENFP")))
+    for name, liked in [("test-peer-1", ["Dancing"]), ("test-peer-2", ["Dancing", "Chess"])]:
+        user_data = {'quiz_results': {'scores': scores}}
+        pv.register_user_profile(name, user_data)
+        for item in liked:
+            pv.like_suggestion(name, user_data, "Hobbies", item)
+        assert user_data['liked_suggestions']["Hobbies"] == liked
+    pv.register_user_profile("test-peer-me", {'quiz_results': {'scores': scores}})
+    assert pv.recommend_from_peers("test-peer-me", scores, "Hobbies")[:2] == ["Dancing", "Chess"]
+    assert "Dancing" not in pv.recommend_from_peers("test-peer-me", scores, "Hobbies", exclude={"Dancing"})
+
+# ---------- Habit Tracker Link ----------
+def test_habits_show_only_for_a_confirmed_link():
+    store = pv.HabitStore(None, users={})
+    store.user("sam", create=True)
+    user_data = {}
+    # The same name alone links nothing
+    assert pv.linked_habit_user("sam", user_data, store) is None
+    user_data['habit_link'] = {'tracker_user': "sam", 'code': "ABC123"}
+    assert pv.linked_habit_user("sam", user_data, store) is None
+    store.set_link("sam", "sam", "ABC123")
+    assert pv.linked_habit_user("sam", user_data, store) == "sam"
+    assert pv.linked_habit_user("impostor", dict(habit_link=user_data['habit_link']), store) is None
+
+# ---------- Population Statistics ----------
+def test_population_percentiles_match_sorted_scores():
+    pv.get_population_stats.clear()
+    rng = random.Random(4)
+    users = {}
+    for n in range(40):
+        scores = pv.calculate_personality_scores(random_answers(rng))
+        users[f"user{n}"] = {'quiz_results': {'scores': scores, 'mbti': pv.determine_mbti(scores)}}
+        pv.record_population_result(f"user{n}", users[f"user{n}"])
+    # A retake replaces the earlier result; recording it again changes nothing
+    scores = pv.calculate_personality_scores(random_answers(rng))
+    users["user0"] = {'quiz_results': {'scores': scores, 'mbti': pv.determine_mbti(scores)}}
+    pv.record_population_result("user0", users["user0"])
+    pv.record_population_result("user0", users["user0"])
+    pv.record_population_result("nobody", {'quiz_results': {}})
+
+    mine = users["user7"]['quiz_results']
+    rows, type_count, total = pv.population_comparison(mine['scores'], mine['mbti'])
+    assert total == 40
+    assert type_count == sum(user['quiz_results']['mbti'] == mine['mbti'] for user in users.values())
+    for row in rows:
+        values = [user['quiz_results']['scores'][row['Trait']] for user in users.values()]
+        below = sum(value < row['Your Score'] for value in values)
+        tied = sum(value == row['Your Score'] for value in values)
+        assert row['Percentile'] == int(round(100 * (below + tied / 2) / 40))
+        assert row['Population Median'] == sorted(values)[19]
+    pv.get_population_stats.clear()
+
+# ---------- Challenge Tracker ----------
+def test_challenge_streaks_from_history():
+    days = ["2026-10-01", "2026-10-02", "2026-10-03", "2026-10-05", "2026-10-06"]
+    user_data = {'daily_challenges': {day: {'completed': True} for day in days}}
+    user_data['daily_challenges']["2026-10-04"] = {'completed': False}
+    stats = pv.get_challenge_stats(user_data)
+    assert (stats['completed'], stats['current_streak'], stats['longest_streak']) == (5, 2, 3)
+    assert list(stats['recent']) == days
+    pv.record_challenge_completion(stats, "2026-10-06")
+    assert stats['completed'] == 5
+    assert pv.current_challenge_streak(stats, "2026-10-07") == 2
+    assert pv.current_challenge_streak(stats, "2026-10-08") == 0
+
+def test_challenges_repeat_only_after_a_full_cycle():
+    stats = pv.new_challenge_stats()
+    dealt = [pv.next_challenge(stats) for _ in range(len(pv.CHALLENGES) * 5)]
+    for start in range(0, len(dealt), len(pv.CHALLENGES)):
+        assert sorted(dealt[start:start + len(pv.CHALLENGES)]) == sorted(pv.CHALLENGES)
+    assert all(a != b for a, b in zip(dealt, dealt[1:]))
+
+def test_rebuilt_cycle_avoids_the_challenge_served_last(monkeypatch):
+    stats = pv.new_challenge_stats()
+    served = pv.next_challenge(stats)
+    last = stats['last_served']
+    assert pv.CHALLENGES[last] == served
+    # A cycle dealt before the challenge list changed, rebuilt at its start
+    stats['cycle'], stats['cycle_position'] = list(range(len(pv.CHALLENGES) - 1)), 0
+    monkeypatch.setattr(pv.random, "shuffle", lambda cycle: cycle.sort(key=lambda i: i != last))
+    assert pv.next_challenge(stats) != served
+
+# ---------- Render Profiling ----------
+def test_timing_percentiles_come_from_buckets():
+    pv.get_profile_stats.clear()
+    for ms in [0.5, 3, 3, 4, 40, 1500]:
+        pv.record_timing("test", "total", ms / 1000)
+    histogram = pv.get_profile_stats()['histograms'][("test", "total")]
+    assert histogram['count'] == 6
+    assert pv.histogram_percentile(histogram, 50) == 5
+    assert pv.histogram_percentile(histogram, 80) == 50
+    # Never above the slowest run seen
+    assert pv.histogram_percentile(histogram, 100) == 1500
+    pv.get_profile_stats.clear()
+
+# ---------- Content Catalogs ----------
+def test_catalog_offsets_with_and_without_final_newline():
+    assert list(pv.build_catalog_offsets(b'{"a": 1}\n{"a": 2}\n')) == [0, 9, 18]
+    assert list(pv.build_catalog_offsets(b'{"a": 1}\n{"a": 2}')) == [0, 9, 17]
+
+def test_catalog_permutation_visits_every_item_once_per_cycle(tmp_path, monkeypatch):
+    monkeypatch.setattr(pv, "CONTENT_DIR", str(tmp_path))
+    (tmp_path / "test_items.jsonl").write_text("".join(f'{{"id": {i}}}\n' for i in range(97)))
+    pv.open_catalog.clear()
+    user_data = {}
+    for _ in range(3):
+        cycle = [pv.next_catalog_item(user_data, "test_items")["id"] for _ in range(97)]
+        assert sorted(cycle) == list(range(97))
+    assert (tmp_path / "test_items.jsonl.idx").exists()
+
+    # A catalog that changed size starts a new permutation
+    (tmp_path / "test_items.jsonl").write_text("".join(f'{{"id": {i}}}\n' for i in range(10)))
+    pv.open_catalog.clear()
+    assert sorted(pv.next_catalog_item(user_data, "test_items")["id"] for _ in range(10)) == list(range(10))
+    assert pv.catalog_item_of_the_day("test_items", datetime.date(2026, 10, 1)) == \
+        pv.catalog_item_of_the_day("test_items", datetime.date(2026, 10, 1))
+    pv.open_catalog.clear()
+
+def test_empty_catalog_has_no_items(tmp_path, monkeypatch):
+    monkeypatch.setattr(pv, "CONTENT_DIR", str(tmp_path))
+    (tmp_path / "empty_items.jsonl").write_bytes(b"")
+    pv.open_catalog.clear()
+    user_data = {}
+    assert pv.next_catalog_item(user_data, "empty_items") is None
+    assert pv.catalog_item_of_the_day("empty_items") is None
+    assert user_data.get('content_permutations', {}) == {}
+    pv.open_catalog.clear()
+
+# ---------- Journal Analysis ----------
+def test_sentiment_counts_negations():
+    assert pv.analyse_text("Happy and calm today")['sentiment'] == 1.0
+    assert pv.analyse_text("I was not happy, just tired")['sentiment'] == -1.0
+    assert pv.analyse_text("Good run but sad news")['sentiment'] == 0.0
+    assert pv.analyse_text("")['sentiment'] == 0.0
+    assert pv.describe_sentiment(0.5) == "positive"
+
+def test_analysis_batches_leave_targets_alone():
+    entry = {'text': "loved the walk"}
+    column = pv.array('d', [float("nan")])
+    [(target, result_column, row, analysis)] = pv.analyse_batch([(entry, entry['text'], column, 0)])
+    assert target is entry and result_column is column and row == 0
+    assert 'analysis' not in entry
+    assert analysis['keywords'] == ["loved", "walk"]
+
+def wait_for_analysis(session):
+    for _ in range(500):
+        if not session['running']:
+            return
+        time.sleep(0.01)
+
+def test_analysis_is_applied_on_the_next_rerun():
+    entries = [{'text': "loved the walk"}, {'text': "sad and tired"}]
+    session = pv.analysis_session()
+    pv.queue_analysis([(entry, entry['text'], None, 0) for entry in entries])
+    wait_for_analysis(session)
+    assert 'analysis' not in entries[0]
+    pv.apply_analysis_results()
+    assert [entry['analysis']['sentiment'] for entry in entries] == [1.0, -1.0]
+    assert pv.st.session_state.analysis_session not in pv.get_analysis_results()['sessions']
+
+def test_closed_sessions_drop_their_analysis(monkeypatch):
+    monkeypatch.setattr(pv, "session_is_active", lambda session_id: False)
+    entry = {'text': "loved the walk"}
+    session = pv.analysis_session()
+    pv.queue_analysis([(entry, entry['text'], None, 0)])
+    wait_for_analysis(session)
+    assert pv.st.session_state.analysis_session not in pv.get_analysis_results()['sessions']
+    assert 'analysis' not in entry
+
+# ---------- Mood Timeline ----------
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 300)
+    y[4321] = 50
+    keep = pv.lttb(x, y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == 9999
+    assert np.all(np.diff(keep) > 0)
+    assert 4321 in keep
+    assert list(pv.lttb(x[:50], y[:50], 200)) == list(range(50))
+
+def test_long_journals_are_thinned_after_averaging():
+    start = datetime.datetime(2020, 1, 1)
+    columns = pv.new_journal_columns()
+    for i in range(pv.MOOD_CHART_POINTS + 500):
+        entry = journal_entry((start + datetime.timedelta(hours=6 * i)).isoformat(), i % 5)
+        pv.insert_journal_row(columns, entry, i)
+        columns['sentiment'].append(float("nan"))
+    frame = pv.mood_timeline_frame(columns, 'Entries')
+    assert len(frame) == pv.MOOD_CHART_POINTS
+    assert frame['date'].is_monotonic_increasing
+    daily = pv.mood_timeline_frame(columns, 'Daily')
+    assert len(daily) == 625
+
+# ---------- Session Snapshots ----------
+def wait_for_snapshots():
+    pv.get_snapshot_writer()['pool'].submit(lambda: None).result()
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(pv, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(pv, "SNAPSHOT_INTERVAL", 0.2)
+    pv.get_snapshot_writer.clear()
+    user_data = {'password': pv.hash_password("secret"), 'mood_journal': [journal_entry("2026-10-01T09:00:00")],
+                 'daily_challenges': {}, 'quiz_results': {}, 'personality_data': {}}
+    pv.get_journal_columns(user_data)
+    pv.get_challenge_stats(user_data)
+    pv.st.session_state.users_db = {"alice": user_data}
+    pv.st.session_state.quiz_answers = {0: 1}
+    pv.st.session_state.quiz_completed = False
+    # Nothing is saved until something changes
+    pv.st.session_state.snapshot_dirty = False
+    pv.save_user_snapshot("alice")
+    wait_for_snapshots()
+    assert pv.load_user_snapshot("alice") is None
+    pv.mark_user_changed()
+    pv.save_user_snapshot("alice")
+    wait_for_snapshots()
+    assert pv.load_user_snapshot("alice")['user_data']['mood_journal'] == user_data['mood_journal']
+    assert 'mood_columns' not in pv.load_user_snapshot("alice")['user_data']
+    assert pv.load_user_snapshot("alice")['user_data']['challenge_stats'] == user_data['challenge_stats']
+    assert not pv.st.session_state.snapshot_dirty
+
+    # A change inside the interval is saved by the first save once it is up
+    pv.append_journal_entry(user_data, journal_entry("2026-10-02T09:00:00"))
+    pv.save_user_snapshot("alice")
+    wait_for_snapshots()
+    assert len(pv.load_user_snapshot("alice")['user_data']['mood_journal']) == 1
+    assert pv.st.session_state.snapshot_dirty
+    time.sleep(0.3)
+    pv.save_user_snapshot("alice")
+    wait_for_snapshots()
+    assert len(pv.load_user_snapshot("alice")['user_data']['mood_journal']) == 2
+
+    # A forced save isn't throttled
+    user_data['notes'] = "bye"
+    pv.save_user_snapshot("alice", force=True)
+    wait_for_snapshots()
+    assert pv.load_user_snapshot("alice")['user_data']['notes'] == "bye"
+
+    pv.st.session_state.users_db = {}
+    assert not pv.restore_user_snapshot("alice", "wrong")
+    assert pv.restore_user_snapshot("alice", "secret")
+    assert pv.st.session_state.users_db["alice"]['mood_journal'] == user_data['mood_journal']
+    assert pv.st.session_state.quiz_answers == {0: 1}
+    assert pv.load_user_snapshot("bob") is None
+    pv.get_snapshot_writer.clear()
+    pv.get_population_stats.clear()
+
+def test_restored_users_join_the_neighbour_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(pv, "SNAPSHOT_DIR", str(tmp_path))
+    pv.get_snapshot_writer.clear()
+    scores = dict(zip(pv.TRAIT_NAMES, pv.mbti_profile_vector("INTP")))
+    user_data = {'password': pv.hash_password("secret"), 'mood_journal': [], 'daily_challenges': {},
+                 'quiz_results': {'scores': scores, 'mbti': "INTP"}, 'personality_data': scores,
+                 'liked_suggestions': {"Hobbies": ["Go"]}}
+    pv.st.session_state.users_db = {"test-restored": user_data}
+    pv.st.session_state.quiz_answers = {}
+    pv.st.session_state.quiz_completed = True
+    pv.save_user_snapshot("test-restored", force=True)
+    wait_for_snapshots()
+
+    pv.get_recommender.clear()
+    pv.st.session_state.users_db = {}
+    assert pv.restore_user_snapshot("test-restored", "secret")
+    pv.register_user_profile("test-restored-peer", {'quiz_results': {'scores': scores}})
+    assert pv.recommend_from_peers("test-restored-peer", scores, "Hobbies") == ["Go"]
+    pv.st.session_state.users_db = {}
+    pv.get_recommender.clear()
+    pv.get_snapshot_writer.clear()
+    pv.get_population_stats.clear()
+
+# ---------- Import and Export ----------
+@pytest.mark.parametrize("record, error", [
+    ({'type': 'journal', 'date': "2026-10-01T09:00:00", 'mood': "meh", 'energy': 5, 'text': "x"}, "unknown mood"),
+    ({'type': 'journal', 'date': "2026-10-01T09:00:00", 'mood': pv.MOOD_OPTIONS[0], 'energy': 11, 'text': "x"},
+     "energy"),
+    ({'type': 'journal', 'date': "2026-10-01T09:00:00", 'mood': pv.MOOD_OPTIONS[0], 'energy': 6.5, 'text': "x"},
+     "whole number"),
+    ({'type': 'journal', 'date': "2026-10-01T09:00:00", 'mood': pv.MOOD_OPTIONS[0], 'energy': "6.5", 'text': "x"},
+     "whole number"),
+    ({'type': 'journal', 'date': "yesterday", 'mood': pv.MOOD_OPTIONS[0], 'energy': 5, 'text': "x"}, "isoformat"),
+    ({'type': 'reflection', 'date': "2026-10-01", 'quote': 3, 'reflection': "x"}, "must be text"),
+    ({'type': 'reflection', 'date': "2026-10-01", 'quote': "q", 'reflection': "  "}, "is empty"),
+    ({'type': 'quiz', 'answers': {'0': 9}}, "invalid answer"),
+    ({'type': 'quiz', 'answers': {}}, "no answers"),
+    ({'type': 'game'}, "unknown record type")
+])
+def test_import_validation_rejects(record, error):
+    with pytest.raises(ValueError, match=error):
+        pv.validate_import_record(record)
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_reads_back_as_valid_records(fmt):
+    user_data = {
+        'mood_journal': [journal_entry("2026-10-01T09:00:00", 2, energy=7, text='said "hi", left')],
+        'daily_challenges': {"2026-10-02": {'challenge': "Walk", 'completed': True, 'reflection': "nice\nday"}},
+        'reflections': [{'date': "2026-10-03T10:00:00", 'quote': "Q", 'author': "A", 'reflection': "R"}],
+        'quiz_results': {'date': "2026-10-01T08:00:00", 'mbti': "INTJ", 'answers': {0: 1, 1: 2}}
+    }
+    exported = pv.export_file(pv.export_view(user_data), fmt)
+    read = [(error, record) for _, record, error in pv.read_import_records(exported, fmt)]
+    assert all(error is None for error, _ in read)
+    records = [record for _, record in read if record['type'] != 'header']
+    assert [record['type'] for record in records] == ['quiz', 'journal', 'challenge', 'reflection']
+    validated = [pv.validate_import_record(record) for record in records]
+    assert validated[0] == {'answers': {0: 1, 1: 2}}
+    assert validated[1] == user_data['mood_journal'][0]
+    assert validated[2] == dict(user_data['daily_challenges']["2026-10-02"], date="2026-10-02")
+    assert validated[3] == user_data['reflections'][0]
+
+def test_bad_lines_are_reported_not_fatal():
+    lines = b'{"type": "header"}\nnot json\n[1, 2]\n{"type": "quiz", "answers": {"0": 1}}\n'
+    read = list(pv.read_import_records(io.BytesIO(lines), "jsonl"))
+    assert [line for line, _, error in read if error] == [2, 3]
+    assert read[-1][1]['answers'] == {"0": 1}
+
+def test_export_view_is_frozen():
+    user_data = {'mood_journal': [journal_entry("2026-10-01T09:00:00")],
+                 'daily_challenges': {"2026-10-02": {'challenge': "Walk", 'completed': False, 'reflection': ""}},
+                 'quiz_results': {}}
+    view = pv.export_view(user_data)
+    user_data['mood_journal'].append(journal_entry("2026-10-02T09:00:00"))
+    user_data['daily_challenges']["2026-10-02"]['completed'] = True
+    user_data['daily_challenges']["2026-10-03"] = {'challenge': "Read", 'completed': False, 'reflection': ""}
+    assert len(view['mood_journal']) == 1
+    assert list(view['daily_challenges']) == ["2026-10-02"]
+    assert not view['daily_challenges']["2026-10-02"]['completed']
+    assert view['reflections'] == []
+
+def test_import_merges_and_skips_what_is_there(monkeypatch):
+    monkeypatch.setattr(pv, "IMPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(pv, "queue_analysis", lambda jobs: None)
+    user_data = {'password': pv.hash_password("secret"),
+                 'mood_journal': [journal_entry("2026-10-01T09:00:00", text="first")],
+                 'daily_challenges': {"2026-10-02": {'challenge': "Walk", 'completed': True, 'reflection': "mine"}},
+                 'quiz_results': {}, 'personality_data': {}}
+    pv.st.session_state.users_db = {"alice": user_data}
+    lines = [
+        {'type': 'header', 'format': pv.EXPORT_FORMAT, 'version': pv.EXPORT_VERSION},
+        {'type': 'journal', 'date': "2026-10-01T09:00:00", 'mood': pv.MOOD_OPTIONS[0], 'energy': 5, 'text': "first"},
+        {'type': 'journal', 'date': "2026-10-03T09:00:00", 'mood': pv.MOOD_OPTIONS[1], 'energy': 3, 'text': "new"},
+        {'type': 'journal', 'date': "2026-10-03T09:00:00", 'mood': pv.MOOD_OPTIONS[2], 'energy': 4.0, 'text': "also"},
+        {'type': 'journal', 'date': "2026-10-03T09:00:00", 'mood': pv.MOOD_OPTIONS[1], 'energy': 3, 'text': "new"},
+        {'type': 'challenge', 'date': "2026-10-02", 'challenge': "Run", 'completed': False, 'reflection': ""},
+        {'type': 'challenge', 'date': "2026-10-04", 'challenge': "Read", 'completed': True, 'reflection': "good"},
+        {'type': 'reflection', 'date': "2026-10-05T10:00:00", 'quote': "Q", 'author': "A", 'reflection': "R"},
+        {'type': 'journal', 'date': "2026-10-06T09:00:00", 'mood': "meh", 'energy': 3, 'text': "bad"},
+        {'type': 'journal', 'date': "2026-10-06T09:00:00", 'mood': pv.MOOD_OPTIONS[0], 'energy': 7.5, 'text': "x"},
+        {'type': 'quiz', 'answers': {'0': 1}}
+    ]
+    uploaded = io.BytesIO("".join(pv.json.dumps(line) + "\n" for line in lines).encode())
+    uploaded.size = len(uploaded.getvalue())
+    summary = pv.import_user_data("alice", uploaded, "jsonl")
+
+    assert summary['imported'] == {'journal': 2, 'challenge': 1, 'reflection': 1, 'quiz': 1}
+    assert summary['error_count'] == 2
+    assert summary['errors'][0].startswith("Line 9:") and summary['errors'][1].startswith("Line 10:")
+    assert [entry['text'] for entry in user_data['mood_journal']] == ["first", "new", "also"]
+    assert user_data['mood_journal'][2]['energy'] == 4
+    assert user_data['daily_challenges']["2026-10-02"]['reflection'] == "mine"
+    assert user_data['daily_challenges']["2026-10-04"]['completed']
+    assert user_data['reflections'][0]['quote'] == "Q"
+    assert user_data['challenge_stats']['completed'] == 2
+    assert user_data['quiz_results']['answers'] == {0: 1}
+    assert pv.st.session_state.quiz_completed
+    pv.st.session_state.users_db = {}
+    pv.get_population_stats.clear()
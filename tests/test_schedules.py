@@ -0,0 +1,84 @@
+import datetime
+import random
+
+import pytest
+
+from habitcore import CommandHistory, DueQueue, HabitStore, describe_schedule, parse_schedule
+
+# ---------- Helpers ----------
+def day(n):
+    return datetime.date(2026, 1, 5) + datetime.timedelta(days=n)
+
+def scheduled_store():
+    store = HabitStore(None, users={})
+    store.user("u", create=True)
+    for habit, schedule in [("Run", "daily"), ("Gym", "mon,wed,fri"), ("Read", "2/week"), ("Water", "every 2 days")]:
+        store.add_habit("u", habit)
+        store.set_schedule("u", habit, parse_schedule(schedule))
+    return store
+
+def assert_matches_fresh(store, today):
+    fresh = DueQueue(store.user("u"), today)
+    assert sorted(store.due_queue("u").due(today)) == sorted(fresh.due(today))
+    assert store.due_queue("u").streak(today) == fresh.streak(today)
+
+# ---------- Schedules ----------
+@pytest.mark.parametrize("text, rule, described", [
+    ("daily", None, "daily"),
+    ("Mon, Wed, Fri", {"kind": "weekdays", "mask": 0b10101}, "mon,wed,fri"),
+    ("3/week", {"kind": "weekly", "times": 3}, "3/week"),
+    ("2 times a week", {"kind": "weekly", "times": 2}, "2/week"),
+    ("every 3 days", {"kind": "interval", "every": 3}, "every 3 days")
+])
+def test_parse_schedule(text, rule, described):
+    assert parse_schedule(text) == rule
+    assert describe_schedule(rule) == described
+
+@pytest.mark.parametrize("text", ["sometimes", "8/week", "every 0 days"])
+def test_parse_schedule_rejects(text):
+    with pytest.raises(ValueError):
+        parse_schedule(text)
+
+# ---------- Due Queue ----------
+def test_incremental_queue_matches_fresh_build():
+    rng = random.Random(2)
+    store = scheduled_store()
+    history = CommandHistory(store)
+    store.due_queue("u", day(0))
+    for n in range(60):
+        action = rng.random()
+        if action < 0.6:
+            habits = rng.sample(["Run", "Gym", "Read", "Water"], 2)
+            history.record(store.log_habits("u", str(day(rng.randint(0, 13))), habits))
+        elif action < 0.7:
+            history.record(store.set_schedule("u", rng.choice(["Run", "Gym", "Read", "Water"]),
+                                              parse_schedule(rng.choice(["daily", "tue,sat", "3/week", "every 4 days"]))))
+        elif action < 0.9:
+            history.undo()
+        else:
+            history.redo()
+        assert_matches_fresh(store, day(14))
+
+
+def test_logging_after_midnight_matches_fresh_queue():
+    store = scheduled_store()
+    store.log_habits("u", str(day(0)), ["Water"])
+    store.due_queue("u", day(0)).due(day(0))
+    # Next day, nothing asked of the queue before logging
+    store.log_habits("u", str(day(2)), ["Water"])
+    assert "Water" not in store.due_queue("u").due(day(2))
+    assert_matches_fresh(store, day(2))
+
+def test_day_rollover_fuzz():
+    rng = random.Random(1)
+    for _ in range(100):
+        store = scheduled_store()
+        today = day(0)
+        store.due_queue("u", today)
+        for _ in range(20):
+            today += datetime.timedelta(days=rng.choice([0, 0, 1, 1, 2]))
+            habits = rng.sample(["Run", "Gym", "Read", "Water"], rng.randint(0, 4))
+            store.log_habits("u", str(today), habits)
+            if rng.random() < 0.5:
+                assert_matches_fresh(store, today)
+        assert_matches_fresh(store, today)
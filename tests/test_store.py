@@ -0,0 +1,216 @@
+import io
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import habitcore.store
+
+from habitcore import SCHEMA_VERSION, HabitStore, migrate_user, new_habit_user
+
+# ---------- Helpers ----------
+def data_file(tmp_path):
+    return str(tmp_path / "data.json")
+
+# ---------- Write-Ahead Log ----------
+def test_flush_is_replayed_on_load(tmp_path):
+    store = HabitStore(data_file(tmp_path))
+    store.user("u", create=True)
+    store.add_habit("u", "Run")
+    store.flush()
+    store.log_habits("u", "2026-10-01", ["Run"])
+    store.set_mood("u", "2026-10-01", "Happy")
+    store.flush()
+    assert HabitStore(data_file(tmp_path)).users["u"] == store.users["u"]
+
+def test_truncated_log_line_keeps_the_rest(tmp_path):
+    store = HabitStore(data_file(tmp_path))
+    store.user("u", create=True)
+    store.add_habit("u", "Run")
+    store.log_habits("u", "2026-10-01", ["Run"])
+    store.flush()
+    # A crash in the middle of the next append
+    with open(store.wal_path, "a") as f:
+        f.write('{"user": "u", "command": {"op": "lo')
+    loaded = HabitStore(data_file(tmp_path))
+    assert list(loaded.users["u"]["logs"]) == ["2026-10-01"]
+
+    # Later appends still count
+    loaded.log_habits("u", "2026-10-02", ["Run"])
+    loaded.flush()
+    assert list(HabitStore(data_file(tmp_path)).users["u"]["logs"]) == ["2026-10-01", "2026-10-02"]
+
+def test_save_keeps_another_stores_writes(tmp_path):
+    tk_app = HabitStore(data_file(tmp_path))
+    tk_app.user("u", create=True)
+    tk_app.add_habit("u", "Run")
+    tk_app.save()
+    api = HabitStore(data_file(tmp_path))
+    tk_app.log_habits("u", "2026-10-01", ["Run"])
+    tk_app.flush()
+    api.log_habits("u", "2026-10-02", ["Run"])
+    api.flush()
+    tk_app.log_habits("u", "2026-10-03", ["Run"])
+    tk_app.save()
+    assert list(HabitStore(data_file(tmp_path)).users["u"]["logs"]) == ["2026-10-01", "2026-10-02", "2026-10-03"]
+
+    api.reload_if_changed()
+    assert api.users["u"] == tk_app.users["u"]
+
+def test_commands_during_save_stay_pending_if_missed(tmp_path, monkeypatch):
+    store = HabitStore(data_file(tmp_path))
+    for username in ("a", "b"):
+        store.user(username, create=True)
+        store.add_habit(username, "Run")
+    dumps = json.dumps
+
+    def dumps_and_log(value, **kwargs):
+        # Another thread's commands, landing while "b" is encoded
+        if "b" in value and not store.users["a"]["logs"]:
+            store.log_habits("a", "2026-10-01", ["Run"])
+            store.log_habits("b", "2026-10-01", ["Run"])
+        return dumps(value, **kwargs)
+
+    monkeypatch.setattr(habitcore.store, "json", SimpleNamespace(dumps=dumps_and_log, load=json.load,
+                                                                  loads=json.loads))
+    store.save()
+    monkeypatch.undo()
+    with open(data_file(tmp_path)) as f:
+        saved = json.load(f)
+    assert saved["a"]["logs"] == {} and saved["b"]["logs"] == {"2026-10-01": ["Run"]}
+    assert [command["user"] for command, _ in store.pending] == ["a"]
+    store.flush()
+    assert HabitStore(data_file(tmp_path)).users == store.users
+
+# ---------- Streaming Load ----------
+STREAMED_USERS = {
+    "zoë": {"habits": ["Läuft 🏃"], "logs": {"2026-10-01": ["Läuft 🏃"]}, "streak": 1234567890, "notes": "ÿ\"}"},
+    "日本": {"habits": [], "logs": {}, "streak": -0.5e-3, "notes": "x" * 40},
+    "empty": {}
+}
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 64])
+def test_streamed_file_matches_json_load(monkeypatch, chunk):
+    monkeypatch.setattr(habitcore.store, "READ_CHUNK_BYTES", chunk)
+    for text in (json.dumps(STREAMED_USERS, indent=4, ensure_ascii=False), json.dumps(STREAMED_USERS)):
+        f = io.BytesIO(text.encode())
+        assert dict(habitcore.store.iter_json_object(f)) == STREAMED_USERS
+
+def test_streamed_numbers_are_read_whole(monkeypatch):
+    monkeypatch.setattr(habitcore.store, "READ_CHUNK_BYTES", 2)
+    assert list(habitcore.store.iter_json_object(io.BytesIO(b'{"n": 1234567}'))) == [("n", 1234567)]
+    # A number that runs up to the end of the file is read whole, then the
+    # missing brace is reported
+    pairs = habitcore.store.iter_json_object(io.BytesIO(b'{"n": 1234567'))
+    assert next(pairs) == ("n", 1234567)
+    with pytest.raises(ValueError, match="unexpected end"):
+        next(pairs)
+
+def write_streamed_file(tmp_path):
+    store = HabitStore(data_file(tmp_path))
+    for username in ("a", "b", "c"):
+        store.user(username, create=True)
+        store.add_habit(username, "Run")
+    store.save()
+    # Log entries on top of a streamed user, and for a user only in the log
+    store.log_habits("b", "2026-10-01", ["Run"])
+    store.user("wal-only", create=True)
+    store.flush()
+    return store
+
+def test_background_load_merges_the_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(habitcore.store, "READ_CHUNK_BYTES", 16)
+    written = write_streamed_file(tmp_path)
+    store = HabitStore(data_file(tmp_path), background=True)
+    store.wait_for()
+    assert store.loaded and store.load_error is None and store.load_progress == 1.0
+    assert store.users == written.users
+
+def test_users_are_available_before_the_load_finishes(tmp_path, monkeypatch):
+    monkeypatch.setattr(habitcore.store, "READ_CHUNK_BYTES", 16)
+    write_streamed_file(tmp_path)
+    release = threading.Event()
+    set_load_progress = HabitStore.set_load_progress
+
+    def hold_after_first_user(self, progress):
+        if "a" in self.users:
+            release.wait(5)
+        set_load_progress(self, progress)
+
+    monkeypatch.setattr(HabitStore, "set_load_progress", hold_after_first_user)
+    store = HabitStore(data_file(tmp_path), background=True)
+    try:
+        assert store.user("a")["habits"] == ["Run"]
+        assert not store.loaded
+    finally:
+        release.set()
+    assert store.user("b")["logs"] == {"2026-10-01": ["Run"]}
+    assert store.user("missing") is None
+    assert store.loaded
+
+def test_malformed_file_sets_load_error(tmp_path):
+    with open(data_file(tmp_path), "w") as f:
+        f.write('{"a": {"habits": []}, "b": [1, 2')
+    store = HabitStore(data_file(tmp_path), background=True)
+    with pytest.raises(ValueError):
+        store.wait_for()
+    assert store.loaded and isinstance(store.load_error, ValueError)
+    assert store.users["a"] == {"habits": []}
+
+# ---------- Linked Accounts ----------
+def test_accounts_are_linked_only_with_the_confirmed_code(tmp_path):
+    store = HabitStore(data_file(tmp_path))
+    store.user("u", create=True)
+    assert not store.linked("u", "web-user", "ABC123")
+    store.set_link("u", "web-user", "ABC123")
+    assert store.linked("u", "web-user", "ABC123")
+    assert not store.linked("u", "web-user", "XYZ789")
+    assert not store.linked("u", "someone-else", "ABC123")
+    assert not store.linked("missing", "web-user", "ABC123")
+    store.flush()
+    assert HabitStore(data_file(tmp_path)).linked("u", "web-user", "ABC123")
+    store.set_link("u", "web-user", None)
+    assert not store.linked("u", "web-user", "ABC123")
+
+# ---------- Migrations ----------
+OLD_RECORDS = {
+    # Before versioning: fields missing, duplicate and empty log days
+    0: {"habits": ["Run"], "logs": {"2026-10-01": ["Run", "Run"], "2026-10-02": []}, "notes": None},
+    1: {"schema": 1, "habits": ["Run"], "logs": {"2026-10-01": ["Run", "Run"]}, "streak": 0, "notes": "",
+        "moods": {}, "progress": {}},
+    2: {"schema": 2, "habits": ["Run"], "logs": {"2026-10-01": ["Run"]}, "streak": 0, "notes": "",
+        "moods": {}, "progress": {"Run": 0}},
+    3: {"schema": 3, "habits": ["Run"], "logs": {"2026-10-01": ["Run"]}, "streak": 0, "notes": "",
+        "moods": {}, "progress": {"Run": 0}, "schedules": {}}
+}
+
+@pytest.mark.parametrize("version", sorted(OLD_RECORDS))
+def test_migrate_each_old_version(version):
+    record = json.loads(json.dumps(OLD_RECORDS[version]))
+    assert migrate_user(record)
+    assert record["schema"] == SCHEMA_VERSION
+    assert set(record) == set(new_habit_user())
+    assert record["logs"] == {"2026-10-01": ["Run"]}
+    assert record["progress"] == {"Run": 0}
+    assert record["schedules"] == {}
+    assert record["links"] == {}
+    assert record["notes"] == ""
+    assert not migrate_user(record)
+
+def test_newer_records_are_left_alone():
+    record = {"schema": SCHEMA_VERSION + 1, "future": True}
+    assert not migrate_user(record)
+    assert record == {"schema": SCHEMA_VERSION + 1, "future": True}
+
+def test_old_records_migrate_lazily_and_are_written_back(tmp_path):
+    with open(data_file(tmp_path), "w") as f:
+        json.dump({"u": OLD_RECORDS[0], "v": OLD_RECORDS[1]}, f)
+    store = HabitStore(data_file(tmp_path))
+    assert "schema" not in store.users["u"]
+    assert store.user("u")["schema"] == SCHEMA_VERSION
+    assert store.users["v"]["schema"] == 1
+    store.flush()
+    loaded = HabitStore(data_file(tmp_path))
+    assert loaded.users["u"]["schema"] == SCHEMA_VERSION
+    assert loaded.users["v"]["schema"] == 1